@@ -4,7 +4,14 @@ QuantMCP Main Entry - 模块化架构主入口
 提供智能策略生成、回测分析、股票筛选等功能
 """
 
+import time
+
+# 记录进程启动时刻，用于输出启动耗时分解
+_STARTUP_T0 = time.perf_counter()
+
 import logging
+import socket
+import threading
 import traceback
 import asyncio
 from datetime import datetime
@@ -13,9 +20,9 @@ from datetime import datetime
 from fastmcp import FastMCP
 
 # 导入模块化组件
+# 行情/交易模块依赖 pandas、numpy 和 XTQuant，均在首次使用时才导入，避免拖慢启动
 from src.config import config
-from src.utils.xtquant_client import xt_client
-from src.tools import TradingTool, QMTStrategyTool
+from src.utils.executors import executors, run_blocking, TRADING, MARKET_DATA, FILE_IO
 
 # 配置日志
 import os
@@ -33,6 +40,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger("quantmcp")
 
+# 启动阶段耗时（毫秒）
+startup_timings = {'imports': (time.perf_counter() - _STARTUP_T0) * 1000}
+
+# 延迟创建的组件实例；每个组件一把锁，慢的组件（如连接交易柜台）创建时不阻塞其他组件
+_instances = {}
+_instance_locks = {}
+_instance_locks_guard = threading.Lock()
+
+def _lazy_instance(name: str, factory):
+    """获取全局组件实例，首次访问时创建"""
+    instance = _instances.get(name)
+    if instance is None:
+        with _instance_locks_guard:
+            lock = _instance_locks.setdefault(name, threading.Lock())
+        with lock:
+            instance = _instances.get(name)
+            if instance is None:
+                t0 = time.perf_counter()
+                instance = _instances[name] = factory()
+                logger.info(f"[LAZY] {name} 已加载, 耗时 {(time.perf_counter() - t0) * 1000:.0f}ms")
+    return instance
+
+def get_xt_client():
+    """XTQuant行情客户端"""
+    def factory():
+        from src.utils.xtquant_client import xt_client
+        return xt_client
+    return _lazy_instance('xt_client', factory)
+
+def get_trading_tool():
+    """交易工具（创建时初始化 XtQuantTrader）"""
+    def factory():
+        from src.tools.trading_tool import TradingTool
+        return TradingTool()
+    return _lazy_instance('trading_tool', factory)
+
+def get_qmt_tool():
+    """QMT策略文件工具"""
+    def factory():
+        from src.tools.qmt_tool import QMTStrategyTool
+        return QMTStrategyTool()
+    return _lazy_instance('qmt_tool', factory)
+
+def get_screening_tool():
+    """选股工具"""
+    def factory():
+        from src.tools.screening_tool import ScreeningTool
+        return ScreeningTool()
+    return _lazy_instance('screening_tool', factory)
+
+def _invoke(getter, method: str, *args, **kwargs):
+    """在执行器线程中获取工具实例并调用其方法，首次调用时才创建实例"""
+    return getattr(getter(), method)(*args, **kwargs)
+
 def init_system():
     """初始化系统"""
     logger.info("=" * 50)
@@ -41,25 +102,72 @@ def init_system():
     
     # 初始化XTQuant连接
     logger.info("正在初始化XTQuant连接...")
+    t0 = time.perf_counter()
     try:
-        if xt_client.connect():
+        if get_xt_client().connect():
             logger.info("[OK] XTQuant连接成功")
         else:
             logger.warning("[WARNING] XTQuant连接失败，将在离线模式下运行")
     except Exception as e:
         logger.error(f"[ERROR] XTQuant初始化失败: {e}")
+    startup_timings['xt_connect'] = (time.perf_counter() - t0) * 1000
+    
+    # 预热交易与策略组件
+    t0 = time.perf_counter()
+    get_trading_tool()
+    get_qmt_tool()
+    startup_timings['warmup'] = (time.perf_counter() - t0) * 1000
+    
+    # 订阅持仓/当日成交/未完成委托/自选股票的实时行情，下单风控以此为参考价
+    t0 = time.perf_counter()
+    try:
+        if get_trading_tool().start_quotes():
+            logger.info("[OK] 实时行情订阅已启动")
+        else:
+            logger.warning("[WARNING] 实时行情订阅未启动，下单时将回退到快照查询")
+    except Exception as e:
+        logger.error(f"[ERROR] 实时行情订阅失败: {e}")
+    startup_timings['quotes'] = (time.perf_counter() - t0) * 1000
     
     logger.info("[OK] 系统初始化完成")
 
+# 通配监听地址不能作为连接目标，改连同协议族的回环地址
+_WILDCARD_HOSTS = {'': '127.0.0.1', '0.0.0.0': '127.0.0.1', '::': '::1', '[::]': '::1'}
+
+def _wait_port_listening(host: str, port: int, timeout: float = 30.0) -> bool:
+    """等待服务端口开始监听"""
+    host = _WILDCARD_HOSTS.get(host.strip(), host)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def _background_init():
+    """快速启动模式：端口开始监听后再在后台连接XTQuant并预热"""
+    if config.server.transport != 'stdio':
+        if _wait_port_listening(config.server.host, config.server.port):
+            startup_timings['port_listening'] = (time.perf_counter() - _STARTUP_T0) * 1000
+            logger.info(f"[START] 端口已监听，距进程启动 {startup_timings['port_listening']:.0f}ms")
+        else:
+            logger.warning("[WARNING] 等待端口监听超时，继续后台初始化")
+    
+    init_system()
+    _log_startup_timings()
+
+def _log_startup_timings():
+    """输出启动耗时分解"""
+    parts = ", ".join(f"{name}={ms:.0f}ms" for name, ms in startup_timings.items())
+    logger.info(f"[TIMING] 启动耗时分解: {parts}")
+
 # 创建FastMCP实例
 mcp = FastMCP("QuantMCP量化交易助手")
 
-# 初始化工具实例
-trading_tool = TradingTool()
-qmt_tool = QMTStrategyTool()
-
 @mcp.tool()
-def place_order(symbol: str, quantity: int, price: float, direction: str = "BUY") -> str:
+async def place_order(symbol: str, quantity: int, price: float, direction: str = "BUY") -> str:
     """简化下单工具
     
     用户只需要传入股票代码、数量和价格即可下单。
@@ -76,7 +184,9 @@ def place_order(symbol: str, quantity: int, price: float, direction: str = "BUY"
     try:
         logger.info(f"MCP调用: place_order({symbol}, {quantity}, {price}, {direction})")
         
-        result = trading_tool.place_order(
+        result = await run_blocking(
+            TRADING,
+            _invoke, get_trading_tool, 'place_order',
             symbol=symbol,
             quantity=quantity,
             price=price,
@@ -90,7 +200,28 @@ def place_order(symbol: str, quantity: int, price: float, direction: str = "BUY"
         return f"[ERROR] 下单失败: {str(e)}"
 
 @mcp.tool()
-def cancel_order(order_id: str) -> str:
+async def place_orders(orders: list[dict]) -> dict:
+    """批量下单工具
+    
+    一次校验整篮订单并通过异步下单接口连续提交，适合调仓等一次下多笔订单的场景。
+    
+    Args:
+        orders: 订单列表，每项如 {"symbol": "000001.SZ", "quantity": 100, "price": 10.5, "direction": "BUY"}，
+                direction 可省略（默认BUY）
+    
+    Returns:
+        逐笔结果：status 为 ACCEPTED（已接受，含 order_id）、REJECTED（校验未通过或被拒绝，含原因）
+        或 TIMEOUT（超时未收到回报，订单可能已被接受，应按 message 中的下单备注在 get_orders 中核对，不要直接重新提交）
+    """
+    try:
+        logger.info(f"MCP调用: place_orders({len(orders)}笔)")
+        return await run_blocking(TRADING, _invoke, get_trading_tool, 'place_orders', orders)
+    except Exception as e:
+        logger.error(f"place_orders执行失败: {e}")
+        return {'success': False, 'error': f"批量下单失败: {str(e)}", 'orders': []}
+
+@mcp.tool()
+async def cancel_order(order_id: str) -> str:
     """撤单工具
     
     Args:
@@ -102,7 +233,7 @@ def cancel_order(order_id: str) -> str:
     try:
         logger.info(f"MCP调用: cancel_order({order_id})")
         
-        result = trading_tool.cancel_order(order_id=order_id)
+        result = await run_blocking(TRADING, _invoke, get_trading_tool, 'cancel_order', order_id=order_id)
         
         return result
         
@@ -111,37 +242,140 @@ def cancel_order(order_id: str) -> str:
         return f"[ERROR] 撤单失败: {str(e)}"
 
 @mcp.tool()
-def save_qmt_strategy(strategy_name: str, code: str) -> str:
+async def get_positions(symbol: str | None = None) -> str:
+    """查询持仓（读取本地交易账本，不访问柜台）
+    
+    Args:
+        symbol: 股票代码，为空时列出全部持仓
+    
+    Returns:
+        持仓信息
+    """
+    try:
+        logger.info(f"MCP调用: get_positions({symbol})")
+        return await run_blocking(TRADING, _invoke, get_trading_tool, 'get_positions', symbol)
+    except Exception as e:
+        logger.error(f"get_positions执行失败: {e}")
+        return f"[ERROR] 查询持仓失败: {str(e)}"
+
+@mcp.tool()
+async def get_orders(symbol: str | None = None, open_only: bool = False) -> str:
+    """查询当日委托及成交进度（读取本地交易账本，不访问柜台）
+    
+    Args:
+        symbol: 股票代码，为空时返回全部委托
+        open_only: 为True时只返回未成交完、未撤销的委托
+    
+    Returns:
+        委托列表
+    """
+    try:
+        logger.info(f"MCP调用: get_orders({symbol}, open_only={open_only})")
+        return await run_blocking(TRADING, _invoke, get_trading_tool, 'get_orders', symbol, open_only)
+    except Exception as e:
+        logger.error(f"get_orders执行失败: {e}")
+        return f"[ERROR] 查询委托失败: {str(e)}"
+
+@mcp.tool()
+async def save_qmt_strategy(strategy_name: str, code: str) -> str:
     """保存自定义策略代码到 QMT 本地策略目录"""
     try:
         logger.info(f"MCP调用: save_qmt_strategy({strategy_name})")
-        return qmt_tool.save_strategy(strategy_name, code)
+        return await run_blocking(FILE_IO, _invoke, get_qmt_tool, 'save_strategy', strategy_name, code)
     except Exception as e:
         logger.error(f"save_qmt_strategy 执行失败: {e}")
         return f"[ERROR] 保存策略失败: {str(e)}"
 
 @mcp.tool()
-def generate_ma_strategy(symbol: str = "000001.SZ", short_period: int = 5, long_period: int = 20,
+async def generate_ma_strategy(symbol: str = "000001.SZ", short_period: int = 5, long_period: int = 20,
                          strategy_name: str | None = None) -> str:
     """生成并保存双均线策略示例"""
     try:
         logger.info("MCP调用: generate_ma_strategy")
-        return qmt_tool.generate_ma_strategy(symbol, short_period, long_period, strategy_name)
+        return await run_blocking(FILE_IO, _invoke, get_qmt_tool, 'generate_ma_strategy',
+                                  symbol, short_period, long_period, strategy_name)
     except Exception as e:
         logger.error(f"generate_ma_strategy 执行失败: {e}")
         return f"[ERROR] 生成策略失败: {str(e)}"
 
+@mcp.tool()
+async def screen_stocks(filters: str = "", rank_by: str = "momentum(20)", sector: str = "沪深A股",
+                        limit: int | None = None, end_date: str | None = None, period: str = "1d",
+                        max_stocks: int | None = None) -> str:
+    """条件选股工具
+
+    对整个板块的行情面板向量化计算筛选与排序因子，返回排名靠前的股票。
+    支持的因子: close、momentum(n)、ma(n)、ma_cross_up(short,long)、ma_cross_down(short,long)、
+    volatility(n)、volume_ratio(n)
+
+    Args:
+        filters: 筛选条件，分号分隔，如 "ma_cross_up(5,20); momentum(20) > 0.05; volatility(20) < 0.4;
+                 volume_ratio(5) > 2"
+        rank_by: 排序因子，默认降序，前加 - 为升序，如 "-volatility(20)"
+        sector: 股票池板块，默认沪深A股
+        limit: 返回条数，默认读取配置 screening_config.default_limit
+        end_date: 截止日期 YYYYMMDD，默认今天
+        period: K线周期，默认日线
+        max_stocks: 扫描股票数上限，默认读取配置 screening_config.max_stocks_scan，0 表示不限
+
+    Returns:
+        选股结果
+    """
+    try:
+        logger.info(f"MCP调用: screen_stocks({filters}, rank_by={rank_by}, sector={sector})")
+        return await run_blocking(MARKET_DATA, _invoke, get_screening_tool, 'screen_stocks',
+                                  filters=filters, rank_by=rank_by, sector=sector, limit=limit,
+                                  end_date=end_date, period=period, max_stocks=max_stocks)
+    except Exception as e:
+        logger.error(f"screen_stocks 执行失败: {e}")
+        return f"[ERROR] 选股失败: {str(e)}"
+
+def _cache_stats_text() -> str:
+    """汇总行情缓存与指标缓存统计"""
+    from src.utils.indicator_cache import indicator_cache
+    from src.utils.result_cache import backtest_result_cache
+    sections = [('行情缓存', get_xt_client().cache_stats()), ('指标缓存', indicator_cache.stats())]
+    if backtest_result_cache is not None:
+        sections.append(('回测结果缓存', backtest_result_cache.stats()))
+    
+    lines = ["[DATA] 缓存统计"]
+    for title, stats in sections:
+        lines.append(f"\n[{title}]")
+        for key, value in stats.items():
+            if isinstance(value, float):
+                value = f"{value:.2%}" if key.endswith('rate') else f"{value:.3f}"
+            lines.append(f"   * {key}: {value}")
+    return "\n".join(lines)
+
+@mcp.tool()
+async def get_cache_stats() -> str:
+    """查询行情缓存、技术指标缓存与回测结果缓存的命中率、内存占用等统计"""
+    try:
+        logger.info("MCP调用: get_cache_stats")
+        return await run_blocking(MARKET_DATA, _cache_stats_text)
+    except Exception as e:
+        logger.error(f"get_cache_stats 执行失败: {e}")
+        return f"[ERROR] 获取缓存统计失败: {str(e)}"
+
 def main():
     """主函数"""
     try:
-        # 初始化系统
-        init_system()
+        startup_timings['tools_registered'] = (time.perf_counter() - _STARTUP_T0) * 1000
+        
+        if config.server.fast_start:
+            # 快速启动：先绑定端口接收请求，XTQuant连接与预热在后台完成
+            logger.info("[INFO] 快速启动模式：XTQuant连接将在端口监听后于后台完成")
+            threading.Thread(target=_background_init, name="quantmcp_init", daemon=True).start()
+        else:
+            init_system()
+            _log_startup_timings()
         
         # 启动信息
         logger.info("[INFO] QuantMCP服务器启动信息:")
         logger.info(f"   * 服务地址: http://{config.server.host}:{config.server.port}")
         logger.info(f"   * 传输方式: {config.server.transport.upper()}")
-        logger.info(f"   * XTQuant状态: {'已连接' if xt_client.is_connected() else '未连接'}")
+        if not config.server.fast_start:
+            logger.info(f"   * XTQuant状态: {'已连接' if get_xt_client().is_connected() else '未连接'}")
         logger.info("   * 架构版本: 模块化架构 v2.0")
         
         # 启动SSE服务器
@@ -163,10 +397,12 @@ def main():
     finally:
         # 清理资源
         try:
-            xt_client.disconnect()
+            executors.shutdown()
+            if 'xt_client' in _instances:
+                _instances['xt_client'].disconnect()
             logger.info("[OK] 资源清理完成")
         except:
             pass
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
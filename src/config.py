@@ -5,15 +5,20 @@
 """
 
 import os
+import json
+import logging
 from dataclasses import dataclass
 from typing import Dict, List
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class ServerConfig:
     """服务器配置"""
     host: str = os.getenv("QUANTMCP_HOST", "127.0.0.1")
     port: int = int(os.getenv("QUANTMCP_PORT", "8000"))
     transport: str = os.getenv("QUANTMCP_TRANSPORT", "sse")  # 保持SSE传输，LangChain MCP适配器支持SSE
+    fast_start: bool = os.getenv("QUANTMCP_FAST_START", "false").lower() == "true"  # 端口监听后再在后台连接XTQuant
     
 @dataclass
 class StrategyConfig:
@@ -23,17 +28,57 @@ class StrategyConfig:
     default_end_date: str = os.getenv("DEFAULT_END_DATE", "20241201")
     default_short_period: int = int(os.getenv("DEFAULT_SHORT_PERIOD", "5"))
     default_long_period: int = int(os.getenv("DEFAULT_LONG_PERIOD", "20"))
+    ma_cross: Dict = None               # 双均线参数扫描范围 {'short_range': [...], 'long_range': [...]}
+    
+    def __post_init__(self):
+        if self.ma_cross is None:
+            self.ma_cross = {
+                'short_range': [3, 5, 8, 10, 13],
+                'long_range': [20, 25, 30, 35, 40, 50, 60]
+            }
     
 @dataclass
 class ScreeningConfig:
     """筛选配置"""
     default_stock_list: List[str] = None
     default_date_range: str = "20241101-20241201"
+    max_stocks_scan: int = 500          # 单次扫描的最大股票数
+    default_limit: int = 20             # 默认返回条数
+    performance_mode: bool = True       # 性能优先模式
+    cache_timeout: int = 300            # 行情/板块缓存过期时间（秒）
     
     def __post_init__(self):
         if self.default_stock_list is None:
             self.default_stock_list = ["000001.SZ", "000002.SZ", "600000.SH", "600036.SH"]
 
+@dataclass
+class DataConfig:
+    """行情数据配置"""
+    bar_cache_enabled: bool = os.getenv("BAR_CACHE_ENABLED", "true").lower() == "true"   # 是否启用本地K线缓存
+    bar_cache_dir: str = os.getenv("BAR_CACHE_DIR", "cache/bars")                        # K线缓存目录
+    fetch_chunk_size: int = int(os.getenv("FETCH_CHUNK_SIZE", "200"))                    # 批量拉取时每个请求的股票数
+    fetch_max_workers: int = int(os.getenv("FETCH_MAX_WORKERS", "4"))                    # 批量拉取的并发线程数
+    cache_max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))     # 内存缓存上限（字节）
+    indicator_cache_max_bytes: int = int(os.getenv("INDICATOR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 指标缓存上限
+    result_cache_enabled: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"  # 是否缓存回测结果
+    result_cache_path: str = os.getenv("RESULT_CACHE_PATH", "cache/backtest_results.sqlite")  # 回测结果持久化文件
+    result_cache_max_bytes: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))  # 结果内存缓存上限
+    quote_buffer_size: int = int(os.getenv("QUOTE_BUFFER_SIZE", "1024"))                 # 每只股票保留的实时行情笔数
+    quote_symbols: List[str] = None     # 启动时额外订阅实时行情的股票（QUOTE_SYMBOLS，逗号分隔）
+    
+    def __post_init__(self):
+        if self.quote_symbols is None:
+            self.quote_symbols = [s.strip() for s in os.getenv("QUOTE_SYMBOLS", "").split(",") if s.strip()]
+
+@dataclass
+class ExecutorConfig:
+    """MCP工具阻塞任务执行器配置，各类任务使用独立线程池互不排队"""
+    trading_workers: int = int(os.getenv("TRADING_WORKERS", "2"))            # 下单/撤单
+    market_data_workers: int = int(os.getenv("MARKET_DATA_WORKERS", "4"))    # 行情拉取/回测
+    file_io_workers: int = int(os.getenv("FILE_IO_WORKERS", "2"))            # 策略文件读写
+    backtest_workers: int = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))   # 批量回测进程数
+    backtest_batch_size: int = int(os.getenv("BACKTEST_BATCH_SIZE", "100"))                 # 每个回测任务的股票数
+
 @dataclass 
 class TradingConfig:
     """交易配置"""
@@ -51,6 +96,26 @@ class TradingConfig:
     default_strategy_name: str = "QuantMCP"
     default_remark: str = "MCP_Auto_Order"
     market_order_spread: float = float(os.getenv("MARKET_ORDER_SPREAD", "0.1"))       # 市价单价差比例（10%）
+    order_timeout: float = float(os.getenv("ORDER_TIMEOUT", "10.0"))                  # 批量下单等待异步回报的超时（秒）
+    reconcile_interval: float = float(os.getenv("RECONCILE_INTERVAL", "60"))           # 交易账本与柜台对账间隔（秒），0 表示不对账
+    
+    # 回测成本与资金配置（可由 config.json 的 trading_config 覆盖）
+    default_capital: float = float(os.getenv("DEFAULT_CAPITAL", "1000000"))          # 初始资金
+    max_position_ratio: float = float(os.getenv("MAX_POSITION_RATIO", "0.95"))      # 最大仓位比例
+    commission_rate: float = float(os.getenv("COMMISSION_RATE", "0.0003"))          # 佣金费率
+    slippage: float = float(os.getenv("SLIPPAGE", "0.001"))                         # 滑点比例
+
+@dataclass
+class RiskControlConfig:
+    """风控配置（可由 config.json 的 risk_control 覆盖）"""
+    enabled: bool = os.getenv("RISK_CHECK_ENABLED", "true").lower() == "true"      # 是否启用下单前风控
+    max_drawdown_limit: float = float(os.getenv("MAX_DRAWDOWN_LIMIT", "0.25"))     # 账户回撤超过该比例后禁止买入
+    min_sharpe_ratio: float = float(os.getenv("MIN_SHARPE_RATIO", "0.5"))          # 策略最低夏普比率（不参与下单风控）
+    max_leverage: float = float(os.getenv("MAX_LEVERAGE", "1.0"))                  # 持仓市值+未完成买单不超过总资产的倍数
+    stop_loss_ratio: float = float(os.getenv("STOP_LOSS_RATIO", "0.1"))            # 持仓亏损超过该比例后禁止加仓
+    max_price_deviation: float = float(os.getenv("MAX_PRICE_DEVIATION", "0.1"))    # 委托价偏离实时行情最新价的最大比例
+    require_quote: bool = os.getenv("RISK_REQUIRE_QUOTE", "true").lower() == "true"  # 没有实时行情参考价时拒绝买入
+    max_quote_age: float = float(os.getenv("MAX_QUOTE_AGE", "60"))                 # 最新价的最长有效期（秒），0为不限
 
 class Config:
     """全局配置管理器"""
@@ -59,13 +124,96 @@ class Config:
         self.server = ServerConfig()
         self.strategy = StrategyConfig()
         self.screening = ScreeningConfig()
+        self.data = DataConfig()
+        self.executor = ExecutorConfig()
         self.trading = TradingConfig()
+        self.risk = RiskControlConfig()
         
+    # config.json 中的配置段 -> Config 属性名
+    # server 段不在此列，服务器地址端口以环境变量为准
+    FILE_SECTIONS = {
+        'screening_config': 'screening',
+        'strategy_config': 'strategy',
+        'trading_config': 'trading',
+        'risk_control': 'risk',
+    }
+    
+    # 可由 config.json 设置的字段对应的环境变量
+    # 优先级：显式设置的环境变量 > config.json > 默认值
+    ENV_VARS = {
+        'strategy': {
+            'default_symbol': 'DEFAULT_SYMBOL',
+            'default_start_date': 'DEFAULT_START_DATE',
+            'default_end_date': 'DEFAULT_END_DATE',
+            'default_short_period': 'DEFAULT_SHORT_PERIOD',
+            'default_long_period': 'DEFAULT_LONG_PERIOD',
+        },
+        'trading': {
+            'qmt_path': 'QMT_PATH',
+            'session_id': 'QMT_SESSION_ID',
+            'account_id': 'QMT_ACCOUNT_ID',
+            'max_order_value': 'MAX_ORDER_VALUE',
+            'max_position_value': 'MAX_POSITION_VALUE',
+            'min_order_quantity': 'MIN_ORDER_QUANTITY',
+            'market_order_spread': 'MARKET_ORDER_SPREAD',
+            'order_timeout': 'ORDER_TIMEOUT',
+            'reconcile_interval': 'RECONCILE_INTERVAL',
+            'default_capital': 'DEFAULT_CAPITAL',
+            'max_position_ratio': 'MAX_POSITION_RATIO',
+            'commission_rate': 'COMMISSION_RATE',
+            'slippage': 'SLIPPAGE',
+        },
+        'risk': {
+            'enabled': 'RISK_CHECK_ENABLED',
+            'max_drawdown_limit': 'MAX_DRAWDOWN_LIMIT',
+            'min_sharpe_ratio': 'MIN_SHARPE_RATIO',
+            'max_leverage': 'MAX_LEVERAGE',
+            'stop_loss_ratio': 'STOP_LOSS_RATIO',
+            'max_price_deviation': 'MAX_PRICE_DEVIATION',
+            'require_quote': 'RISK_REQUIRE_QUOTE',
+            'max_quote_age': 'MAX_QUOTE_AGE',
+        },
+    }
+    
     @classmethod
     def from_file(cls, config_path: str):
-        """从配置文件加载配置"""
-        # 预留接口，可以后续从JSON/YAML文件加载配置
-        return cls()
+        """从JSON配置文件加载配置，文件不存在时使用默认配置
+        
+        显式设置了环境变量的字段保留环境变量的值，不被文件覆盖，每个字段的取值来源记录到日志
+        """
+        instance = cls()
+        if not os.path.exists(config_path):
+            return instance
+        
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                file_config = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取配置文件失败，使用默认配置: {config_path}, {e}")
+            return instance
+        
+        for section, attr in cls.FILE_SECTIONS.items():
+            values = file_config.get(section)
+            if not isinstance(values, dict):
+                continue
+            target = getattr(instance, attr)
+            env_vars = cls.ENV_VARS.get(attr, {})
+            for key, value in values.items():
+                if not hasattr(target, key):
+                    continue
+                env_name = env_vars.get(key)
+                if env_name and os.environ.get(env_name, '').strip():
+                    logger.info(f"配置 {attr}.{key}={getattr(target, key)!r} 来自环境变量 {env_name}，"
+                                f"忽略 {config_path} 中的值 {value!r}")
+                    continue
+                setattr(target, key, value)
+                logger.info(f"配置 {attr}.{key}={value!r} 来自 {config_path}")
+        
+        return instance
 
 # 全局配置实例
-config = Config() 
\ No newline at end of file
+CONFIG_PATH = os.getenv(
+    "QUANTMCP_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+)
+config = Config.from_file(CONFIG_PATH) 
\ No newline at end of file
@@ -5,5 +5,13 @@
 
 from .strategy_generator import StrategyGenerator
 from .ma_strategy import MAStrategy
+from .macd_strategy import MACDStrategy
+from .rsi_strategy import RSIStrategy
+from .ma_sweep import MASweep
+from .walk_forward import WalkForwardOptimizer
+from .batch_backtest import BatchBacktester
+from .streaming_backtest import StreamingMABacktester
+from .ma_state import MAState
+from .backtest_engine import BacktestEngine
 
-__all__ = ['StrategyGenerator', 'MAStrategy'] 
\ No newline at end of file
+__all__ = ['StrategyGenerator', 'MAStrategy', 'MACDStrategy', 'RSIStrategy', 'MASweep', 'WalkForwardOptimizer', 'BatchBacktester', 'StreamingMABacktester', 'MAState', 'BacktestEngine'] 
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+事件驱动回测引擎
+按持仓信号生成委托并在下一根K线成交，计入佣金、滑点、整手与T+1约束。
+信号到成交的转换向量化完成，只对成交事件循环记账，成交记录存放在结构化数组中
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# 成交记录结构
+TRADE_DTYPE = np.dtype([
+    ('bar', np.int64),           # 成交所在K线下标
+    ('side', np.int8),           # 1 买入，-1 卖出
+    ('price', np.float64),       # 含滑点的成交价
+    ('volume', np.int64),        # 成交股数
+    ('commission', np.float64),  # 佣金
+    ('pnl', np.float64),         # 卖出时该笔持仓的净盈亏（含买卖佣金），买入为0
+])
+
+@dataclass
+class BacktestResult:
+    """回测结果"""
+    equity: np.ndarray           # 每根K线收盘后的总资产
+    position: np.ndarray         # 每根K线收盘后的持仓股数
+    trades: np.ndarray           # TRADE_DTYPE 成交记录
+    metrics: Dict[str, Any]
+
+    def trades_frame(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """成交记录转为 DataFrame，传入行情索引时附带成交时间"""
+        frame = pd.DataFrame(self.trades)
+        if index is not None and len(frame):
+            frame.insert(0, 'time', index[frame['bar'].to_numpy()])
+        return frame
+
+class BacktestEngine:
+    """单标的多头回测引擎
+
+    信号大于0表示持有，否则空仓（A股不可做空）。第t根K线收盘后产生的信号在第t+1根K线
+    按成交参考价（通常为开盘价）成交。未传入的参数读取 config.trading。
+
+    Args:
+        capital: 初始资金
+        commission_rate: 佣金费率（买卖双向）
+        slippage: 滑点比例，买入价上浮、卖出价下浮
+        max_position_ratio: 开仓时可用资金比例
+        lot_size: 每手股数
+        t_plus_one: 是否执行T+1，当日买入次日才能卖出
+        periods_per_year: 每年K线数量，用于年化
+    """
+
+    def __init__(self, capital: Optional[float] = None, commission_rate: Optional[float] = None,
+                 slippage: Optional[float] = None, max_position_ratio: Optional[float] = None,
+                 lot_size: Optional[int] = None, t_plus_one: bool = True, periods_per_year: int = 252):
+        trading = config.trading
+        self.capital = float(trading.default_capital if capital is None else capital)
+        self.commission_rate = float(trading.commission_rate if commission_rate is None else commission_rate)
+        self.slippage = float(trading.slippage if slippage is None else slippage)
+        self.max_position_ratio = float(trading.max_position_ratio if max_position_ratio is None
+                                        else max_position_ratio)
+        self.lot_size = int(trading.min_order_quantity if lot_size is None else lot_size)
+        self.t_plus_one = t_plus_one
+        self.periods_per_year = periods_per_year
+
+    def run(self, close: np.ndarray, signal: np.ndarray, fill_price: Optional[np.ndarray] = None,
+            days: Optional[np.ndarray] = None, risk_free_rate: float = 0.03) -> BacktestResult:
+        """执行回测
+
+        Args:
+            close: 收盘价，用于逐K线估值
+            signal: 持仓信号，与 close 等长
+            fill_price: 成交参考价（如开盘价），默认使用收盘价
+            days: 每根K线所属交易日的整数编号，用于T+1判断，默认每根K线为一个交易日
+        """
+        close = np.asarray(close, dtype=np.float64)
+        n_bars = len(close)
+        if n_bars < 2:
+            raise ValueError("数据长度不足，无法回测")
+        if len(signal) != n_bars:
+            raise ValueError(f"信号长度({len(signal)})与价格长度({n_bars})不一致")
+        fill_price = close if fill_price is None else np.asarray(fill_price, dtype=np.float64)
+        if days is None:
+            days = np.arange(n_bars, dtype=np.int64)
+
+        # 信号转委托：目标持仓发生变化的K线，在下一根K线成交
+        target = np.asarray(signal) > 0
+        order_bars = np.flatnonzero(target[1:] != target[:-1]) + 1
+        if target[0]:
+            order_bars = np.concatenate(([0], order_bars))
+        fill_bars = order_bars + 1
+        fill_bars = fill_bars[fill_bars < n_bars]
+        sides = np.where(target[fill_bars - 1], 1, -1).astype(np.int8)
+        slip = np.where(sides > 0, 1.0 + self.slippage, 1.0 - self.slippage)
+        prices = fill_price[fill_bars] * slip
+
+        # T+1：每根K线之后第一个新交易日的首根K线下标
+        next_day_bar = np.searchsorted(days, days, side='right')
+
+        trades = self._settle(fill_bars, sides, prices, fill_price, days, next_day_bar)
+
+        # 逐K线持仓与现金：成交处记增量再累加
+        position_delta = np.zeros(n_bars, dtype=np.int64)
+        cash_delta = np.zeros(n_bars, dtype=np.float64)
+        signed_volume = trades['side'].astype(np.int64) * trades['volume']
+        np.add.at(position_delta, trades['bar'], signed_volume)
+        np.add.at(cash_delta, trades['bar'], -trades['price'] * signed_volume - trades['commission'])
+        position = np.cumsum(position_delta)
+        equity = self.capital + np.cumsum(cash_delta) + position * close
+
+        metrics = self._metrics(equity, trades, risk_free_rate)
+        return BacktestResult(equity=equity, position=position, trades=trades, metrics=metrics)
+
+    def _settle(self, fill_bars: np.ndarray, sides: np.ndarray, prices: np.ndarray, fill_price: np.ndarray,
+                days: np.ndarray, next_day_bar: np.ndarray) -> np.ndarray:
+        """按成交事件顺序记账，返回成交记录"""
+        trades = np.zeros(len(fill_bars), dtype=TRADE_DTYPE)
+        n_bars = len(fill_price)
+        rate, lot, ratio = self.commission_rate, self.lot_size, self.max_position_ratio
+        cash = self.capital
+        volume = 0
+        cost_basis = 0.0
+        buy_day = -1
+        count = 0
+
+        for i in range(len(fill_bars)):
+            bar = int(fill_bars[i])
+            if sides[i] > 0:
+                if volume:
+                    # 因T+1未能卖出的持仓在信号转回多头时继续持有
+                    continue
+                price = float(prices[i])
+                shares = int(cash * ratio / (price * (1.0 + rate)) / lot) * lot
+                if shares <= 0:
+                    continue
+                amount = price * shares
+                commission = amount * rate
+                cash -= amount + commission
+                volume = shares
+                cost_basis = amount + commission
+                buy_day = days[bar]
+                trades[count] = (bar, 1, price, shares, commission, 0.0)
+                count += 1
+            else:
+                if not volume:
+                    continue
+                price = float(prices[i])
+                if self.t_plus_one and days[bar] <= buy_day:
+                    # 当日买入的持仓顺延到下一交易日首根K线卖出；之前信号转回多头则继续持有
+                    bar = int(next_day_bar[bar])
+                    next_buy = fill_bars[i + 1] if i + 1 < len(fill_bars) else n_bars
+                    if bar >= n_bars or next_buy <= bar:
+                        continue
+                    price = float(fill_price[bar]) * (1.0 - self.slippage)
+                amount = price * volume
+                commission = amount * rate
+                cash += amount - commission
+                trades[count] = (bar, -1, price, volume, commission, amount - commission - cost_basis)
+                count += 1
+                volume = 0
+
+        return trades[:count]
+
+    def _metrics(self, equity: np.ndarray, trades: np.ndarray, risk_free_rate: float) -> Dict[str, Any]:
+        """由净值曲线和成交记录计算绩效指标"""
+        n = len(equity) - 1
+        nav = np.empty(len(equity) + 1)
+        nav[0] = self.capital
+        nav[1:] = equity
+        returns = nav[2:] / nav[1:-1] - 1.0
+
+        final_return = equity[-1] / self.capital - 1.0
+        annual_return = (1 + final_return) ** (self.periods_per_year / n) - 1 if final_return > -1 else -1.0
+        peak = np.maximum.accumulate(nav)
+        max_drawdown = float(((nav - peak) / peak).min())
+        volatility = returns.std(ddof=1) * np.sqrt(self.periods_per_year) if n > 1 else 0
+        sharpe_ratio = (annual_return - risk_free_rate) / volatility if volatility > 0 else 0
+        downside_vol = np.sqrt(np.square(np.minimum(returns, 0.0)).mean() * self.periods_per_year) if n else 0
+        sortino_ratio = (annual_return - risk_free_rate) / downside_vol if downside_vol > 0 else 0
+        calmar_ratio = annual_return / -max_drawdown if max_drawdown < 0 else 0
+
+        sells = trades[trades['side'] < 0]
+        n_round_trips = len(sells)
+        win_rate = float((sells['pnl'] > 0).mean()) if n_round_trips else 0
+        turnover = float((trades['price'] * trades['volume']).sum())
+
+        return {
+            'final_return': float(final_return),
+            'annual_return': float(annual_return),
+            'max_drawdown': max_drawdown,
+            'volatility': float(volatility),
+            'sharpe_ratio': float(sharpe_ratio),
+            'sortino_ratio': float(sortino_ratio),
+            'calmar_ratio': float(calmar_ratio),
+            'total_trades': len(trades),
+            'round_trips': n_round_trips,
+            'win_rate': win_rate,
+            'avg_trade_pnl': float(sells['pnl'].mean()) if n_round_trips else 0,
+            'total_commission': float(trades['commission'].sum()),
+            'turnover': turnover,
+            'initial_capital': self.capital,
+            'final_equity': float(equity[-1]),
+            'trading_days': n,
+        }
+
+def trading_day_ids(index: pd.Index) -> Optional[np.ndarray]:
+    """从行情时间索引得到每根K线所属交易日的整数编号，非时间索引返回None"""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.to_numpy().astype('datetime64[D]').astype(np.int64)
+    return None
@@ -0,0 +1,80 @@
+"""
+信号策略基类
+子类只需由收盘价等行情列计算持仓信号，回测与指标计算复用双均线策略的 NumPy 内核，口径一致
+"""
+
+import logging
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from .ma_strategy import PERIODS_PER_YEAR, MABacktestKernel
+
+logger = logging.getLogger(__name__)
+
+class SignalStrategy:
+    """基于持仓信号的策略基类
+
+    信号为1表示做多，-1表示做空，0表示空仓；第t根K线的信号决定第t+1根K线的收益。
+    """
+
+    strategy_type = 'signal'
+
+    def __init__(self, period: str = '1d'):
+        self.period = period
+        self.periods_per_year = PERIODS_PER_YEAR.get(period, 252)
+        self._kernel = MABacktestKernel()
+
+    def indicators(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """计算信号所需的指标列"""
+        raise NotImplementedError
+
+    def signal_array(self, data: pd.DataFrame) -> np.ndarray:
+        """计算持仓信号数组"""
+        raise NotImplementedError
+
+    def params(self) -> Dict[str, Any]:
+        """策略参数，写入回测指标"""
+        return {}
+
+    def calculate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+        """返回附加指标列与 signal、signal_change 列的行情数据"""
+        if data is None or data.empty:
+            raise ValueError("数据不能为空")
+        signal = pd.Series(self.signal_array(data), index=data.index)
+        return data.assign(**self.indicators(data), signal=signal, signal_change=signal.diff())
+
+    def backtest(self, data: pd.DataFrame, with_data: bool = False) -> Dict[str, Any]:
+        """执行回测
+
+        Args:
+            data: 含 close 列的行情数据，不含缺失价格
+            with_data: 是否同时返回带指标与信号列的 DataFrame
+        """
+        try:
+            if data is None or data.empty:
+                raise ValueError("数据不能为空")
+            close = data['close'].to_numpy(dtype=np.float64)
+            if np.isnan(close).any():
+                raise ValueError("收盘价包含缺失值，请先清洗数据")
+            signal = self.signal_array(data)
+            metrics = self._kernel.evaluate(close, signal, self.periods_per_year)
+            metrics.update(self.params())
+            metrics['period'] = self.period
+            metrics['strategy_type'] = self.strategy_type
+
+            result = {
+                'metrics': metrics,
+                'success': True
+            }
+            if with_data:
+                result['data'] = self.calculate_signals(data)
+            return result
+
+        except Exception as e:
+            logger.error(f"{self.strategy_type}策略回测失败: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
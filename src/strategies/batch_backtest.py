@@ -0,0 +1,129 @@
+"""
+批量回测模块
+一次批量拉取整个股票池的行情，按批次分发到进程池并行回测，
+返回每只股票一行的指标表，单只股票失败不影响其他股票
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from ..config import config
+from ..utils.xtquant_client import xt_client
+from .ma_strategy import PERIODS_PER_YEAR, MABacktestKernel
+
+logger = logging.getLogger(__name__)
+
+def _backtest_batch(symbols: List[str], closes: np.ndarray, short_period: int, long_period: int,
+                    periods_per_year: int) -> List[Dict[str, Any]]:
+    """进程池工作函数：回测一批股票，逐只捕获异常，批内复用同一组内核缓冲区"""
+    kernel = MABacktestKernel(closes.shape[1] if closes.ndim == 2 else 0)
+    rows = []
+    for symbol, close in zip(symbols, closes):
+        row: Dict[str, Any] = {'symbol': symbol}
+        try:
+            # 合并面板的时间轴是并集，去掉该股票未交易的时间点
+            close = close[~np.isnan(close)]
+            if len(close) <= long_period:
+                raise ValueError(f"数据长度({len(close)})不足长期均线周期({long_period})")
+            metrics = kernel.run(close, short_period, long_period, periods_per_year)
+            if 'error' in metrics:
+                raise ValueError(metrics['error'])
+            row.update(metrics)
+        except Exception as e:
+            row['error'] = str(e)
+        rows.append(row)
+    return rows
+
+class BatchBacktester:
+    """股票池批量回测
+
+    Args:
+        short_period: 短期均线周期
+        long_period: 长期均线周期
+        period: K线周期
+        max_workers: 进程数，默认读取 BACKTEST_WORKERS
+        batch_size: 每个任务包含的股票数，默认读取 BACKTEST_BATCH_SIZE
+    """
+
+    def __init__(self, short_period: int = 5, long_period: int = 20, period: str = '1d',
+                 max_workers: Optional[int] = None, batch_size: Optional[int] = None):
+        if short_period >= long_period:
+            raise ValueError(f"短期均线周期({short_period})必须小于长期均线周期({long_period})")
+        self.short_period = short_period
+        self.long_period = long_period
+        self.period = period
+        self.periods_per_year = PERIODS_PER_YEAR.get(period, 252)
+        self.max_workers = max(1, max_workers or config.executor.backtest_workers)
+        self.batch_size = max(1, batch_size or config.executor.backtest_batch_size)
+
+    def run(self, universe: Union[str, Sequence[str]], start_date: str, end_date: str) -> pd.DataFrame:
+        """对股票池执行回测
+
+        Args:
+            universe: 板块名称（如 '沪深A股'）或股票代码列表
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+
+        Returns:
+            以股票代码为索引的指标表，失败的股票在 error 列给出原因
+        """
+        if isinstance(universe, str):
+            symbols = xt_client.get_stock_list(universe)
+            if not symbols:
+                raise ValueError(f"无法获取板块 {universe} 的股票列表")
+        else:
+            symbols = [xt_client.resolve_symbol(symbol) for symbol in universe]
+
+        fetched = xt_client.fetch_many(symbols, start_date, end_date, self.period)
+        if fetched.panel is not None:
+            results = self.backtest_closes(fetched.panel.symbols, fetched.panel.field('close'))
+        else:
+            results = pd.DataFrame(columns=['error']).rename_axis('symbol')
+
+        if fetched.failed:
+            failed = pd.DataFrame({'error': pd.Series(fetched.failed)}).rename_axis('symbol')
+            results = pd.concat([results, failed])
+        return results
+
+    def backtest_closes(self, symbols: Sequence[str], closes: np.ndarray) -> pd.DataFrame:
+        """对 (symbol, time) 收盘价矩阵执行并行回测，NaN 表示该时间点无数据"""
+        symbols = list(symbols)
+        closes = np.asarray(closes, dtype=np.float64)
+        batches = [(symbols[i:i + self.batch_size], closes[i:i + self.batch_size])
+                   for i in range(0, len(symbols), self.batch_size)]
+
+        logger.info(f"批量回测{len(symbols)}只股票: {len(batches)}批, {self.max_workers}进程")
+
+        rows: List[Dict[str, Any]] = []
+        if self.max_workers == 1 or len(batches) == 1:
+            for batch_symbols, batch_closes in batches:
+                rows.extend(self._run_batch(batch_symbols, batch_closes))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                futures = [
+                    (batch_symbols, executor.submit(_backtest_batch, batch_symbols, batch_closes,
+                                                    self.short_period, self.long_period, self.periods_per_year))
+                    for batch_symbols, batch_closes in batches
+                ]
+                for batch_symbols, future in futures:
+                    try:
+                        rows.extend(future.result())
+                    except Exception as e:
+                        # 工作进程崩溃时整批标记失败
+                        logger.error(f"回测批次失败: {e}")
+                        rows.extend({'symbol': symbol, 'error': f"回测进程异常: {e}"} for symbol in batch_symbols)
+
+        results = pd.DataFrame(rows).set_index('symbol')
+        if 'error' not in results.columns:
+            results['error'] = None
+        n_failed = int(results['error'].notna().sum())
+        if n_failed:
+            logger.warning(f"批量回测完成，{n_failed}只股票失败")
+        return results
+
+    def _run_batch(self, symbols: List[str], closes: np.ndarray) -> List[Dict[str, Any]]:
+        return _backtest_batch(symbols, closes, self.short_period, self.long_period, self.periods_per_year)
@@ -0,0 +1,169 @@
+"""
+双均线增量状态模块
+为每只股票维护定长环形缓冲区和窗口累加和，每根新K线/新行情 O(1) 更新均线并输出交叉事件，
+多只股票的状态存放在同一组数组中，可一次向量化更新整个股票池
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 价格按 1/PRICE_SCALE 取整为整数后累加，窗口和无舍入误差。
+# 价格落在 1/PRICE_SCALE 价位网格上时（A股最小价位 0.01，ETF 为 0.001），
+# 均线比较结果与逐窗口重新计算完全一致
+PRICE_SCALE = 1000
+
+class MAState:
+    """多股票双均线增量状态
+
+    信号口径与 MAStrategy.calculate_signals 相同：短均线在上为1，在下为-1，相等或窗口未满为0。
+    事件为信号变化量（对应 signal_change），大于0为买入，小于0为卖出。
+
+    与批量计算逐K线一致的前提是价格落在 1/price_scale 的价位网格上（未复权行情）。
+    复权价格不在网格上，取整后两条均线的差值小于取整误差时信号可能与浮点计算不同；
+    使用复权价格时应传入更大的 price_scale，或接受均线接近相等处的差异。
+
+    Args:
+        symbols: 跟踪的股票代码
+        short_period: 短期均线周期
+        long_period: 长期均线周期
+        price_scale: 价格取整精度的倒数
+    """
+
+    def __init__(self, symbols: Sequence[str], short_period: int = 5, long_period: int = 20,
+                 price_scale: int = PRICE_SCALE):
+        if short_period >= long_period:
+            raise ValueError(f"短期均线周期({short_period})必须小于长期均线周期({long_period})")
+        self.symbols = list(symbols)
+        self.short_period = short_period
+        self.long_period = long_period
+        self.price_scale = price_scale
+        self._index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        n = len(self.symbols)
+        # 环形缓冲区只需保留长周期窗口，短周期窗口的移出值同样从中读取
+        self._ring = np.zeros((n, long_period), dtype=np.int64)
+        self._pos = np.zeros(n, dtype=np.int64)
+        self._count = np.zeros(n, dtype=np.int64)
+        self._sum_short = np.zeros(n, dtype=np.int64)
+        self._sum_long = np.zeros(n, dtype=np.int64)
+        self._signal = np.zeros(n, dtype=np.int8)
+
+    @classmethod
+    def from_history(cls, symbols: Sequence[str], closes: np.ndarray, short_period: int = 5,
+                     long_period: int = 20, price_scale: int = PRICE_SCALE) -> 'MAState':
+        """用 (symbol, time) 历史收盘价初始化状态，NaN 视为该时间点无数据"""
+        state = cls(symbols, short_period, long_period, price_scale)
+        for column in np.asarray(closes, dtype=np.float64).T:
+            state.update_many(column)
+        return state
+
+    def update(self, symbol: str, price: float) -> int:
+        """单只股票追加一个价格，返回信号变化量"""
+        i = self._index[symbol]
+        value = int(round(price * self.price_scale))
+        ring = self._ring[i]
+        pos = int(self._pos[i])
+        count = int(self._count[i])
+        long_period, short_period = self.long_period, self.short_period
+
+        sum_long = int(self._sum_long[i]) + value
+        sum_short = int(self._sum_short[i]) + value
+        if count >= long_period:
+            sum_long -= int(ring[pos])
+        if count >= short_period:
+            sum_short -= int(ring[(pos - short_period) % long_period])
+        ring[pos] = value
+        self._pos[i] = (pos + 1) % long_period
+        self._count[i] = count + 1
+        self._sum_long[i] = sum_long
+        self._sum_short[i] = sum_short
+
+        signal = 0
+        if count + 1 >= long_period:
+            # ma_short > ma_long  <=>  sum_short * long > sum_long * short，整数比较无误差
+            diff = sum_short * long_period - sum_long * short_period
+            signal = (diff > 0) - (diff < 0)
+        change = signal - int(self._signal[i])
+        self._signal[i] = signal
+        return change
+
+    def update_many(self, prices: np.ndarray, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """向量化追加一批价格，返回各股票的信号变化量
+
+        Args:
+            prices: 价格数组，NaN 表示该股票本次无更新
+            indices: prices 对应的股票下标（不可重复），默认为全部股票（prices 与 symbols 等长）
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if indices is None:
+            indices = np.arange(len(self.symbols))
+        else:
+            indices = np.asarray(indices, dtype=np.int64)
+        valid = ~np.isnan(prices)
+        changes = np.zeros(len(prices), dtype=np.int8)
+        if not valid.all():
+            prices, idx = prices[valid], indices[valid]
+        else:
+            idx = indices
+
+        values = np.rint(prices * self.price_scale).astype(np.int64)
+        pos = self._pos[idx]
+        count = self._count[idx]
+        long_period, short_period = self.long_period, self.short_period
+
+        leaving_long = np.where(count >= long_period, self._ring[idx, pos], 0)
+        leaving_short = np.where(count >= short_period, self._ring[idx, (pos - short_period) % long_period], 0)
+        sum_long = self._sum_long[idx] + values - leaving_long
+        sum_short = self._sum_short[idx] + values - leaving_short
+
+        self._ring[idx, pos] = values
+        self._pos[idx] = (pos + 1) % long_period
+        count = count + 1
+        self._count[idx] = count
+        self._sum_long[idx] = sum_long
+        self._sum_short[idx] = sum_short
+
+        diff = sum_short * long_period - sum_long * short_period
+        signal = np.where(count >= long_period, np.sign(diff), 0).astype(np.int8)
+        changes[valid] = signal - self._signal[idx]
+        self._signal[idx] = signal
+        return changes
+
+    def signal(self, symbol: str) -> int:
+        """当前持仓信号"""
+        return int(self._signal[self._index[symbol]])
+
+    def signals(self) -> np.ndarray:
+        """全部股票的当前信号（与 symbols 顺序一致）"""
+        return self._signal.copy()
+
+    def moving_averages(self, symbol: str) -> Tuple[Optional[float], Optional[float]]:
+        """当前短、长均线，窗口未满时为None"""
+        i = self._index[symbol]
+        count = int(self._count[i])
+        ma_short = self._sum_short[i] / (self.short_period * self.price_scale) \
+            if count >= self.short_period else None
+        ma_long = self._sum_long[i] / (self.long_period * self.price_scale) \
+            if count >= self.long_period else None
+        return ma_short, ma_long
+
+    def reset(self, symbols: Optional[Iterable[str]] = None):
+        """清空指定股票（默认全部）的状态"""
+        idx = slice(None) if symbols is None else [self._index[symbol] for symbol in symbols]
+        for array in (self._ring, self._pos, self._count, self._sum_short, self._sum_long, self._signal):
+            array[idx] = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self._ring, self._pos, self._count,
+                                              self._sum_short, self._sum_long, self._signal))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
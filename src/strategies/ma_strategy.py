@@ -8,14 +8,195 @@ import numpy as np
 import logging
 from typing import Dict, Any, Optional
 
+from ..utils.data_handler import DataHandler
+from ..utils.indicator_cache import cached_indicator
+from .metrics import batch_metrics, metrics_row
+
 logger = logging.getLogger(__name__)
 
+# 各周期每年的K线数量，用于年化收益和波动率（A股每日交易240分钟）
+PERIODS_PER_YEAR = {
+    '1d': 252,
+    '1h': 252 * 4,
+    '30m': 252 * 8,
+    '15m': 252 * 16,
+    '5m': 252 * 48,
+    '1m': 252 * 240,
+    'tick': 252 * 4800,
+}
+
+# 均线差值小于该相对阈值（乘以最大收盘价）时视为相等，信号为0，
+# 避免不同计算路径的舍入误差让恰好相等的均线落到不同方向
+TIE_TOLERANCE = 1e-9
+
+class MABacktestKernel:
+    """双均线回测的纯 NumPy 内核
+
+    输入收盘价数组直接输出指标字典，不构造中间 DataFrame；evaluate 可对任意持仓信号计算同口径指标。
+    固定数量的缓冲区按最长序列预分配，多次调用间复用；实例非线程安全。
+    """
+
+    def __init__(self, capacity: int = 0):
+        self.capacity = 0
+        self._reserve(capacity)
+
+    def run(self, close: np.ndarray, short_period: int, long_period: int, periods_per_year: int = 252,
+            risk_free_rate: float = 0.03) -> Dict[str, Any]:
+        """计算双均线策略指标，口径与 MAStrategy.calculate_metrics 一致
+
+        Args:
+            close: 一维收盘价数组，不含NaN
+        """
+        close = np.asarray(close, dtype=np.float64)
+        if len(close) < 2:
+            return {'error': '没有有效的策略收益数据'}
+        signal = self._ma_signal(close, short_period, long_period)
+        return self.evaluate(close, signal, periods_per_year, risk_free_rate)
+
+    def signals(self, close: np.ndarray, short_period: int, long_period: int) -> np.ndarray:
+        """双均线持仓信号（int8 数组）"""
+        close = np.asarray(close, dtype=np.float64)
+        return self._ma_signal(close, short_period, long_period).copy()
+
+    def evaluate(self, close: np.ndarray, signal: np.ndarray, periods_per_year: int = 252,
+                 risk_free_rate: float = 0.03) -> Dict[str, Any]:
+        """按任意持仓信号计算指标，信号滞后一期生效
+
+        Args:
+            close: 一维收盘价数组，不含NaN
+            signal: 与 close 等长的持仓信号
+        """
+        close = np.asarray(close, dtype=np.float64)
+        n_bars = len(close)
+        if n_bars < 2:
+            return {'error': '没有有效的策略收益数据'}
+        if len(signal) != n_bars:
+            raise ValueError(f"信号长度({len(signal)})与价格长度({n_bars})不一致")
+        self._reserve(n_bars)
+        n = n_bars - 1
+        a = self._a[:n_bars]
+        b = self._b[:n_bars]
+        mask = self._mask[:n_bars]
+        mask2 = self._mask2[:n_bars]
+
+        # 策略收益：信号滞后一期
+        strategy_returns = a[:n]
+        np.divide(close[1:], close[:-1], out=strategy_returns)
+        strategy_returns -= 1.0
+        strategy_returns *= signal[:-1]
+
+        # 净值与回撤（净值首项为1）
+        equity = b
+        equity[0] = 1.0
+        np.add(strategy_returns, 1.0, out=equity[1:])
+        np.cumprod(equity, out=equity)
+        peak = self._peak[:n_bars]
+        np.maximum.accumulate(equity, out=peak)
+        final_return = equity[-1] - 1.0
+        np.subtract(equity, peak, out=equity)
+        np.divide(equity, peak, out=equity)
+        max_drawdown = equity.min()
+
+        annual_return = (1 + final_return) ** (periods_per_year / n) - 1
+        volatility = strategy_returns.std(ddof=1) * np.sqrt(periods_per_year) if n > 1 else 0
+        sharpe_ratio = (annual_return - risk_free_rate) / volatility if volatility > 0 else 0
+        calmar_ratio = annual_return / -max_drawdown if max_drawdown < 0 else 0
+
+        # 下行波动率（目标收益为0），equity 缓冲区此后不再使用
+        downside = equity[:n]
+        np.minimum(strategy_returns, 0.0, out=downside)
+        downside_vol = np.sqrt(np.dot(downside, downside) / n * periods_per_year)
+        sortino_ratio = (annual_return - risk_free_rate) / downside_vol if downside_vol > 0 else 0
+
+        # 年化换手率：第t期收益对应的持仓为 signal[t-1]，建仓计入一次
+        turnover = (abs(float(signal[0])) + float(np.abs(np.diff(signal[:n])).sum())) / n * periods_per_year
+
+        # 与 signal.diff() != 0 的口径一致（首期差分为NaN，同样计入）
+        np.not_equal(signal[1:], signal[:-1], out=mask[:n])
+        total_trades = int(np.count_nonzero(mask[:n])) + 1
+
+        wins, losses = mask[:n], mask2[:n]
+        np.greater(strategy_returns, 0, out=wins)
+        np.less(strategy_returns, 0, out=losses)
+        n_wins = int(np.count_nonzero(wins))
+        n_losses = int(np.count_nonzero(losses))
+        n_active = int(np.count_nonzero(strategy_returns))
+        win_rate = n_wins / n_active if n_active > 0 else 0
+        avg_win = strategy_returns.sum(where=wins) / n_wins if n_wins > 0 else 0
+        avg_loss = strategy_returns.sum(where=losses) / n_losses if n_losses > 0 else 0
+
+        return {
+            'final_return': float(final_return),
+            'annual_return': float(annual_return),
+            'max_drawdown': float(max_drawdown),
+            'volatility': float(volatility),
+            'sharpe_ratio': float(sharpe_ratio),
+            'sortino_ratio': float(sortino_ratio),
+            'calmar_ratio': float(calmar_ratio),
+            'total_trades': total_trades,
+            'win_rate': float(win_rate),
+            'avg_return': float(strategy_returns.mean()),
+            'avg_win': float(avg_win),
+            'avg_loss': float(avg_loss),
+            'turnover': float(turnover),
+            'trading_days': n
+        }
+
+    def _ma_signal(self, close: np.ndarray, short_period: int, long_period: int) -> np.ndarray:
+        """在缓冲区中计算双均线信号，返回缓冲区视图"""
+        n_bars = len(close)
+        self._reserve(n_bars)
+        csum = self._csum[:n_bars + 1]
+        a = self._a[:n_bars]
+        b = self._b[:n_bars]
+        signal = self._signal[:n_bars]
+
+        # 均线差：减去首价后做一次累加和，窗口和相减得到均线
+        np.subtract(close, close[0], out=a)
+        csum[0] = 0.0
+        np.cumsum(a, out=csum[1:])
+        b[:] = 0.0
+        if long_period <= n_bars:
+            ma_short = a[long_period - 1:]
+            ma_long = b[long_period - 1:]
+            np.subtract(csum[long_period:], csum[:n_bars + 1 - long_period], out=ma_long)
+            ma_long /= long_period
+            np.subtract(csum[long_period:], csum[long_period - short_period:n_bars + 1 - short_period],
+                        out=ma_short)
+            ma_short /= short_period
+            np.subtract(ma_short, ma_long, out=ma_long)
+
+        # 信号：b 为均线差（长均线未满窗口处为0）
+        tol = TIE_TOLERANCE * max(float(close.max()), -float(close.min()))
+        np.greater(b, tol, out=self._mask[:n_bars])
+        np.less(b, -tol, out=self._mask2[:n_bars])
+        np.subtract(self._mask[:n_bars].view(np.int8), self._mask2[:n_bars].view(np.int8), out=signal)
+        return signal
+
+    def _reserve(self, n_bars: int):
+        """按需扩容缓冲区"""
+        if n_bars <= self.capacity:
+            return
+        self.capacity = n_bars
+        self._csum = np.empty(n_bars + 1, dtype=np.float64)
+        self._a = np.empty(n_bars, dtype=np.float64)
+        self._b = np.empty(n_bars, dtype=np.float64)
+        self._peak = np.empty(n_bars, dtype=np.float64)
+        self._signal = np.empty(n_bars, dtype=np.int8)
+        self._mask = np.empty(n_bars, dtype=np.bool_)
+        self._mask2 = np.empty(n_bars, dtype=np.bool_)
+
 class MAStrategy:
     """双均线策略实现"""
     
-    def __init__(self, short_period: int = 5, long_period: int = 20):
+    strategy_type = 'ma_cross'
+    
+    def __init__(self, short_period: int = 5, long_period: int = 20, period: str = '1d'):
         self.short_period = short_period
         self.long_period = long_period
+        self.period = period
+        self.periods_per_year = PERIODS_PER_YEAR.get(period, 252)
+        self._kernel = MABacktestKernel()
         
     def calculate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
         """计算交易信号"""
@@ -24,14 +205,16 @@ class MAStrategy:
         
         data = data.copy()
         
-        # 计算均线
-        data['ma_short'] = data['close'].rolling(window=self.short_period).mean()
-        data['ma_long'] = data['close'].rolling(window=self.long_period).mean()
+        # 计算均线（data.attrs 带有股票代码时复用指标缓存）
+        data['ma_short'] = cached_indicator(data, 'sma', window=self.short_period)
+        data['ma_long'] = cached_indicator(data, 'sma', window=self.long_period)
         
-        # 生成交易信号
+        # 生成交易信号（差值在容差内视为均线相等）
+        diff = data['ma_short'] - data['ma_long']
+        tol = TIE_TOLERANCE * data['close'].abs().max()
         data['signal'] = 0
-        data.loc[data['ma_short'] > data['ma_long'], 'signal'] = 1  # 买入信号
-        data.loc[data['ma_short'] < data['ma_long'], 'signal'] = -1  # 卖出信号
+        data.loc[diff > tol, 'signal'] = 1  # 买入信号
+        data.loc[diff < -tol, 'signal'] = -1  # 卖出信号
         
         # 标记信号变化点
         data['signal_change'] = data['signal'].diff()
@@ -58,71 +241,37 @@ class MAStrategy:
     
     def calculate_metrics(self, data: pd.DataFrame) -> Dict[str, Any]:
         """计算策略绩效指标"""
+        # 确保数据包含必要的列
+        if 'strategy_returns' not in data.columns:
+            data = self.calculate_returns(data)
+
+        strategy_returns = data['strategy_returns'].to_numpy(dtype=np.float64)
+        if not (~np.isnan(strategy_returns)).any():
+            return {'error': '没有有效的策略收益数据'}
+
+        held = data['signal'].shift(1).to_numpy(dtype=np.float64)
+        metrics = metrics_row(batch_metrics(strategy_returns, held, self.periods_per_year))
+        # 交易次数按 signal.diff() != 0 统计（首期差分为NaN，同样计入）
+        metrics['total_trades'] = int((data['signal'].diff() != 0).sum())
+        return metrics
+
+    def backtest(self, data: pd.DataFrame, with_data: bool = True) -> Dict[str, Any]:
+        """执行完整回测
+
+        Args:
+            data: 含 close 列的行情数据
+            with_data: 是否返回带信号、收益列的明细 DataFrame；为False时走 NumPy 内核，只返回指标
+        """
         try:
-            # 确保数据包含必要的列
-            if 'strategy_returns' not in data.columns:
-                data = self.calculate_returns(data)
-            
-            strategy_returns = data['strategy_returns'].dropna()
-            cumulative_returns = data['cumulative_strategy_returns'].dropna()
-            
-            if len(strategy_returns) == 0:
-                return {'error': '没有有效的策略收益数据'}
-            
-            # 总收益率
-            final_return = cumulative_returns.iloc[-1] - 1 if len(cumulative_returns) > 0 else 0
-            
-            # 年化收益率
-            trading_days = len(strategy_returns)
-            annual_return = (1 + final_return) ** (252 / trading_days) - 1 if trading_days > 0 else 0
-            
-            # 最大回撤
-            peak = cumulative_returns.expanding().max()
-            drawdown = (cumulative_returns - peak) / peak
-            max_drawdown = drawdown.min()
-            
-            # 波动率
-            volatility = strategy_returns.std() * np.sqrt(252) if len(strategy_returns) > 1 else 0
-            
-            # 夏普比率 (假设无风险利率为3%)
-            risk_free_rate = 0.03
-            sharpe_ratio = (annual_return - risk_free_rate) / volatility if volatility > 0 else 0
-            
-            # 交易统计
-            signals = data['signal'].diff()
-            total_trades = int((signals != 0).sum())
-            
-            # 胜率
-            winning_trades = (strategy_returns > 0).sum()
-            total_trade_periods = (strategy_returns != 0).sum()
-            win_rate = winning_trades / total_trade_periods if total_trade_periods > 0 else 0
-            
-            # 平均收益
-            avg_return = strategy_returns.mean()
-            avg_win = strategy_returns[strategy_returns > 0].mean() if winning_trades > 0 else 0
-            avg_loss = strategy_returns[strategy_returns < 0].mean() if (strategy_returns < 0).sum() > 0 else 0
-            
-            return {
-                'final_return': float(final_return),
-                'annual_return': float(annual_return),
-                'max_drawdown': float(max_drawdown),
-                'volatility': float(volatility),
-                'sharpe_ratio': float(sharpe_ratio),
-                'total_trades': total_trades,
-                'win_rate': float(win_rate),
-                'avg_return': float(avg_return),
-                'avg_win': float(avg_win),
-                'avg_loss': float(avg_loss),
-                'trading_days': trading_days
-            }
-            
-        except Exception as e:
-            logger.error(f"计算策略指标失败: {e}")
-            return {'error': str(e)}
-    
-    def backtest(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """执行完整回测"""
-        try:
+            if not with_data:
+                close = data['close'].to_numpy(dtype=np.float64)
+                # 含缺失价格时由 DataFrame 路径处理
+                if not np.isnan(close).any():
+                    return {
+                        'metrics': self.backtest_array(close),
+                        'success': True
+                    }
+
             # 计算信号
             data_with_signals = self.calculate_signals(data)
             
@@ -131,21 +280,70 @@ class MAStrategy:
             
             # 计算指标
             metrics = self.calculate_metrics(data_with_returns)
+            self._add_params(metrics)
             
-            # 添加策略参数信息
-            metrics['short_period'] = self.short_period
-            metrics['long_period'] = self.long_period
-            metrics['strategy_type'] = 'ma_cross'
-            
-            return {
+            result = {
                 'metrics': metrics,
-                'data': data_with_returns,
                 'success': True
             }
+            if with_data:
+                result['data'] = data_with_returns
+            return result
             
         except Exception as e:
             logger.error(f"回测执行失败: {e}")
             return {
                 'success': False,
                 'error': str(e)
-            } 
\ No newline at end of file
+            } 
+    
+    def backtest_array(self, close: np.ndarray) -> Dict[str, Any]:
+        """用 NumPy 内核对收盘价数组回测，返回指标字典"""
+        if self.short_period >= self.long_period:
+            raise ValueError(f"短期均线周期({self.short_period})必须小于长期均线周期({self.long_period})")
+        metrics = self._kernel.run(close, self.short_period, self.long_period, self.periods_per_year)
+        return self._add_params(metrics)
+    
+    def signal_array(self, data: pd.DataFrame) -> np.ndarray:
+        """计算持仓信号数组，口径与 calculate_signals 的 signal 列一致"""
+        return self._kernel.signals(data['close'].to_numpy(dtype=np.float64), self.short_period, self.long_period)
+    
+    def params(self) -> Dict[str, Any]:
+        """策略参数"""
+        return {
+            'short_period': self.short_period,
+            'long_period': self.long_period,
+        }
+    
+    def _add_params(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """添加策略参数信息"""
+        metrics.update(self.params())
+        metrics['period'] = self.period
+        metrics['strategy_type'] = self.strategy_type
+        return metrics
+    
+    def compact_report(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """对比标准表示与紧凑表示的内存占用，以及紧凑表示给回测指标带来的数值误差"""
+        compact = DataHandler.compact_market_data(data)
+        
+        full_metrics = self.backtest(data)['metrics']
+        compact_metrics = self.backtest(compact)['metrics']
+        
+        # 比例类指标取绝对误差；交易次数单独对比，float32 价格可能让均线接近相等处的信号翻转
+        metric_errors = {}
+        for key, value in full_metrics.items():
+            other = compact_metrics.get(key)
+            if isinstance(value, float) and isinstance(other, float):
+                metric_errors[key] = abs(other - value)
+        
+        bytes_before = DataHandler.memory_usage(data)
+        bytes_after = DataHandler.memory_usage(compact)
+        return {
+            'rows': len(data),
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'saved_ratio': 1 - bytes_after / bytes_before if bytes_before else 0.0,
+            'metric_errors': metric_errors,
+            'max_metric_error': max(metric_errors.values(), default=0.0),
+            'total_trades': (full_metrics.get('total_trades'), compact_metrics.get('total_trades')),
+        }
@@ -0,0 +1,148 @@
+"""
+双均线参数扫描模块
+一次累加和计算全部所需均线，再以二维广播同时评估所有 (短周期, 长周期) 组合
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from ..config import config
+from .ma_strategy import PERIODS_PER_YEAR, TIE_TOLERANCE
+from .metrics import batch_metrics
+
+logger = logging.getLogger(__name__)
+
+# 网格中输出的指标，与 MAStrategy.calculate_metrics 保持一致
+GRID_METRICS = [
+    'final_return', 'annual_return', 'max_drawdown', 'volatility', 'sharpe_ratio',
+    'sortino_ratio', 'calmar_ratio', 'total_trades', 'win_rate', 'avg_return', 'avg_win', 'avg_loss',
+    'turnover',
+]
+
+def moving_averages(close: np.ndarray, windows: Iterable[int]) -> Dict[int, np.ndarray]:
+    """通过一次累加和计算多个窗口的简单移动平均，窗口未满处为NaN
+
+    Args:
+        close: 一维收盘价数组，或 (symbol, time) 二维数组（沿最后一维计算）
+        windows: 均线周期列表
+    """
+    close = np.asarray(close, dtype=np.float64)
+    # 先减去首个价格再累加，降低长序列累加和的舍入误差
+    base = close[..., :1]
+    csum = np.zeros(close.shape[:-1] + (close.shape[-1] + 1,), dtype=np.float64)
+    np.cumsum(close - base, axis=-1, out=csum[..., 1:])
+
+    result = {}
+    for window in sorted(set(windows)):
+        ma = np.full(close.shape, np.nan, dtype=np.float64)
+        if window <= close.shape[-1]:
+            ma[..., window - 1:] = (csum[..., window:] - csum[..., :-window]) / window + base
+        result[window] = ma
+    return result
+
+def cross_signals(ma_short: np.ndarray, ma_long: np.ndarray, scale: float) -> np.ndarray:
+    """均线交叉持仓信号：短均线在上为1，在下为-1，相等或未满窗口为0"""
+    diff = ma_short - ma_long
+    tol = TIE_TOLERANCE * scale
+    return (diff > tol).astype(np.int8) - (diff < -tol).astype(np.int8)
+
+def signal_metrics(signals: np.ndarray, returns: np.ndarray, periods_per_year: int = 252,
+                   risk_free_rate: float = 0.03) -> Dict[str, np.ndarray]:
+    """对一组持仓信号批量计算绩效指标，口径与 MAStrategy.calculate_metrics 一致
+
+    Args:
+        signals: (n, time) 持仓信号
+        returns: (time,) 标的收益率，第0个元素无意义，NaN 表示该期无数据
+    """
+    # 信号滞后一期：第t期收益由第t-1期信号决定
+    held = signals[:, :-1]
+    metrics = batch_metrics(held * returns[1:], held, periods_per_year, risk_free_rate)
+    # 与 signal.diff() != 0 的口径一致（首期差分为NaN，同样计入）
+    metrics['total_trades'] = (np.diff(signals, axis=1) != 0).sum(axis=1) + 1
+    return metrics
+
+class MASweep:
+    """双均线参数网格扫描
+
+    Args:
+        short_range: 短周期候选，默认读取 config.json 的 strategy_config.ma_cross.short_range
+        long_range: 长周期候选，默认读取 strategy_config.ma_cross.long_range
+        period: K线周期，用于年化
+    """
+
+    def __init__(self, short_range: Optional[Sequence[int]] = None, long_range: Optional[Sequence[int]] = None,
+                 period: str = '1d'):
+        self.short_range = [int(n) for n in (short_range or config.strategy.ma_cross['short_range'])]
+        self.long_range = [int(n) for n in (long_range or config.strategy.ma_cross['long_range'])]
+        self.period = period
+        self.periods_per_year = PERIODS_PER_YEAR.get(period, 252)
+
+    def run(self, data: Union[pd.DataFrame, pd.Series, np.ndarray], rank_by: str = 'sharpe_ratio',
+            moving_avgs: Optional[Dict[int, np.ndarray]] = None) -> Dict[str, Any]:
+        """执行参数扫描
+
+        Args:
+            data: 含 close 列的行情 DataFrame，或收盘价序列/数组
+            rank_by: 排序所用指标
+            moving_avgs: 预先计算好的均线 {周期: 数组}，需与 data 等长
+
+        Returns:
+            {
+                'short_range', 'long_range': 网格坐标,
+                'grids': {指标: (len(short_range), len(long_range)) 数组，short>=long 处为NaN},
+                'table': 按 rank_by 降序排列的 DataFrame
+            }
+        """
+        close = _close_array(data)
+        if len(close) < 3:
+            raise ValueError("数据长度不足，无法进行参数扫描")
+
+        if moving_avgs is None:
+            moving_avgs = moving_averages(close, self.short_range + self.long_range)
+        returns = np.empty_like(close)
+        returns[0] = np.nan
+        returns[1:] = close[1:] / close[:-1] - 1.0
+        scale = float(np.nanmax(np.abs(close)))
+
+        long_mas = np.stack([moving_avgs[n] for n in self.long_range])   # (L, T)
+        grids = {name: np.full((len(self.short_range), len(self.long_range)), np.nan) for name in GRID_METRICS}
+
+        # 按短周期逐行广播：每行同时评估该短周期与全部长周期的组合，内存占用 O(L*T)
+        for i, short in enumerate(self.short_range):
+            valid = np.array([short < long for long in self.long_range])
+            if not valid.any():
+                continue
+            signals = cross_signals(moving_avgs[short][None, :], long_mas[valid], scale)
+            metrics = signal_metrics(signals, returns, self.periods_per_year)
+            for name in GRID_METRICS:
+                grids[name][i, valid] = metrics[name]
+
+        table = self._rank_table(grids, rank_by)
+        return {
+            'short_range': list(self.short_range),
+            'long_range': list(self.long_range),
+            'grids': grids,
+            'table': table,
+        }
+
+    def _rank_table(self, grids: Dict[str, np.ndarray], rank_by: str) -> pd.DataFrame:
+        """将网格展开为按指标排序的表"""
+        short_idx, long_idx = np.meshgrid(np.arange(len(self.short_range)), np.arange(len(self.long_range)),
+                                          indexing='ij')
+        table = pd.DataFrame({
+            'short_period': np.asarray(self.short_range)[short_idx.ravel()],
+            'long_period': np.asarray(self.long_range)[long_idx.ravel()],
+            **{name: grid.ravel() for name, grid in grids.items()},
+        })
+        table = table.dropna(subset=[rank_by])
+        table['total_trades'] = table['total_trades'].astype(int)
+        return table.sort_values(rank_by, ascending=False, kind='stable').reset_index(drop=True)
+
+def _close_array(data: Union[pd.DataFrame, pd.Series, np.ndarray, List[float]]) -> np.ndarray:
+    """从多种输入中取出一维 float64 收盘价数组"""
+    if isinstance(data, pd.DataFrame):
+        data = data['close']
+    return np.asarray(data, dtype=np.float64)
@@ -0,0 +1,56 @@
+"""
+MACD策略模块
+DIF 上穿 DEA 做多、下穿做空
+"""
+
+import logging
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from ..utils.indicator_cache import cached_indicator
+from .base_strategy import SignalStrategy
+
+logger = logging.getLogger(__name__)
+
+class MACDStrategy(SignalStrategy):
+    """MACD 金叉/死叉策略
+
+    Args:
+        fast_period: 快线EMA周期
+        slow_period: 慢线EMA周期
+        signal_period: DEA 平滑周期
+        period: K线周期
+    """
+
+    strategy_type = 'macd'
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, period: str = '1d'):
+        super().__init__(period)
+        if fast_period >= slow_period:
+            raise ValueError(f"快线周期({fast_period})必须小于慢线周期({slow_period})")
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+
+    def indicators(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        dif, dea, hist = self._macd(data)
+        return {'dif': dif, 'dea': dea, 'macd': hist}
+
+    def signal_array(self, data: pd.DataFrame) -> np.ndarray:
+        dif, dea, _ = self._macd(data)
+        signal = (dif > dea).astype(np.int8) - (dif < dea).astype(np.int8)
+        # 慢线EMA未满一个周期前不交易
+        signal[:self.slow_period] = 0
+        return signal
+
+    def _macd(self, data: pd.DataFrame):
+        return cached_indicator(data, 'macd', fast=self.fast_period, slow=self.slow_period, signal=self.signal_period)
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            'fast_period': self.fast_period,
+            'slow_period': self.slow_period,
+            'signal_period': self.signal_period,
+        }
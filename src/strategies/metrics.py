@@ -0,0 +1,118 @@
+"""
+批量绩效指标模块
+对 (n_series, time) 收益矩阵一次向量化计算全部绩效指标，
+NaN 表示该序列在该时间点无观测（上市前、停牌、已退市），各序列长度可以不同
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def batch_metrics(returns: np.ndarray, positions: Optional[np.ndarray] = None, periods_per_year: int = 252,
+                  risk_free_rate: float = 0.03) -> Dict[str, np.ndarray]:
+    """批量计算绩效指标，口径与 MAStrategy.calculate_metrics 一致
+
+    Args:
+        returns: (n_series, time) 逐期策略收益，也接受一维序列（视为一行）
+        positions: 与 returns 同形状的持仓（第t期收益对应的持仓），用于换手率；未提供时换手率为NaN
+        periods_per_year: 每年K线数量
+        risk_free_rate: 无风险利率
+
+    Returns:
+        {指标名: (n_series,) 数组}，没有任何观测的序列各指标为NaN。
+        sortino_ratio 的下行波动率以0为目标收益；calmar_ratio 为年化收益/最大回撤绝对值；
+        turnover 为年化换手率（每年持仓变动绝对值之和，建仓计入一次）
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    n_series, n_time = returns.shape
+    valid = ~np.isnan(returns)
+    complete = bool(valid.all())   # 无缺失时跳过掩码运算
+    n_obs = valid.sum(axis=1)
+    r = returns if complete else np.where(valid, returns, 0.0)   # 无观测期收益记0，净值保持不变
+
+    # 净值与回撤（净值起点为1，峰值不低于起点）
+    equity = np.cumprod(1.0 + r, axis=1)
+    final_return = equity[:, -1] - 1.0 if n_time else np.zeros(n_series)
+    if n_time:
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+        max_drawdown = np.minimum((equity / peak - 1.0).min(axis=1), 0.0)
+    else:
+        max_drawdown = np.zeros(n_series)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual_return = (1.0 + final_return) ** (periods_per_year / n_obs) - 1.0
+        avg_return = r.sum(axis=1) / n_obs
+
+        # 样本标准差，只统计有观测的时间点
+        deviation = r - avg_return[:, None]
+        if not complete:
+            deviation[~valid] = 0.0
+        variance = np.einsum('ij,ij->i', deviation, deviation) / (n_obs - 1)
+        volatility = np.where(n_obs > 1, np.sqrt(variance) * np.sqrt(periods_per_year), 0.0)
+        sharpe_ratio = np.where(volatility > 0, (annual_return - risk_free_rate) / volatility, 0.0)
+
+        downside = np.minimum(r, 0.0)
+        downside_vol = np.sqrt(np.einsum('ij,ij->i', downside, downside) / n_obs) * np.sqrt(periods_per_year)
+        sortino_ratio = np.where(downside_vol > 0, (annual_return - risk_free_rate) / downside_vol, 0.0)
+        calmar_ratio = np.where(max_drawdown < 0, annual_return / -max_drawdown, 0.0)
+
+        n_wins = np.count_nonzero(r > 0, axis=1)
+        n_losses = np.count_nonzero(downside, axis=1)
+        n_active = n_wins + n_losses
+        win_rate = np.where(n_active > 0, n_wins / n_active, 0.0)
+        avg_win = np.where(n_wins > 0, np.maximum(r, 0.0).sum(axis=1) / n_wins, 0.0)
+        avg_loss = np.where(n_losses > 0, downside.sum(axis=1) / n_losses, 0.0)
+
+        if positions is None:
+            turnover = np.full(n_series, np.nan)
+        else:
+            changes = position_changes(positions, None if complete else valid)
+            turnover = np.abs(changes).sum(axis=1) / n_obs * periods_per_year
+
+    metrics = {
+        'final_return': final_return,
+        'annual_return': annual_return,
+        'max_drawdown': max_drawdown,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'sortino_ratio': sortino_ratio,
+        'calmar_ratio': calmar_ratio,
+        'win_rate': win_rate,
+        'avg_return': avg_return,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'turnover': turnover,
+    }
+    empty = n_obs == 0
+    if empty.any():
+        for values in metrics.values():
+            values[empty] = np.nan
+    metrics['trading_days'] = n_obs
+    return metrics
+
+def position_changes(positions: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """逐期持仓变动（首个观测相对空仓计算），无观测期沿用上一观测的持仓、变动为0"""
+    positions = np.atleast_2d(np.asarray(positions, dtype=np.float64))
+    if valid is None:
+        valid = ~np.isnan(positions)
+    else:
+        valid = np.atleast_2d(valid) & ~np.isnan(positions)
+    if valid.all():
+        return np.diff(positions, axis=1, prepend=0.0)
+    # 将无观测期的持仓替换为上一个有观测期的持仓（向前填充），首个观测之前视为空仓
+    n_time = positions.shape[1]
+    last = np.where(valid, np.arange(n_time), -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    filled = np.where(last >= 0, np.take_along_axis(positions, np.maximum(last, 0), axis=1), 0.0)
+    return np.diff(filled, axis=1, prepend=0.0)
+
+def metrics_row(metrics: Dict[str, np.ndarray], i: int = 0) -> Dict[str, Any]:
+    """取出第 i 个序列的指标，转为 Python 标量字典"""
+    row = {}
+    for name, values in metrics.items():
+        value = values[i]
+        row[name] = int(value) if np.issubdtype(values.dtype, np.integer) else float(value)
+    return row
@@ -0,0 +1,52 @@
+"""
+RSI策略模块
+RSI 跌破超卖线做多、突破超买线做空，信号保持到反向条件出现
+"""
+
+import logging
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from ..utils.indicator_cache import cached_indicator
+from .base_strategy import SignalStrategy
+
+logger = logging.getLogger(__name__)
+
+class RSIStrategy(SignalStrategy):
+    """RSI 超买超卖策略
+
+    Args:
+        rsi_period: RSI 周期
+        oversold: 超卖阈值
+        overbought: 超买阈值
+        period: K线周期
+    """
+
+    strategy_type = 'rsi'
+
+    def __init__(self, rsi_period: int = 14, oversold: float = 30.0, overbought: float = 70.0, period: str = '1d'):
+        super().__init__(period)
+        if not 0 < oversold < overbought < 100:
+            raise ValueError(f"RSI阈值无效: 超卖{oversold}, 超买{overbought}")
+        self.rsi_period = rsi_period
+        self.oversold = oversold
+        self.overbought = overbought
+
+    def indicators(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        return {'rsi': cached_indicator(data, 'rsi', window=self.rsi_period)}
+
+    def signal_array(self, data: pd.DataFrame) -> np.ndarray:
+        values = cached_indicator(data, 'rsi', window=self.rsi_period)
+        events = (values < self.oversold).astype(np.int8) - (values > self.overbought).astype(np.int8)
+        # 向前填充最近一次触发的方向，首次触发前为0
+        last = np.maximum.accumulate(np.where(events != 0, np.arange(len(events)), -1))
+        return np.where(last >= 0, events[np.maximum(last, 0)], 0).astype(np.int8)
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            'rsi_period': self.rsi_period,
+            'oversold': self.oversold,
+            'overbought': self.overbought,
+        }
@@ -4,12 +4,17 @@
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import pandas as pd
 
 from .ma_strategy import MAStrategy
+from .macd_strategy import MACDStrategy
+from .rsi_strategy import RSIStrategy
+from .backtest_engine import BacktestEngine, trading_day_ids
 from ..utils.xtquant_client import xt_client
 from ..utils.data_handler import DataHandler
+from ..utils.indicator_cache import data_fingerprint
+from ..utils.result_cache import backtest_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +32,17 @@ class StrategyGenerator:
         end_date: str,
         **kwargs
     ) -> str:
-        """生成策略并执行回测"""
+        """生成策略并执行回测
+        
+        kwargs 中可传入 period 指定K线周期（默认1d，支持1m/5m等日内周期）；
+        backend 指定回测方式：vectorized（默认，信号收益率）或 event（事件驱动，计入佣金、滑点、整手与T+1）。
+        策略参数：ma_cross 为 short_period/long_period；macd 为 fast_period/slow_period/signal_period；
+        rsi 为 rsi_period/oversold/overbought
+        """
         
         try:
             # 验证输入参数
+            symbol = xt_client.resolve_symbol(symbol)
             if not self.data_handler.validate_symbol(symbol):
                 return f"[ERROR] 股票代码格式错误: {symbol}"
             
@@ -42,7 +54,7 @@ class StrategyGenerator:
             
             # 获取股票数据
             try:
-                data = xt_client.get_market_data(symbol, start_date, end_date)
+                data = xt_client.get_market_data(symbol, start_date, end_date, kwargs.get('period', '1d'))
                 if data is None:
                     if not xt_client.is_connected():
                         return f"[ERROR] XTQuant未连接，请确保迅投QMT客户端已启动并登录"
@@ -65,19 +77,38 @@ class StrategyGenerator:
             if not self.data_handler.validate_market_data(data):
                 return f"[ERROR] 获取到的{symbol}数据格式无效或为空"
             
+            # 相同请求且行情数据未变化时直接返回缓存的回测报告
+            cache_key = None
+            if backtest_result_cache is not None:
+                cache_key = (backtest_result_cache.param_hash(strategy_type, symbol, start_date, end_date, kwargs),
+                             data_fingerprint(data))
+                cached = backtest_result_cache.get(*cache_key)
+                if cached is not None:
+                    logger.debug(f"命中回测结果缓存: {strategy_type} {symbol} {start_date}-{end_date}")
+                    return cached
+            
             data = self.data_handler.clean_market_data(data)
             if data.empty:
                 return f"[ERROR] 清洗后的{symbol}数据为空"
             
+            # 标记数据来源，同一股票反复评估时复用指标缓存
+            data.attrs['symbol'] = symbol
+            data.attrs['period'] = kwargs.get('period', '1d')
+            
             # 根据策略类型生成策略
             if strategy_type == 'ma_cross':
-                return self._generate_ma_strategy(data, symbol, start_date, end_date, **kwargs)
+                result = self._generate_ma_strategy(data, symbol, start_date, end_date, **kwargs)
             elif strategy_type == 'macd':
-                return self._generate_macd_strategy(data, symbol, start_date, end_date, **kwargs)
+                result = self._generate_macd_strategy(data, symbol, start_date, end_date, **kwargs)
             elif strategy_type == 'rsi':
-                return self._generate_rsi_strategy(data, symbol, start_date, end_date, **kwargs)
+                result = self._generate_rsi_strategy(data, symbol, start_date, end_date, **kwargs)
             else:
                 return f"[ERROR] 不支持的策略类型: {strategy_type}，支持的类型: ma_cross, macd, rsi"
+            
+            # 只缓存成功的回测结果
+            if cache_key is not None and result.startswith("[OK]"):
+                backtest_result_cache.put(*cache_key, result)
+            return result
                 
         except Exception as e:
             logger.error(f"策略生成失败: {e}")
@@ -95,6 +126,7 @@ class StrategyGenerator:
         
         short_period = kwargs.get('short_period', 5)
         long_period = kwargs.get('long_period', 20)
+        period = kwargs.get('period', '1d')
         
         # 验证参数
         if short_period >= long_period:
@@ -103,57 +135,161 @@ class StrategyGenerator:
         if long_period >= len(data):
             return f"[ERROR] 长期均线周期({long_period})不能超过数据长度({len(data)})"
         
+        unit = self._period_unit(period)
+        param_lines = [
+            f"短期均线: {short_period}{unit}",
+            f"长期均线: {long_period}{unit}",
+        ]
         try:
-            # 创建策略实例
-            strategy = MAStrategy(short_period=short_period, long_period=long_period)
-            
-            # 执行回测
-            backtest_result = strategy.backtest(data)
-            
-            if not backtest_result['success']:
-                return f"[ERROR] 策略回测失败: {backtest_result['error']}"
-            
-            metrics = backtest_result['metrics']
-            
-            if 'error' in metrics:
-                return f"[ERROR] 策略计算失败: {metrics['error']}"
-            
-            # 生成报告
-            result_text = f"[OK] 双均线策略生成成功！\n\n"
-            result_text += f"[DATA] 股票信息: {symbol}\n"
-            result_text += f"[DATE] 数据期间: {start_date} 至 {end_date}\n"
-            result_text += f"[CHART] 数据条数: {len(data)} 条\n"
-            result_text += f"[DATA] 交易天数: {metrics['trading_days']} 天\n\n"
-            
-            result_text += f"[TARGET] 双均线策略参数:\n"
-            result_text += f"   * 短期均线: {short_period}日\n"
-            result_text += f"   * 长期均线: {long_period}日\n\n"
-            
-            result_text += f"[CHART] 策略表现:\n"
-            result_text += f"   * 总收益率: {self.data_handler.format_percentage(metrics['final_return'])}\n"
-            result_text += f"   * 年化收益率: {self.data_handler.format_percentage(metrics['annual_return'])}\n"
-            result_text += f"   * 最大回撤: {self.data_handler.format_percentage(metrics['max_drawdown'])}\n"
-            result_text += f"   * 年化波动率: {self.data_handler.format_percentage(metrics['volatility'])}\n"
-            result_text += f"   * 夏普比率: {self.data_handler.format_number(metrics['sharpe_ratio'])}\n"
-            result_text += f"   * 交易次数: {metrics['total_trades']}\n"
-            result_text += f"   * 胜率: {self.data_handler.format_percentage(metrics['win_rate'])}\n\n"
-            
-            # 策略评价
-            result_text += self._evaluate_strategy(metrics)
-            
-            return result_text
-            
+            strategy = MAStrategy(short_period=short_period, long_period=long_period, period=period)
+            return self._run_strategy(strategy, '双均线', param_lines, data, symbol, start_date, end_date,
+                                      kwargs.get('backend', 'vectorized'))
         except Exception as e:
             logger.error(f"双均线策略生成失败: {e}")
             return f"[ERROR] 双均线策略生成失败: {str(e)}"
     
     def _generate_macd_strategy(self, data: pd.DataFrame, symbol: str, start_date: str, end_date: str, **kwargs) -> str:
         """生成MACD策略"""
-        return f"[DEV] MACD策略功能开发中...\n\n[DATA] 股票: {symbol}\n[DATE] 期间: {start_date} 至 {end_date}\n[TIP] 敬请期待更多技术指标策略！"
+        fast_period = kwargs.get('fast_period', 12)
+        slow_period = kwargs.get('slow_period', 26)
+        signal_period = kwargs.get('signal_period', 9)
+        period = kwargs.get('period', '1d')
+        
+        if fast_period >= slow_period:
+            return f"[ERROR] 快线周期({fast_period})必须小于慢线周期({slow_period})"
+        
+        if slow_period >= len(data):
+            return f"[ERROR] 慢线周期({slow_period})不能超过数据长度({len(data)})"
+        
+        unit = self._period_unit(period)
+        param_lines = [
+            f"快线EMA: {fast_period}{unit}",
+            f"慢线EMA: {slow_period}{unit}",
+            f"DEA平滑: {signal_period}{unit}",
+        ]
+        try:
+            strategy = MACDStrategy(fast_period, slow_period, signal_period, period=period)
+            return self._run_strategy(strategy, 'MACD', param_lines, data, symbol, start_date, end_date,
+                                      kwargs.get('backend', 'vectorized'))
+        except Exception as e:
+            logger.error(f"MACD策略生成失败: {e}")
+            return f"[ERROR] MACD策略生成失败: {str(e)}"
     
     def _generate_rsi_strategy(self, data: pd.DataFrame, symbol: str, start_date: str, end_date: str, **kwargs) -> str:
         """生成RSI策略"""
-        return f"[DEV] RSI策略功能开发中...\n\n[DATA] 股票: {symbol}\n[DATE] 期间: {start_date} 至 {end_date}\n[TIP] 敬请期待更多技术指标策略！"
+        rsi_period = kwargs.get('rsi_period', 14)
+        oversold = kwargs.get('oversold', 30.0)
+        overbought = kwargs.get('overbought', 70.0)
+        period = kwargs.get('period', '1d')
+        
+        if not 0 < oversold < overbought < 100:
+            return f"[ERROR] RSI阈值无效: 超卖线({oversold})必须小于超买线({overbought})且在0-100之间"
+        
+        if rsi_period >= len(data):
+            return f"[ERROR] RSI周期({rsi_period})不能超过数据长度({len(data)})"
+        
+        param_lines = [
+            f"RSI周期: {rsi_period}{self._period_unit(period)}",
+            f"超卖线: {oversold}（跌破做多）",
+            f"超买线: {overbought}（突破做空）",
+        ]
+        try:
+            strategy = RSIStrategy(rsi_period, oversold, overbought, period=period)
+            return self._run_strategy(strategy, 'RSI', param_lines, data, symbol, start_date, end_date,
+                                      kwargs.get('backend', 'vectorized'))
+        except Exception as e:
+            logger.error(f"RSI策略生成失败: {e}")
+            return f"[ERROR] RSI策略生成失败: {str(e)}"
+    
+    def _run_strategy(self, strategy, name: str, param_lines: List[str], data: pd.DataFrame, symbol: str,
+                      start_date: str, end_date: str, backend: str) -> str:
+        """执行回测并生成报告"""
+        if backend not in ('vectorized', 'event'):
+            return f"[ERROR] 不支持的回测方式: {backend}，支持的方式: vectorized, event"
+        
+        # 执行回测
+        if backend == 'event':
+            backtest_result = self._run_event_backtest(strategy, data)
+        else:
+            backtest_result = strategy.backtest(data, with_data=False)
+        
+        if not backtest_result['success']:
+            return f"[ERROR] 策略回测失败: {backtest_result['error']}"
+        
+        metrics = backtest_result['metrics']
+        
+        if 'error' in metrics:
+            return f"[ERROR] 策略计算失败: {metrics['error']}"
+        
+        # 生成报告
+        result_text = f"[OK] {name}策略生成成功！\n\n"
+        result_text += f"[DATA] 股票信息: {symbol}\n"
+        result_text += f"[DATE] 数据期间: {start_date} 至 {end_date}\n"
+        result_text += f"[CHART] 数据条数: {len(data)} 条\n"
+        result_text += f"[DATA] 交易天数: {metrics['trading_days']} 天\n\n"
+        
+        result_text += f"[TARGET] {name}策略参数:\n"
+        for line in param_lines:
+            result_text += f"   * {line}\n"
+        result_text += "\n"
+        
+        result_text += f"[CHART] 策略表现:\n"
+        result_text += f"   * 总收益率: {self.data_handler.format_percentage(metrics['final_return'])}\n"
+        result_text += f"   * 年化收益率: {self.data_handler.format_percentage(metrics['annual_return'])}\n"
+        result_text += f"   * 最大回撤: {self.data_handler.format_percentage(metrics['max_drawdown'])}\n"
+        result_text += f"   * 年化波动率: {self.data_handler.format_percentage(metrics['volatility'])}\n"
+        result_text += f"   * 夏普比率: {self.data_handler.format_number(metrics['sharpe_ratio'])}\n"
+        result_text += f"   * 索提诺比率: {self.data_handler.format_number(metrics['sortino_ratio'])}\n"
+        result_text += f"   * 卡玛比率: {self.data_handler.format_number(metrics['calmar_ratio'])}\n"
+        result_text += f"   * 交易次数: {metrics['total_trades']}\n"
+        result_text += f"   * 胜率: {self.data_handler.format_percentage(metrics['win_rate'])}\n"
+        if backend != 'event':
+            result_text += f"   * 年化换手: {self.data_handler.format_number(metrics['turnover'])} 倍\n"
+        result_text += "\n"
+        
+        if backend == 'event':
+            result_text += f"[MONEY] 资金与成本:\n"
+            result_text += f"   * 初始资金: {self.data_handler.format_number(metrics['initial_capital'], 2)}\n"
+            result_text += f"   * 期末资产: {self.data_handler.format_number(metrics['final_equity'], 2)}\n"
+            result_text += f"   * 完整交易: {metrics['round_trips']} 次\n"
+            result_text += f"   * 佣金合计: {self.data_handler.format_number(metrics['total_commission'], 2)}\n"
+            result_text += f"   * 成交金额: {self.data_handler.format_number(metrics['turnover'], 2)}\n\n"
+        
+        # 策略评价
+        result_text += self._evaluate_strategy(metrics)
+        
+        return result_text
+    
+    def _run_event_backtest(self, strategy, data: pd.DataFrame) -> Dict[str, Any]:
+        """用事件驱动引擎回测策略信号，按下一根K线开盘价成交"""
+        try:
+            close = data['close'].to_numpy(dtype=float)
+            signal = strategy.signal_array(data)
+            fill_price = data['open'].to_numpy(dtype=float) if 'open' in data.columns else None
+            
+            engine = BacktestEngine(periods_per_year=strategy.periods_per_year)
+            result = engine.run(close, signal, fill_price=fill_price, days=trading_day_ids(data.index))
+            metrics = result.metrics
+            metrics.update(strategy.params())
+            metrics['period'] = strategy.period
+            metrics['strategy_type'] = strategy.strategy_type
+            metrics['backend'] = 'event'
+            return {
+                'metrics': metrics,
+                'result': result,
+                'success': True
+            }
+        except Exception as e:
+            logger.error(f"事件驱动回测失败: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _period_unit(period: str) -> str:
+        """参数说明中的周期单位"""
+        return '日' if period == '1d' else f"根{period}K线"
     
     def _evaluate_strategy(self, metrics: Dict[str, Any]) -> str:
         """评价策略表现"""
@@ -0,0 +1,252 @@
+"""
+流式双均线回测模块
+按日期窗口逐块读取行情，跨块延续均线窗口、持仓信号与净值状态，绩效指标增量累计，
+内存占用只与单个窗口大小和股票数有关，与历史长度无关。
+指标口径与 MAStrategy.backtest(with_data=False) 相同
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from ..utils.market_panel import MarketPanel
+from ..utils.xtquant_client import xt_client
+from .ma_strategy import PERIODS_PER_YEAR, TIE_TOLERANCE
+
+logger = logging.getLogger(__name__)
+
+class _StreamState:
+    """单只股票跨块延续的状态与累计量"""
+
+    __slots__ = ('tail', 'base', 'scale', 'bars', 'last_close', 'last_signal', 'last_held',
+                 'n', 'equity', 'peak', 'max_drawdown', 'mean', 'm2', 'downside_sq',
+                 'n_wins', 'n_losses', 'win_sum', 'loss_sum', 'changes', 'turnover')
+
+    def __init__(self):
+        self.tail = np.empty(0)       # 最近 long_period-1 个收盘价，用于下一块的均线
+        self.base = np.nan            # 首个收盘价，累加和前减去以降低舍入误差
+        self.scale = 0.0              # 已见收盘价绝对值的最大值，用于均线相等的容差
+        self.bars = 0                 # 已处理K线数
+        self.last_close = np.nan
+        self.last_signal = 0
+        self.last_held = 0.0
+        self.n = 0                    # 策略收益期数
+        self.equity = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+        self.mean = 0.0               # 收益均值与离差平方和（按块合并）
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+        self.n_wins = 0
+        self.n_losses = 0
+        self.win_sum = 0.0
+        self.loss_sum = 0.0
+        self.changes = 0              # 信号变化次数
+        self.turnover = 0.0           # 持仓变动绝对值之和
+
+class StreamingMABacktester:
+    """流式双均线回测
+
+    Args:
+        symbols: 股票代码列表
+        short_period: 短期均线周期
+        long_period: 长期均线周期
+        period: K线周期
+    """
+
+    def __init__(self, symbols: Sequence[str], short_period: int = 5, long_period: int = 20, period: str = '1m'):
+        if short_period >= long_period:
+            raise ValueError(f"短期均线周期({short_period})必须小于长期均线周期({long_period})")
+        self.symbols = list(symbols)
+        self.short_period = short_period
+        self.long_period = long_period
+        self.period = period
+        self.periods_per_year = PERIODS_PER_YEAR.get(period, 252)
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._states = [_StreamState() for _ in self.symbols]
+        self.chunks = 0
+
+    @classmethod
+    def run_universe(cls, universe: Union[str, Sequence[str]], start_date: str, end_date: str,
+                     short_period: int = 5, long_period: int = 20, period: str = '1m',
+                     window_days: Optional[int] = None) -> pd.DataFrame:
+        """按日期窗口流式拉取股票池行情并回测，返回每只股票一行的指标表"""
+        if isinstance(universe, str):
+            symbols = xt_client.get_stock_list(universe)
+            if not symbols:
+                raise ValueError(f"无法获取板块 {universe} 的股票列表")
+        else:
+            symbols = [xt_client.resolve_symbol(symbol) for symbol in universe]
+        backtester = cls(symbols, short_period, long_period, period)
+        backtester.feed_panels(xt_client.iter_market_panels(symbols, start_date, end_date, period, window_days))
+        return backtester.results()
+
+    def feed_panels(self, panels: Iterable[MarketPanel]):
+        """依次处理多个按时间先后排列的面板"""
+        for panel in panels:
+            self.feed(panel)
+
+    def feed(self, panel: MarketPanel):
+        """处理一个时间窗口的面板，面板中不在股票列表内的股票被忽略"""
+        close = panel.field('close')
+        for row, symbol in enumerate(panel.symbols):
+            i = self._index.get(symbol)
+            if i is not None:
+                self._update(self._states[i], close[row])
+        self.chunks += 1
+
+    def feed_closes(self, closes: np.ndarray):
+        """处理一块 (symbol, time) 收盘价，行与 symbols 对应，NaN 表示该时间点无数据"""
+        closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+        if closes.shape[0] != len(self.symbols):
+            raise ValueError(f"收盘价行数({closes.shape[0]})与股票数({len(self.symbols)})不一致")
+        for state, row in zip(self._states, closes):
+            self._update(state, row)
+        self.chunks += 1
+
+    def results(self, risk_free_rate: float = 0.03) -> pd.DataFrame:
+        """当前累计的各股票指标，数据不足的股票在 error 列给出原因"""
+        rows = []
+        for symbol, state in zip(self.symbols, self._states):
+            row: Dict[str, Any] = {'symbol': symbol}
+            if state.n < 1:
+                row['error'] = '没有有效的策略收益数据'
+            else:
+                row.update(self._finalize(state, risk_free_rate))
+            rows.append(row)
+        results = pd.DataFrame(rows).set_index('symbol')
+        if 'error' not in results.columns:
+            results['error'] = None
+        return results
+
+    @property
+    def nbytes(self) -> int:
+        """跨块状态的内存占用（不含当前处理的面板）"""
+        return sum(state.tail.nbytes for state in self._states)
+
+    # 私有方法
+
+    def _update(self, state: _StreamState, close: np.ndarray):
+        """追加一只股票在一个窗口内的收盘价"""
+        close = close[~np.isnan(close)]
+        n_new = len(close)
+        if n_new == 0:
+            return
+        short, long = self.short_period, self.long_period
+        if state.bars == 0:
+            state.base = close[0]
+        state.scale = max(state.scale, float(np.abs(close).max()))
+
+        # 均线：上一块末尾 long-1 个收盘价与本块拼接后做累加和，窗口和相减得到均线差
+        history = np.concatenate((state.tail, close))
+        k = len(state.tail)
+        csum = np.zeros(len(history) + 1)
+        np.cumsum(history - state.base, out=csum[1:])
+        diff = np.zeros(n_new)
+        first = max(k, long - 1)   # 本块中第一根长均线窗口已满的K线（history 下标）
+        if first < len(history):
+            end = np.arange(first + 1, len(history) + 1)
+            ma_long = (csum[end] - csum[end - long]) / long
+            ma_short = (csum[end] - csum[end - short]) / short
+            diff[first - k:] = ma_short - ma_long
+        tol = TIE_TOLERANCE * state.scale
+        signal = (diff > tol).astype(np.int8) - (diff < -tol).astype(np.int8)
+
+        # 信号变化次数（与上一块最后一根K线的信号衔接）
+        previous_signal = np.empty(n_new, dtype=np.int8)
+        previous_signal[0] = state.last_signal
+        previous_signal[1:] = signal[:-1]
+        changes = signal != previous_signal
+        if state.bars == 0:
+            changes = changes[1:]
+        state.changes += int(np.count_nonzero(changes))
+
+        # 策略收益：第t根K线的收益由第t-1根K线的信号决定
+        if state.bars == 0:
+            prev_close, held, current = close[:-1], signal[:-1], close[1:]
+        else:
+            prev_close = np.concatenate(([state.last_close], close[:-1]))
+            held, current = previous_signal, close
+        returns = current / prev_close - 1.0
+        returns *= held
+        self._accumulate(state, returns, held)
+
+        state.tail = history[-(long - 1):].copy()
+        state.bars += n_new
+        state.last_close = close[-1]
+        state.last_signal = int(signal[-1])
+
+    @staticmethod
+    def _accumulate(state: _StreamState, returns: np.ndarray, held: np.ndarray):
+        """将一块策略收益并入累计量"""
+        n_b = len(returns)
+        if n_b == 0:
+            return
+
+        # 净值与回撤：与一次性 cumprod 的乘法顺序相同
+        growth = np.empty(n_b + 1)
+        growth[0] = state.equity
+        np.add(returns, 1.0, out=growth[1:])
+        equity = np.cumprod(growth)[1:]
+        peak = np.maximum.accumulate(np.maximum(equity, state.peak))
+        state.max_drawdown = min(state.max_drawdown, float(((equity - peak) / peak).min()))
+        state.equity = float(equity[-1])
+        state.peak = float(peak[-1])
+
+        # 均值与离差平方和按块合并（Chan 并行公式）
+        mean_b = float(returns.mean())
+        m2_b = float(np.dot(returns - mean_b, returns - mean_b))
+        n_a = state.n
+        n = n_a + n_b
+        delta = mean_b - state.mean
+        state.mean += delta * n_b / n
+        state.m2 += m2_b + delta * delta * n_a * n_b / n
+        state.n = n
+
+        downside = np.minimum(returns, 0.0)
+        state.downside_sq += float(np.dot(downside, downside))
+        wins = returns > 0
+        losses = returns < 0
+        state.n_wins += int(np.count_nonzero(wins))
+        state.n_losses += int(np.count_nonzero(losses))
+        state.win_sum += float(returns.sum(where=wins))
+        state.loss_sum += float(returns.sum(where=losses))
+
+        held = held.astype(np.float64)
+        state.turnover += abs(held[0] - state.last_held) + float(np.abs(np.diff(held)).sum())
+        state.last_held = held[-1]
+
+    def _finalize(self, state: _StreamState, risk_free_rate: float) -> Dict[str, Any]:
+        """由累计量计算指标，公式与 MABacktestKernel.evaluate 相同"""
+        n, ppy = state.n, self.periods_per_year
+        final_return = state.equity - 1.0
+        annual_return = (1 + final_return) ** (ppy / n) - 1
+        volatility = np.sqrt(state.m2 / (n - 1)) * np.sqrt(ppy) if n > 1 else 0
+        sharpe_ratio = (annual_return - risk_free_rate) / volatility if volatility > 0 else 0
+        max_drawdown = state.max_drawdown
+        calmar_ratio = annual_return / -max_drawdown if max_drawdown < 0 else 0
+        downside_vol = np.sqrt(state.downside_sq / n * ppy)
+        sortino_ratio = (annual_return - risk_free_rate) / downside_vol if downside_vol > 0 else 0
+        n_active = state.n_wins + state.n_losses
+
+        return {
+            'final_return': float(final_return),
+            'annual_return': float(annual_return),
+            'max_drawdown': float(max_drawdown),
+            'volatility': float(volatility),
+            'sharpe_ratio': float(sharpe_ratio),
+            'sortino_ratio': float(sortino_ratio),
+            'calmar_ratio': float(calmar_ratio),
+            'total_trades': state.changes + 1,
+            'win_rate': state.n_wins / n_active if n_active > 0 else 0,
+            'avg_return': float(state.mean),
+            'avg_win': state.win_sum / state.n_wins if state.n_wins > 0 else 0,
+            'avg_loss': state.loss_sum / state.n_losses if state.n_losses > 0 else 0,
+            'turnover': float(state.turnover / n * ppy),
+            'trading_days': n,
+            'short_period': self.short_period,
+            'long_period': self.long_period,
+            'period': self.period,
+        }
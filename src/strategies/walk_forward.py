@@ -0,0 +1,195 @@
+"""
+滚动前推（walk-forward）优化模块
+将历史按滚动窗口切分为训练段与测试段，在训练段上扫描双均线参数，
+用选中的参数在紧随其后的测试段做样本外评估，各折并行执行，输出拼接的样本外净值
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ..config import config
+from ..utils.xtquant_client import xt_client
+from .ma_sweep import MASweep, _close_array, cross_signals, moving_averages
+from .metrics import batch_metrics, metrics_row
+
+logger = logging.getLogger(__name__)
+
+def _optimize_fold(fold: Dict[str, Any], close: np.ndarray, mas: Dict[int, np.ndarray], train_len: int,
+                   short_range: List[int], long_range: List[int], period: str, rank_by: str,
+                   scale: float) -> Dict[str, Any]:
+    """进程池工作函数：在训练段扫描参数，用最优参数评估测试段
+
+    close 与 mas 为该折 [训练起点, 测试终点) 的切片，mas 来自全历史的一次累加和，
+    训练段开头的均线无需重新预热
+    """
+    result = dict(fold)
+    try:
+        sweep = MASweep(short_range, long_range, period)
+        train_mas = {window: ma[:train_len] for window, ma in mas.items()}
+        table = sweep.run(close[:train_len], rank_by=rank_by, moving_avgs=train_mas)['table']
+        if table.empty:
+            raise ValueError("训练段内没有有效的参数组合")
+        best = table.iloc[0]
+        short, long = int(best['short_period']), int(best['long_period'])
+
+        # 测试段第一根K线的收益由训练段最后一根K线的信号决定，因此从 train_len-1 开始取信号
+        signals = cross_signals(mas[short][train_len - 1:], mas[long][train_len - 1:], scale)
+        returns = np.full(len(close) - train_len + 1, np.nan)
+        returns[1:] = close[train_len:] / close[train_len - 1:-1] - 1.0
+        held = signals[:-1]
+        result.update({
+            'short_period': short,
+            'long_period': long,
+            f'train_{rank_by}': float(best[rank_by]),
+            'held': held,
+            'test_returns': held * returns[1:],
+        })
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+class WalkForwardOptimizer:
+    """双均线滚动前推优化
+
+    Args:
+        train_bars: 训练段K线数
+        test_bars: 测试段K线数
+        step: 相邻两折的起点间隔，默认等于 test_bars（测试段首尾相接）
+        anchored: 为True时训练段始终从第一根K线开始（扩展窗口）
+        short_range: 短周期候选，默认读取 strategy_config.ma_cross.short_range
+        long_range: 长周期候选，默认读取 strategy_config.ma_cross.long_range
+        period: K线周期
+        rank_by: 训练段选参所用指标
+        max_workers: 进程数，默认读取 BACKTEST_WORKERS
+    """
+
+    def __init__(self, train_bars: int = 252, test_bars: int = 63, step: Optional[int] = None,
+                 anchored: bool = False, short_range: Optional[Sequence[int]] = None,
+                 long_range: Optional[Sequence[int]] = None, period: str = '1d',
+                 rank_by: str = 'sharpe_ratio', max_workers: Optional[int] = None):
+        if train_bars < 3 or test_bars < 1:
+            raise ValueError(f"训练段({train_bars})或测试段({test_bars})长度无效")
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.step = step or test_bars
+        self.anchored = anchored
+        self.sweep = MASweep(short_range, long_range, period)
+        self.rank_by = rank_by
+        self.max_workers = max(1, max_workers or config.executor.backtest_workers)
+
+    def folds(self, n_bars: int) -> List[Dict[str, int]]:
+        """切分训练/测试段，返回各折的K线下标范围（左闭右开）"""
+        folds = []
+        test_start = self.train_bars
+        while test_start < n_bars:
+            test_end = min(test_start + self.test_bars, n_bars)
+            folds.append({
+                'fold': len(folds),
+                'train_start': 0 if self.anchored else test_start - self.train_bars,
+                'test_start': test_start,
+                'test_end': test_end,
+            })
+            test_start += self.step
+        return folds
+
+    def run_symbol(self, symbol: str, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> Dict[str, Any]:
+        """拉取行情并执行优化，日期默认读取 DEFAULT_START_DATE / DEFAULT_END_DATE"""
+        symbol = xt_client.resolve_symbol(symbol)
+        start_date = start_date or config.strategy.default_start_date
+        end_date = end_date or config.strategy.default_end_date
+        data = xt_client.get_market_data(symbol, start_date, end_date, self.sweep.period)
+        if data is None or data.empty:
+            raise ValueError(f"获取{symbol}数据失败")
+        return self.run(data)
+
+    def run(self, data: Union[pd.DataFrame, pd.Series, np.ndarray]) -> Dict[str, Any]:
+        """执行滚动前推优化
+
+        Args:
+            data: 含 close 列的行情 DataFrame，或收盘价序列/数组
+
+        Returns:
+            {
+                'folds': 每折一行：下标范围、选中参数、训练段指标、样本外指标，失败的折在 error 列给出原因,
+                'equity': 拼接的样本外净值（起点为1），
+                'returns': 样本外逐K线收益,
+                'metrics': 拼接后样本外收益的绩效指标
+            }
+        """
+        close = _close_array(data)
+        index = data.index if isinstance(data, (pd.DataFrame, pd.Series)) else pd.RangeIndex(len(close))
+        folds = self.folds(len(close))
+        if not folds:
+            raise ValueError(f"数据长度({len(close)})不足一个训练段({self.train_bars})")
+
+        # 全历史只做一次累加和，各折直接切片，扫描成本不随折数重复计算均线
+        mas = moving_averages(close, self.sweep.short_range + self.sweep.long_range)
+        scale = float(np.nanmax(np.abs(close)))
+        tasks = [(fold, close[fold['train_start']:fold['test_end']],
+                  {window: ma[fold['train_start']:fold['test_end']] for window, ma in mas.items()},
+                  fold['test_start'] - fold['train_start'])
+                 for fold in folds]
+
+        logger.info(f"滚动前推优化: {len(folds)}折, 网格{len(self.sweep.short_range)}x{len(self.sweep.long_range)}")
+        results = self._run_folds(tasks, scale)
+        return self._stitch(results, index)
+
+    def _run_folds(self, tasks: List[Tuple], scale: float) -> List[Dict[str, Any]]:
+        sweep = self.sweep
+        args = (sweep.short_range, sweep.long_range, sweep.period, self.rank_by, scale)
+        if self.max_workers == 1 or len(tasks) == 1:
+            return [_optimize_fold(*task, *args) for task in tasks]
+
+        results = []
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+            futures = [(task[0], executor.submit(_optimize_fold, *task, *args)) for task in tasks]
+            for fold, future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"第{fold['fold']}折优化失败: {e}")
+                    results.append({**fold, 'error': f"优化进程异常: {e}"})
+        return results
+
+    def _stitch(self, results: List[Dict[str, Any]], index: pd.Index) -> Dict[str, Any]:
+        """按时间顺序拼接各折样本外收益，重叠的测试段以后一折为准"""
+        results = sorted(results, key=lambda r: r['fold'])
+        ok = [r for r in results if 'error' not in r]
+        if not ok:
+            raise ValueError(f"全部{len(results)}折优化失败: {results[0]['error']}")
+
+        start, end = ok[0]['test_start'], max(r['test_end'] for r in ok)
+        returns = np.full(end - start, np.nan)
+        held = np.zeros(end - start, dtype=np.int8)
+        for r in ok:
+            returns[r['test_start'] - start:r['test_end'] - start] = r['test_returns']
+            held[r['test_start'] - start:r['test_end'] - start] = r['held']
+        covered = ~np.isnan(returns)
+        returns, held = returns[covered], held[covered]
+
+        metrics = metrics_row(batch_metrics(returns, held, self.sweep.periods_per_year))
+        metrics['total_trades'] = int((np.diff(held) != 0).sum() + 1)
+
+        for r in ok:
+            test = r.pop('test_returns')
+            r.pop('held')
+            r['test_return'] = float(np.prod(1.0 + test) - 1.0)
+        folds = pd.DataFrame(results).set_index('fold')
+        if not isinstance(index, pd.RangeIndex):
+            folds['test_first'] = index[folds['test_start'].to_numpy()]
+            folds['test_last'] = index[folds['test_end'].to_numpy() - 1]
+        if 'error' not in folds.columns:
+            folds['error'] = None
+
+        time_index = index[start:end][covered]
+        return {
+            'folds': folds,
+            'equity': pd.Series(np.cumprod(1.0 + returns), index=time_index, name='equity'),
+            'returns': pd.Series(returns, index=time_index, name='returns'),
+            'metrics': metrics,
+        }
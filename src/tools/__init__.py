@@ -5,5 +5,6 @@
 
 from .qmt_tool import QMTStrategyTool
 from .trading_tool import TradingTool
+from .screening_tool import ScreeningTool
 
-__all__ = ['TradingTool', 'QMTStrategyTool'] 
\ No newline at end of file
+__all__ = ['TradingTool', 'QMTStrategyTool', 'ScreeningTool'] 
\ No newline at end of file
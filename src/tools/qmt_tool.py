@@ -47,25 +47,63 @@ class QMTStrategyTool:
 """
 QMT 双均线策略示例，由 QuantMCP 自动生成
 """
-import pandas as pd
+from collections import deque
+
+PRICE_SCALE = 1000  # 价格取整为 0.001 元的整数，窗口和无舍入误差
 
 def init(context):
     context.symbol = "{symbol}"
     context.short_period = {short_period}
     context.long_period = {long_period}
+    # 增量均线状态：定长窗口 + 窗口累加和，每根K线 O(1) 更新
+    context.window = deque(maxlen={long_period})
+    context.sum_short = 0
+    context.sum_long = 0
+    context.last_bar_time = None   # 窗口中最后一根K线的时间
+
+def push_price(context, price):
+    """追加一根新K线的价格，移出离开窗口的价格"""
+    window = context.window
+    if len(window) >= {short_period}:
+        context.sum_short -= window[-{short_period}]
+    if len(window) == {long_period}:
+        context.sum_long -= window[0]
+    window.append(price)
+    context.sum_short += price
+    context.sum_long += price
+
+def replace_price(context, price):
+    """同一根K线再次触发（盘中刷新）时替换窗口末尾的价格"""
+    delta = price - context.window[-1]
+    context.window[-1] = price
+    context.sum_short += delta
+    context.sum_long += delta
 
 def handle_bar(context, bar_dict):
-    data = context.history(context.symbol, '1d', {long_period}+1)
-    if len(data) < {long_period}:
+    # 首次调用取最近 long_period 根K线预热窗口；之后取最近两根，上一根以收盘后的最终价格修正
+    count = {long_period} if context.last_bar_time is None else 2
+    bars = context.history(context.symbol, '1d', count)
+    if bars is None or len(bars) == 0:
         return
-    close = data['close']
-    ma_short = close.rolling({short_period}).mean().iloc[-1]
-    ma_long = close.rolling({long_period}).mean().iloc[-1]
+    for bar_time, close in zip(bars.index, bars['close']):
+        if close != close:   # 停牌等缺失K线
+            continue
+        price = int(round(close * PRICE_SCALE))
+        if bar_time == context.last_bar_time:
+            replace_price(context, price)
+        elif context.last_bar_time is None or bar_time > context.last_bar_time:
+            push_price(context, price)
+            context.last_bar_time = bar_time
+    if len(context.window) < {long_period}:
+        return
+
+    # ma_short 与 ma_long 的比较转为整数比较：sum_short * long 对比 sum_long * short
+    diff = context.sum_short * {long_period} - context.sum_long * {short_period}
     pos = context.position(context.symbol).volume
 
-    if ma_short > ma_long and pos == 0:
+    if diff > 0 and pos == 0:
         context.order_target_percent(context.symbol, 1)
-    elif ma_short < ma_long and pos > 0:
+    elif diff < 0 and pos > 0:
         context.order_target_percent(context.symbol, 0)
 '''
         return self.save_strategy(strategy_name, code) 
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""
+选股工具
+将股票池行情加载为一个 (field, symbol, time) 面板，筛选与排序表达式对全部股票向量化求值，
+排序取前K只时使用部分排序（argpartition），不对全体股票完整排序
+"""
+
+import hashlib
+import logging
+import math
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import config
+from ..strategies.ma_strategy import PERIODS_PER_YEAR
+from ..strategies.ma_sweep import cross_signals
+from ..utils.market_panel import MarketPanel
+from ..utils.xtquant_client import xt_client
+
+logger = logging.getLogger(__name__)
+
+# 表达式：[-]因子名[(参数, ...)] [比较运算符 数值]
+_EXPR_PATTERN = re.compile(
+    r'^\s*(?P<neg>-)?\s*(?P<name>[a-z_]+)\s*(?:\((?P<args>[^)]*)\))?\s*'
+    r'(?:(?P<op>>=|<=|==|!=|>|<)\s*(?P<value>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?))?\s*$'
+)
+
+_COMPARE = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less,
+    '<=': np.less_equal, '==': np.equal, '!=': np.not_equal,
+}
+
+class _Factor:
+    """选股因子：compute(panel视图, *参数) 返回每只股票在最新一根K线上的取值"""
+
+    def __init__(self, compute: Callable, defaults: Tuple[int, ...], lookback: Callable[..., int],
+                 boolean: bool = False, description: str = ''):
+        self.compute = compute
+        self.defaults = defaults
+        self.lookback = lookback
+        self.boolean = boolean
+        self.description = description
+
+def _last(values: np.ndarray) -> np.ndarray:
+    return values[:, -1]
+
+def _momentum(view: Dict[str, np.ndarray], n: int) -> np.ndarray:
+    close = view['close']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return close[:, -1] / close[:, -1 - n] - 1.0
+
+def _ma(view: Dict[str, np.ndarray], n: int) -> np.ndarray:
+    return view['close'][:, -n:].mean(axis=1)
+
+def _ma_cross(view: Dict[str, np.ndarray], short: int, long: int) -> Tuple[np.ndarray, np.ndarray]:
+    """最近两根K线的均线交叉信号 (昨日, 今日)"""
+    close = view['close']
+    mas = {}
+    for n in (short, long):
+        mas[n] = np.stack([close[:, -1 - n:-1].mean(axis=1), close[:, -n:].mean(axis=1)], axis=1)
+    scale = np.abs(close[:, -long - 1:]).max(axis=1, keepdims=True)
+    signals = cross_signals(mas[short], mas[long], scale)
+    # 任一均线含NaN（停牌或数据不足）时无信号
+    missing = np.isnan(mas[short]).any(axis=1) | np.isnan(mas[long]).any(axis=1)
+    return signals[:, 0], np.where(missing, 0, signals[:, 1])
+
+def _ma_cross_up(view: Dict[str, np.ndarray], short: int, long: int) -> np.ndarray:
+    before, now = _ma_cross(view, short, long)
+    return ((before <= 0) & (now > 0)).astype(np.float64)
+
+def _ma_cross_down(view: Dict[str, np.ndarray], short: int, long: int) -> np.ndarray:
+    before, now = _ma_cross(view, short, long)
+    return ((before >= 0) & (now < 0)).astype(np.float64)
+
+def _volatility(view: Dict[str, np.ndarray], n: int) -> np.ndarray:
+    close = view['close'][:, -1 - n:]
+    returns = close[:, 1:] / close[:, :-1] - 1.0
+    return returns.std(axis=1, ddof=1) * math.sqrt(view['periods_per_year'])
+
+def _volume_ratio(view: Dict[str, np.ndarray], n: int) -> np.ndarray:
+    volume = view['volume']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return volume[:, -1] / volume[:, -1 - n:-1].mean(axis=1)
+
+FACTORS: Dict[str, _Factor] = {
+    'close': _Factor(lambda view: _last(view['close']), (), lambda: 1, description='最新收盘价'),
+    'momentum': _Factor(_momentum, (20,), lambda n: n + 1, description='N日涨幅'),
+    'ma': _Factor(_ma, (20,), lambda n: n, description='N日均线'),
+    'ma_cross_up': _Factor(_ma_cross_up, (5, 20), lambda short, long: long + 1, boolean=True,
+                           description='当日短均线上穿长均线'),
+    'ma_cross_down': _Factor(_ma_cross_down, (5, 20), lambda short, long: long + 1, boolean=True,
+                             description='当日短均线下穿长均线'),
+    'volatility': _Factor(_volatility, (20,), lambda n: n + 1, description='N日年化波动率'),
+    'volume_ratio': _Factor(_volume_ratio, (5,), lambda n: n + 1, description='当日成交量/前N日均量'),
+}
+
+class _Expression:
+    """解析后的筛选/排序表达式"""
+
+    def __init__(self, text: str):
+        match = _EXPR_PATTERN.match(text)
+        if not match:
+            raise ValueError(f"无法解析表达式: {text}")
+        self.text = text.strip()
+        self.negate = bool(match.group('neg'))
+        name = match.group('name')
+        if name not in FACTORS:
+            supported = ', '.join(f"{key}({factor.description})" for key, factor in FACTORS.items())
+            raise ValueError(f"不支持的因子: {name}，支持的因子: {supported}")
+        self.factor = FACTORS[name]
+        args = [arg.strip() for arg in (match.group('args') or '').split(',') if arg.strip()]
+        if len(args) > len(self.factor.defaults):
+            raise ValueError(f"因子 {name} 最多接受{len(self.factor.defaults)}个参数: {text}")
+        try:
+            self.args = tuple(int(arg) for arg in args) + self.factor.defaults[len(args):]
+        except ValueError:
+            raise ValueError(f"因子参数必须为整数: {text}")
+        if any(arg < 1 for arg in self.args):
+            raise ValueError(f"因子参数必须大于0: {text}")
+        self.key = (name, self.args)
+        self.label = f"{name}({','.join(map(str, self.args))})" if self.args else name
+        self.op = match.group('op')
+        self.value = float(match.group('value')) if self.op else None
+
+    @property
+    def lookback(self) -> int:
+        return self.factor.lookback(*self.args)
+
+    def evaluate(self, view: Dict[str, np.ndarray], memo: Dict) -> np.ndarray:
+        """因子取值（同一因子在多个表达式中只计算一次）"""
+        values = memo.get(self.key)
+        if values is None:
+            values = memo[self.key] = self.factor.compute(view, *self.args)
+        return -values if self.negate else values
+
+    def mask(self, view: Dict[str, np.ndarray], memo: Dict) -> np.ndarray:
+        """筛选条件是否成立，NaN 视为不成立"""
+        values = self.evaluate(view, memo)
+        if self.op is None:
+            if not self.factor.boolean:
+                raise ValueError(f"数值因子需要给出比较条件，如 {self.label} > 0")
+            return values > 0
+        with np.errstate(invalid='ignore'):
+            return _COMPARE[self.op](values, self.value)
+
+def parse_filters(filters: str) -> List[_Expression]:
+    """解析以分号或 and 分隔的筛选条件"""
+    parts = re.split(r';|\band\b', filters or '')
+    return [_Expression(part) for part in parts if part.strip()]
+
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """取值最大的 k 个下标（降序），NaN 不参与排序"""
+    candidates = np.flatnonzero(~np.isnan(values))
+    if k <= 0 or len(candidates) == 0:
+        return candidates[:0]
+    if len(candidates) > k:
+        part = np.argpartition(-values[candidates], k - 1)[:k]
+        candidates = candidates[part]
+    return candidates[np.argsort(-values[candidates], kind='stable')]
+
+class ScreeningTool:
+    """选股工具"""
+
+    def __init__(self):
+        self.max_stocks_scan = config.screening.max_stocks_scan
+        self.default_limit = config.screening.default_limit
+        self.performance_mode = config.screening.performance_mode
+
+    def screen_stocks(self, filters: str = "", rank_by: str = "momentum(20)", sector: str = '沪深A股',
+                      limit: Optional[int] = None, end_date: Optional[str] = None, period: str = '1d',
+                      max_stocks: Optional[int] = None) -> str:
+        """按条件筛选股票并排序
+
+        Args:
+            filters: 筛选条件，分号或 and 分隔，如 "ma_cross_up(5,20); momentum(20) > 0.05;
+                     volatility(20) < 0.4; volume_ratio(5) > 2"
+            rank_by: 排序因子，默认降序，前加 - 为升序，如 "-volatility(20)"
+            sector: 股票池板块
+            limit: 返回条数，默认读取 screening_config.default_limit
+            end_date: 截止日期 YYYYMMDD，默认今天
+            period: K线周期
+            max_stocks: 扫描股票数上限，默认读取 screening_config.max_stocks_scan，0 表示不限
+
+        Returns:
+            选股结果
+        """
+        try:
+            t0 = time.perf_counter()
+            expressions = parse_filters(filters)
+            rank = _Expression(rank_by) if rank_by else None
+            if rank is not None and rank.op is not None:
+                return f"[ERROR] 排序因子不能包含比较条件: {rank_by}"
+            limit = self.default_limit if limit is None else limit
+            if limit <= 0:
+                return "[ERROR] 返回条数必须大于0"
+
+            panel = self._load_panel(sector, period, end_date, expressions + ([rank] if rank else []), max_stocks)
+            if panel is None or len(panel) == 0:
+                return f"[ERROR] 无法获取板块 {sector} 的行情数据"
+            t_load = time.perf_counter()
+
+            lookback = max([expr.lookback for expr in expressions + ([rank] if rank else [])] + [1])
+            if len(panel) < lookback:
+                return f"[ERROR] 行情长度({len(panel)})不足表达式所需的{lookback}根K线"
+            view = self._view(panel, lookback, period)
+            memo: Dict = {}
+
+            selected = np.ones(len(panel.symbols), dtype=bool)
+            for expr in expressions:
+                selected &= expr.mask(view, memo)
+            idx = np.flatnonzero(selected)
+
+            if rank is not None:
+                order = idx[top_k(rank.evaluate(view, memo)[idx], limit)]
+            else:
+                order = idx[:limit]
+            elapsed = (time.perf_counter() - t0) * 1000
+            logger.info(f"选股完成: 扫描{len(panel.symbols)}只, 命中{len(idx)}只, "
+                        f"加载{(t_load - t0) * 1000:.0f}ms, 总耗时{elapsed:.0f}ms")
+
+            return self._report(panel, view, memo, expressions, rank, idx, order, elapsed)
+
+        except ValueError as e:
+            return f"[ERROR] {str(e)}"
+        except Exception as e:
+            logger.error(f"选股失败: {e}")
+            return f"[ERROR] 选股失败: {str(e)}"
+
+    # 私有方法
+
+    def _load_panel(self, sector: str, period: str, end_date: Optional[str], expressions: List[_Expression],
+                    max_stocks: Optional[int]) -> Optional[MarketPanel]:
+        """加载股票池面板，结果放入行情内存缓存，缓存有效期内重复选股不再拉取"""
+        symbols = xt_client.get_stock_list(sector)
+        if not symbols:
+            raise ValueError(f"无法获取板块 {sector} 的股票列表")
+        max_stocks = self.max_stocks_scan if max_stocks is None else max_stocks
+        if max_stocks and max_stocks > 0:
+            symbols = symbols[:max_stocks]
+
+        start_date, end_date = self._date_range(end_date, period, expressions)
+
+        def load() -> MarketPanel:
+            result = xt_client.fetch_many(symbols, start_date, end_date, period)
+            if result.panel is None:
+                raise ValueError(f"板块 {sector} 无有效行情数据")
+            if result.failed:
+                logger.warning(f"选股行情{len(result.failed)}只股票获取失败，已跳过")
+            return result.panel
+
+        # 以股票列表内容作键：板块成分调整后数量不变也不会命中旧面板
+        universe = hashlib.blake2b('\x1f'.join(symbols).encode(), digest_size=16).hexdigest()
+        return xt_client.cache.get_or_load(
+            ('screen_panel', sector, universe, period, start_date, end_date), load)
+
+    def _date_range(self, end_date: Optional[str], period: str,
+                    expressions: List[_Expression]) -> Tuple[str, str]:
+        """性能优先模式按表达式所需K线数确定起始日期，否则使用 default_date_range"""
+        end = end_date.replace('-', '') if end_date else datetime.now().strftime('%Y%m%d')
+        if not self.performance_mode:
+            start = config.screening.default_date_range.split('-')[0]
+            return start, end
+        lookback = max([expr.lookback for expr in expressions] + [1])
+        bars_per_day = max(1, PERIODS_PER_YEAR.get(period, 252) // 252)
+        # 交易日约为自然日的 5/7，另留出节假日余量
+        days = math.ceil(lookback / bars_per_day * 1.5) + 15
+        start = (datetime.strptime(end, '%Y%m%d') - timedelta(days=days)).strftime('%Y%m%d')
+        return start, end
+
+    @staticmethod
+    def _view(panel: MarketPanel, lookback: int, period: str) -> Dict[str, np.ndarray]:
+        """只取最近 lookback+1 根K线的字段视图，因子计算量与历史长度无关"""
+        view = {field: panel.field(field)[:, -lookback - 1:] for field in panel.fields}
+        view['periods_per_year'] = PERIODS_PER_YEAR.get(period, 252)
+        return view
+
+    def _report(self, panel: MarketPanel, view: Dict[str, np.ndarray], memo: Dict,
+                expressions: List[_Expression], rank: Optional[_Expression], idx: np.ndarray,
+                order: np.ndarray, elapsed: float) -> str:
+        """生成选股报告"""
+        lines = [f"[OK] 选股完成: 扫描{len(panel.symbols)}只, 符合条件{len(idx)}只, 耗时{elapsed:.0f}ms"]
+        lines.append(f"[DATE] 数据截至: {panel.index[-1].strftime('%Y-%m-%d')}")
+        if expressions:
+            lines.append(f"[FILTER] 筛选条件: {'; '.join(expr.text for expr in expressions)}")
+        if rank is not None:
+            lines.append(f"[RANK] 排序: {rank.text}")
+        if len(order) == 0:
+            lines.append("\n[INFO] 没有符合条件的股票")
+            return "\n".join(lines)
+
+        columns = [expr for expr in expressions if not expr.factor.boolean]
+        if rank is not None and all(rank.key != expr.key for expr in columns):
+            columns.append(rank)
+        close = view['close'][:, -1]
+        header = ["排名", "股票代码", "收盘价"] + [expr.label for expr in columns]
+        lines.append("\n" + " | ".join(header))
+        for i, pos in enumerate(order, 1):
+            values = [f"{memo[expr.key][pos]:.4f}" for expr in columns]
+            lines.append(" | ".join([str(i), panel.symbols[pos], f"{close[pos]:.2f}"] + values))
+        return "\n".join(lines)
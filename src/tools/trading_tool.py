@@ -3,15 +3,26 @@
 提供下单、撤单和持仓管理的MCP工具接口
 """
 
+import itertools
 import logging
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
 from ..utils.xtquant_client import xt_client
+from ..utils.quote_engine import quote_engine
+from ..utils.data_handler import DataHandler
+from ..utils.order_tracker import AsyncOrderTracker
+from ..utils.order_book import OrderBook
+from ..utils.risk_engine import PreTradeRiskEngine
 from ..config import config
 
 # 导入XTQuant交易相关模块
 try:
-    from xtquant.xttrader import XtQuantTrader
+    from xtquant.xttrader import XtQuantTrader, XtQuantTraderCallback
     from xtquant.xttype import StockAccount
     from xtquant import xtconstant
     XTQUANT_AVAILABLE = True
@@ -22,6 +33,39 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+class TraderCallback(XtQuantTraderCallback if XTQUANT_AVAILABLE else object):
+    """XtQuantTrader 回调，将异步下单回报转交给回报关联器，委托/成交/持仓/资产推送转交给交易账本"""
+
+    def __init__(self, tracker: AsyncOrderTracker, book: OrderBook):
+        super().__init__()
+        self.tracker = tracker
+        self.book = book
+
+    def on_disconnected(self):
+        logger.warning("XTQuant交易连接断开")
+
+    def on_order_stock_async_response(self, response):
+        self.tracker.on_response(response.seq, response.order_id, getattr(response, 'error_msg', ''))
+
+    def on_order_error(self, order_error):
+        self.tracker.on_error(
+            getattr(order_error, 'error_msg', '') or f"错误代码: {getattr(order_error, 'error_id', '')}",
+            seq=getattr(order_error, 'seq', None),
+            remark=getattr(order_error, 'order_remark', None),
+        )
+
+    def on_stock_order(self, order):
+        self.book.on_order(order)
+
+    def on_stock_trade(self, trade):
+        self.book.on_trade(trade)
+
+    def on_stock_position(self, position):
+        self.book.on_position(position)
+
+    def on_stock_asset(self, asset):
+        self.book.on_asset(asset)
+
 class TradingTool:
     """交易执行工具"""
     
@@ -41,6 +85,13 @@ class TradingTool:
         # 交易器实例
         self.trader = None
         self.account = None
+        self.order_tracker = AsyncOrderTracker(on_late=self._on_late_response)
+        self._timed_out: Dict[int, Any] = {}   # 等待超时的 seq -> (保留额度编号, 下单备注)
+        self.order_book = OrderBook()
+        self.risk_engine = PreTradeRiskEngine(self.order_book)
+        self.callback = TraderCallback(self.order_tracker, self.order_book)
+        self.order_book.add_listener(self._on_new_order)
+        self._batch_ids = itertools.count(1)
         self._init_trader()
     
     def place_order(self, symbol: str, quantity: int, price: float, direction: str = "BUY") -> str:
@@ -59,6 +110,7 @@ class TradingTool:
         """
         
         try:
+            symbol = xt_client.resolve_symbol(symbol)
             logger.info(f"执行下单: {symbol} {direction} {quantity}股 @{price}")
             
             # 检查交易状态
@@ -82,8 +134,19 @@ class TradingTool:
             if not self._ensure_trader_ready():
                 return "[ERROR] XTQuant交易器未就绪，无法执行交易"
             
+            # 下单前风控（参考价取自实时行情引擎）
+            self._ensure_quotes([symbol])
+            decision = self.risk_engine.check(symbol, direction, quantity, price)
+            if not decision.passed:
+                logger.warning(f"风控拒绝: {symbol} {direction} {quantity}股 @{price}, {decision.reason}")
+                return f"[RISK] 风控拒绝: {decision.reason}"
+            
             # 执行下单
             order_result = self._execute_simple_order(symbol, direction, quantity, price)
+            if order_result['success']:
+                self.risk_engine.bind(decision.token, order_result['order_id'])
+            else:
+                self.risk_engine.release(decision.token)
             
             # 生成简化报告
             return self._generate_simple_report(symbol, direction, quantity, price, order_result)
@@ -92,6 +155,53 @@ class TradingTool:
             logger.error(f"下单执行失败: {e}")
             return f"[ERROR] 下单执行失败: {str(e)}"
     
+    def place_orders(self, orders: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量下单
+        
+        一次校验整篮订单，逐笔通过下单前风控后经 order_stock_async 连续提交，之后统一等待回报，
+        请求序号 seq 与回调中的订单号一一关联。
+        
+        Args:
+            orders: 订单列表，每项含 symbol、quantity、price，可选 direction（默认BUY）
+        
+        Returns:
+            {
+                'success': 是否全部订单均已被接受,
+                'accepted': 被接受的订单数, 'rejected': 校验未通过或柜台拒绝的订单数,
+                'elapsed_ms': 耗时,
+                'orders': 与输入顺序一致的逐笔结果，含 status（ACCEPTED/REJECTED/TIMEOUT）、order_id、message
+            }
+        """
+        t0 = time.perf_counter()
+        try:
+            if not orders:
+                return {'success': False, 'error': '订单列表为空', 'orders': []}
+            if self.trading_state != "NORMAL":
+                return {'success': False, 'error': f"交易状态异常: {self.trading_state}，无法执行交易", 'orders': []}
+
+            basket = self._validate_basket(orders)
+            valid = basket['message'].isna().to_numpy()
+            logger.info(f"批量下单: {len(basket)}笔, 校验通过{int(valid.sum())}笔")
+
+            if valid.any():
+                if not self._ensure_trader_ready():
+                    return {'success': False, 'error': "XTQuant交易器未就绪，无法执行交易", 'orders': []}
+                self._submit_basket(basket, np.flatnonzero(valid))
+
+            results = basket.astype(object).where(basket.notna(), None).to_dict('records')
+            accepted = int((basket['status'] == 'ACCEPTED').sum())
+            return {
+                'success': accepted == len(basket),
+                'accepted': accepted,
+                'rejected': int((basket['status'] == 'REJECTED').sum()),
+                'timeout': int((basket['status'] == 'TIMEOUT').sum()),
+                'elapsed_ms': round((time.perf_counter() - t0) * 1000, 1),
+                'orders': results,
+            }
+        except Exception as e:
+            logger.error(f"批量下单执行失败: {e}")
+            return {'success': False, 'error': f"批量下单执行失败: {str(e)}", 'orders': []}
+    
     def cancel_order(self, order_id: str) -> str:
         """撤单工具
         
@@ -139,19 +249,67 @@ class TradingTool:
                 return "[ERROR] XTQuant交易器未就绪，无法查询持仓"
             
             if symbol:
+                symbol = xt_client.resolve_symbol(symbol)
                 # 查询指定股票持仓
                 position = self._get_single_position(symbol)
                 if position:
                     return f"[POSITION] {symbol} 持仓: {position['quantity']}股, 成本价: {position['avg_price']:.2f}"
                 else:
                     return f"[INFO] {symbol} 暂无持仓"
-            else:
+            
+            if not self.order_book.seeded:
                 return "[INFO] 请指定股票代码查询持仓"
+            positions = self.order_book.positions()
+            if not positions:
+                return "[INFO] 暂无持仓"
+            report = f"[POSITION] 共{len(positions)}只持仓\n"
+            for code in sorted(positions):
+                position = positions[code]
+                report += (f"{code}: {position['volume']}股, 可用{position['can_use_volume']}股, "
+                           f"成本价: {position['avg_price'] or 0:.2f}\n")
+            return report
             
         except Exception as e:
             logger.error(f"查询持仓失败: {e}")
             return f"[ERROR] 查询持仓失败: {str(e)}"
     
+    def get_orders(self, symbol: str = None, open_only: bool = False) -> str:
+        """查询当日委托，读取本地交易账本
+        
+        Args:
+            symbol: 股票代码（可选），为空时返回全部委托
+            open_only: 为True时只返回未成交完、未撤销的委托
+        
+        Returns:
+            委托列表
+        """
+        
+        try:
+            if not self._ensure_trader_ready():
+                return "[ERROR] XTQuant交易器未就绪，无法查询委托"
+            if not self.order_book.seeded:
+                return "[ERROR] 交易账本尚未建立，请稍后重试"
+            
+            if symbol:
+                symbol = xt_client.resolve_symbol(symbol)
+            orders = self.order_book.orders(symbol, open_only=open_only)
+            if not orders:
+                return "[INFO] 暂无委托"
+            
+            report = f"[ORDERS] 共{len(orders)}笔委托\n"
+            for order in orders:
+                report += (f"{order['order_id']} {order['stock_code']} 委托{order['order_volume']}股 "
+                           f"@{order['price'] or 0:.2f}, 已成交{order['traded_volume']}股, "
+                           f"状态: {order['status_msg'] or order['order_status']}")
+                if order['order_remark']:
+                    report += f", 备注: {order['order_remark']}"
+                report += "\n"
+            return report
+            
+        except Exception as e:
+            logger.error(f"查询委托失败: {e}")
+            return f"[ERROR] 查询委托失败: {str(e)}"
+    
     def set_trading_state(self, state: str, reason: str = "") -> str:
         """设置交易状态
         
@@ -176,6 +334,17 @@ class TradingTool:
     
     # 私有方法
     
+    def start_quotes(self) -> bool:
+        """启动实时行情引擎，订阅持仓、当日成交、未完成委托与 QUOTE_SYMBOLS 中的股票，
+        之后新委托的股票由账本回调追加订阅"""
+        symbols = [config.strategy.default_symbol] + list(config.data.quote_symbols)
+        if self._ensure_trader_ready():
+            book = self.order_book
+            symbols += list(book.positions())
+            symbols += [trade['stock_code'] for trade in book.trades()]
+            symbols += [order['stock_code'] for order in book.orders(open_only=True)]
+        return quote_engine.start(xt_client.resolve_symbol(symbol) for symbol in symbols)
+    
     def _init_trader(self):
         """初始化交易器"""
         if not XTQUANT_AVAILABLE:
@@ -184,6 +353,7 @@ class TradingTool:
         
         try:
             self.trader = XtQuantTrader(self.qmt_path, self.session_id)
+            self.trader.register_callback(self.callback)
             self.account = StockAccount(self.account_id)
             logger.info("XTQuant交易器初始化完成")
         except Exception as e:
@@ -208,26 +378,162 @@ class TradingTool:
                     return False
                 self.trader._connected = True
                 logger.info("XTQuant交易器连接成功")
+                self._seed_order_book()
             
             return True
         except Exception as e:
             logger.error(f"XTQuant交易器连接检查失败: {e}")
             return False
     
-    def _get_current_price(self, symbol):
-        """获取当前价格"""
+    def _seed_order_book(self):
+        """连接后批量查询一次建立交易账本，并启动定期对账"""
         try:
-            # 这里应该调用XTQuant接口获取实时价格
-            # 临时返回固定价格用于测试
-            price_map = {
-                '000001.SZ': 10.50,
-                '000002.SZ': 25.80,
-                '600000.SH': 6.20,
-                '600036.SH': 42.15
-            }
-            return price_map.get(symbol, 10.00)
-        except:
-            return None
+            self.order_book.seed(self.trader, self.account)
+            self.order_book.start_reconciler(self.trader, self.account, config.trading.reconcile_interval)
+        except Exception as e:
+            logger.error(f"建立交易账本失败，持仓查询将直接访问柜台: {e}")
+    
+    def _validate_basket(self, orders: List[Dict[str, Any]]) -> pd.DataFrame:
+        """整篮校验，规则与 place_order 相同；校验失败的订单 message 为原因，其余为空"""
+        basket = pd.DataFrame({
+            'symbol': [xt_client.resolve_symbol(str(order.get('symbol') or '').strip()) for order in orders],
+            'direction': [str(order.get('direction') or 'BUY').upper() for order in orders],
+            'quantity': pd.to_numeric(pd.Series([order.get('quantity') for order in orders], dtype=object),
+                                      errors='coerce'),
+            'price': pd.to_numeric(pd.Series([order.get('price') for order in orders], dtype=object),
+                                   errors='coerce'),
+        })
+        quantity = basket['quantity'].to_numpy(dtype=np.float64)
+        price = basket['price'].to_numpy(dtype=np.float64)
+
+        # 条件按优先级排列，每笔订单取第一条不满足的规则
+        checks = [
+            (~DataHandler.validate_symbols(basket['symbol']), "股票代码格式错误"),
+            (~((quantity > 0) & (quantity % self.min_order_quantity == 0)),
+             f"数量必须是正数且为{self.min_order_quantity}的整数倍"),
+            (~(price > 0), "价格必须大于0"),
+            (~basket['direction'].isin(['BUY', 'SELL']).to_numpy(), "交易方向必须是BUY或SELL"),
+        ]
+        invalid = np.column_stack([failed for failed, _ in checks])
+        messages = np.array([message for _, message in checks], dtype=object)
+        rejected = invalid.any(axis=1)
+
+        basket['quantity'] = np.where(np.isnan(quantity), 0, quantity).astype(np.int64)
+        basket['amount'] = np.round(basket['quantity'] * np.nan_to_num(price), 2)
+        basket['status'] = np.where(rejected, 'REJECTED', 'PENDING')
+        basket['order_id'] = None
+        basket['message'] = np.where(rejected, messages[invalid.argmax(axis=1)], None)
+        return basket
+
+    def _submit_basket(self, basket: pd.DataFrame, rows: np.ndarray):
+        """异步提交校验通过的订单并等待回报，结果写回 basket"""
+        status = basket['status'].to_numpy(dtype=object).copy()
+        order_ids = basket['order_id'].to_numpy(dtype=object).copy()
+        messages = basket['message'].to_numpy(dtype=object).copy()
+        symbols = basket['symbol'].to_numpy()
+        directions = basket['direction'].to_numpy()
+        quantities = basket['quantity'].to_numpy()
+        prices = basket['price'].to_numpy()
+
+        # 下单备注带批次号与序号，用于关联不带 seq 的错误回报
+        batch = next(self._batch_ids)
+        self._ensure_quotes(symbols[rows])
+        seq_rows = {}
+        tokens = {}
+        for row in rows:
+            # 逐笔风控，前面已通过的订单计入后续订单的挂单额度
+            decision = self.risk_engine.check(symbols[row], directions[row], int(quantities[row]), float(prices[row]))
+            if not decision.passed:
+                status[row], messages[row] = 'REJECTED', f'风控拒绝: {decision.reason}'
+                continue
+            tokens[row] = decision.token
+            remark = f"B{batch}_{row}"
+            try:
+                seq = self.trader.order_stock_async(
+                    self.account,
+                    symbols[row],
+                    xtconstant.STOCK_BUY if directions[row] == 'BUY' else xtconstant.STOCK_SELL,
+                    int(quantities[row]),
+                    xtconstant.FIX_PRICE,
+                    float(prices[row]),
+                    config.trading.default_strategy_name,
+                    remark
+                )
+            except Exception as e:
+                logger.error(f"提交订单失败 {symbols[row]}: {e}")
+                status[row], messages[row] = 'REJECTED', f'订单执行异常: {str(e)}'
+                self.risk_engine.release(tokens[row])
+                continue
+            if seq is None or seq <= 0:
+                status[row], messages[row] = 'REJECTED', f'订单提交失败，错误代码: {seq}'
+                self.risk_engine.release(tokens[row])
+                continue
+            seq_rows[seq] = row
+            self.order_tracker.expect(seq, remark)
+
+        responses = self.order_tracker.collect(seq_rows, config.trading.order_timeout)
+        for seq, row in seq_rows.items():
+            response = responses.get(seq)
+            if response is None:
+                # 请求已发出，订单可能已被柜台接受：保留额度待回报到达后绑定或释放
+                remark = f"B{batch}_{row}"
+                self._track_timeout(seq, tokens[row], remark)
+                status[row] = 'TIMEOUT'
+                messages[row] = (f'{config.trading.order_timeout}秒内未收到下单回报，订单可能已被柜台接受，'
+                                 f'请按下单备注 {remark} 在 get_orders 中核对后再决定是否重新提交')
+            elif response['order_id'] and response['order_id'] > 0:
+                status[row], order_ids[row], messages[row] = 'ACCEPTED', str(response['order_id']), '订单已成功提交'
+                self.risk_engine.bind(tokens[row], response['order_id'])
+            else:
+                status[row] = 'REJECTED'
+                messages[row] = response['error'] or f"订单提交失败，错误代码: {response['order_id']}"
+                self.risk_engine.release(tokens[row])
+
+        basket['status'] = status
+        basket['order_id'] = order_ids
+        basket['message'] = messages
+
+    def _track_timeout(self, seq: int, token: Optional[int], remark: str):
+        """记录等待超时的请求；长期无回报的记录整体清空，其保留额度按有效期过期"""
+        if len(self._timed_out) >= 10000:
+            self._timed_out.clear()
+        self._timed_out[seq] = (token, remark)
+
+    def _on_late_response(self, seq: int, order_id: Optional[int], error: Optional[str]):
+        """超时后到达的下单回报（回调线程调用）：被接受时将保留额度绑定到订单号，被拒绝时释放"""
+        pending = self._timed_out.pop(seq, None)
+        if pending is None:
+            return
+        token, remark = pending
+        if order_id and order_id > 0:
+            logger.warning(f"下单请求 {remark} 在等待超时后被柜台接受: order_id={order_id}")
+            self.risk_engine.bind(token, order_id)
+        else:
+            logger.warning(f"下单请求 {remark} 在等待超时后被柜台拒绝: {error or order_id}")
+            self.risk_engine.release(token)
+
+    def _ensure_quotes(self, symbols):
+        """确保实时行情引擎持有这些股票的有效最新价：缺失或过期的股票批量查询一次快照写入引擎，并追加订阅推送"""
+        max_age = config.risk.max_quote_age
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            age = quote_engine.quote_age(symbol)
+            if age is None or 0 < max_age < age:
+                missing.append(symbol)
+        if not missing or not xt_client.is_connected():
+            return
+        
+        try:
+            ticks = xt_client.get_full_tick(missing)
+            if ticks:
+                quote_engine.on_push(ticks)
+        except Exception as e:
+            logger.debug(f"获取最新价快照失败: {e}")
+        quote_engine.watch(missing)
+    
+    def _on_new_order(self, order: Dict[str, Any]):
+        """账本收到新委托时订阅该股票的实时行情（回调线程调用，已订阅时为 O(1) 判断）"""
+        quote_engine.watch([order['stock_code']])
     
     def _execute_simple_order(self, symbol, direction, quantity, price):
         """执行简化订单"""
@@ -297,6 +603,16 @@ class TradingTool:
             # 模拟模式
             return None
         
+        # 优先读取交易账本，账本未建立时直接查询柜台
+        if self.order_book.seeded:
+            position = self.order_book.position(symbol)
+            if position and position['volume'] > 0:
+                return {
+                    'quantity': position['volume'],
+                    'avg_price': position['avg_price'] or 0
+                }
+            return None
+        
         try:
             position = self.trader.query_stock_position(self.account, symbol)
             if position and getattr(position, 'volume', 0) > 0:
@@ -1,9 +1,25 @@
 """
 工具类模块
 包含数据处理、xtquant客户端等工具
+
+子模块依赖 pandas/numpy，这里按需导入，
+使 executors 等轻量模块可以在不加载重型依赖的情况下单独使用
 """
 
-from .xtquant_client import XTQuantClient
-from .data_handler import DataHandler
+import importlib
+
+_EXPORTS = {
+    'XTQuantClient': '.xtquant_client',
+    'DataHandler': '.data_handler',
+    'MarketPanel': '.market_panel',
+    'SymbolIndex': '.symbol_index',
+}
+
+__all__ = ['XTQuantClient', 'DataHandler', 'MarketPanel', 'SymbolIndex']
 
-__all__ = ['XTQuantClient', 'DataHandler'] 
\ No newline at end of file
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,170 @@
+"""
+K线本地缓存模块
+按 (股票代码, 周期) 将K线以列式 .npz 文件落盘，重复请求直接读盘，
+只向 xtdata 补取缺失的头部/尾部区间
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class BarCache:
+    """本地列式K线缓存
+
+    每个 (symbol, period) 对应一个 .npz 文件，包含：
+        - time: int64 纳秒时间戳（升序、唯一）
+        - 各行情字段列（open/high/low/close/volume/...）
+        - covered_start / covered_end: 已从 xtdata 完整拉取过的日期区间（YYYYMMDD）
+
+    已覆盖区间始终保持连续，缺失部分只会出现在头部或尾部。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def missing_ranges(self, symbol: str, period: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """计算请求区间中尚未缓存的部分，返回需要补取的 (start, end) 列表"""
+        meta = self._load_meta(symbol, period)
+        if meta is None:
+            return [(start_date, end_date)]
+
+        covered_start, covered_end = meta
+        ranges = []
+        # 头部缺口：与已覆盖区间首日重叠一天，保证区间连续
+        if start_date < covered_start:
+            ranges.append((start_date, covered_start))
+        # 尾部缺口：从已覆盖的最后一天重新拉取，顺带刷新可能未收盘的K线
+        if end_date > covered_end:
+            ranges.append((covered_end, end_date))
+        return ranges
+
+    def read(self, symbol: str, period: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """从缓存读取指定区间的K线"""
+        arrays = self._load(symbol, period)
+        if arrays is None:
+            return None
+
+        times = arrays.pop('time')
+        arrays.pop('covered_start', None)
+        arrays.pop('covered_end', None)
+
+        lo = np.searchsorted(times, _date_to_ns(start_date), side='left')
+        hi = np.searchsorted(times, _date_to_ns(end_date, end_of_day=True), side='right')
+        if hi <= lo:
+            return None
+
+        index = pd.DatetimeIndex(times[lo:hi], name='time')
+        return pd.DataFrame({field: values[lo:hi] for field, values in arrays.items()}, index=index)
+
+    def update(self, symbol: str, period: str, data: Optional[pd.DataFrame], start_date: str, end_date: str):
+        """合并新拉取的K线并扩展已覆盖区间，data 为空表示该区间内没有K线"""
+        with self._lock_for(symbol, period):
+            arrays = self._load(symbol, period)
+
+            start_date, end_date = start_date[:8], end_date[:8]
+            if arrays is None:
+                merged = data
+                covered_start, covered_end = start_date, end_date
+            else:
+                covered_start = min(str(arrays.pop('covered_start')), start_date)
+                covered_end = max(str(arrays.pop('covered_end')), end_date)
+                times = arrays.pop('time')
+                cached = pd.DataFrame(arrays, index=pd.DatetimeIndex(times, name='time'))
+                if data is None or data.empty:
+                    merged = cached
+                else:
+                    merged = pd.concat([cached, data])
+                    merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+
+            # 当天的K线可能尚未收盘，不计入已覆盖区间，下次请求时重新拉取
+            today = datetime.now().strftime('%Y%m%d')
+            if covered_end >= today:
+                covered_end = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+
+            # 区间内没有K线时也保存覆盖区间，避免停牌等区间每次请求都重新拉取
+            if merged is None or merged.empty:
+                if covered_end < covered_start:
+                    return
+                merged = pd.DataFrame(index=pd.DatetimeIndex([], dtype='datetime64[ns]', name='time'))
+
+            self._save(symbol, period, merged, covered_start, covered_end)
+
+    def clear(self, symbol: Optional[str] = None, period: Optional[str] = None):
+        """清除缓存，未指定参数时清空全部"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.npz'):
+                    continue
+                if period and os.path.basename(root) != period:
+                    continue
+                if symbol and name != f"{symbol}.npz":
+                    continue
+                os.remove(os.path.join(root, name))
+
+    # 私有方法
+
+    def _path(self, symbol: str, period: str) -> str:
+        return os.path.join(self.cache_dir, period, f"{symbol}.npz")
+
+    def _lock_for(self, symbol: str, period: str) -> threading.Lock:
+        key = f"{period}/{symbol}"
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _load(self, symbol: str, period: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._path(symbol, period)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                return {name: npz[name] for name in npz.files}
+        except Exception as e:
+            logger.warning(f"读取K线缓存失败，将重新拉取: {path}, {e}")
+            return None
+
+    def _load_meta(self, symbol: str, period: str) -> Optional[Tuple[str, str]]:
+        path = self._path(symbol, period)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                return str(npz['covered_start']), str(npz['covered_end'])
+        except Exception as e:
+            logger.warning(f"读取K线缓存元数据失败: {path}, {e}")
+            return None
+
+    def _save(self, symbol: str, period: str, data: pd.DataFrame, covered_start: str, covered_end: str):
+        path = self._path(symbol, period)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        arrays = {col: data[col].to_numpy() for col in data.columns}
+        arrays['time'] = data.index.values.astype('datetime64[ns]').astype(np.int64)
+        arrays['covered_start'] = np.array(covered_start)
+        arrays['covered_end'] = np.array(covered_end)
+
+        # 先写临时文件再原子替换，避免并发读到半截文件
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+def _date_to_ns(date_str: str, end_of_day: bool = False) -> int:
+    """将 YYYYMMDD[HHMMSS] 转换为纳秒时间戳"""
+    ts = pd.Timestamp(datetime.strptime(date_str[:8], '%Y%m%d'))
+    if len(date_str) >= 14:
+        ts = pd.Timestamp(datetime.strptime(date_str[:14], '%Y%m%d%H%M%S'))
+    elif end_of_day:
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+    return ts.value
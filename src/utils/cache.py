@@ -0,0 +1,199 @@
+"""
+内存缓存模块
+带TTL过期、按内存占用LRU淘汰、并发相同请求合并（single-flight）的线程安全缓存
+"""
+
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class _Flight:
+    """一次进行中的加载，供并发的相同请求等待结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class TTLCache:
+    """TTL + LRU 内存缓存
+
+    Args:
+        name: 缓存名称，用于日志和统计
+        ttl: 默认过期时间（秒），None 表示永不过期
+        max_bytes: 缓存内容的内存上限，超出后按最近最少使用淘汰
+        sizeof: 估算缓存值内存占用的函数
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = 300, max_bytes: int = 256 * 1024 * 1024,
+                 sizeof: Callable[[Any], int] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or estimate_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()   # key -> (value, expires_at, size)
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._loads = 0
+        self._load_errors = 0
+        self._coalesced = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，未命中或已过期时返回默认值"""
+        with self._lock:
+            value = self._get_locked(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING):
+        """写入缓存"""
+        ttl = self.ttl if ttl is _MISSING else ttl
+        size = self._sizeof(value)
+        with self._lock:
+            self._set_locked(key, value, ttl, size)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = _MISSING) -> Any:
+        """读取缓存，未命中时调用loader加载
+
+        同一key的并发请求只会触发一次loader调用，其余请求等待并共享结果。
+        loader返回None或抛出异常时不写入缓存。
+        """
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not _MISSING:
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            if value is not None:
+                self.set(key, value, ttl)
+            with self._lock:
+                self._loads += 1
+            return value
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._load_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def invalidate(self, key: Hashable = _MISSING):
+        """删除指定key，未指定时清空缓存"""
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'loads': self._loads,
+                'load_errors': self._load_errors,
+                'coalesced': self._coalesced,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    # 私有方法
+
+    def _get_locked(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return _MISSING
+        value, expires_at, size = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            self._expirations += 1
+            self._misses += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def _set_locked(self, key: Hashable, value: Any, ttl: Optional[float], size: int):
+        if size > self.max_bytes:
+            logger.debug(f"缓存[{self.name}]条目过大({size}字节)，不予缓存: {key}")
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._evictions += 1
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """估算对象占用的内存（字节）"""
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    memory_usage = getattr(value, 'memory_usage', None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(index=True)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        except Exception:
+            pass
+
+    size = sys.getsizeof(value)
+    if _depth >= 2:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
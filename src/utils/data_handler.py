@@ -8,8 +8,13 @@ import numpy as np
 from typing import Dict, Any, Optional
 import logging
 
+from .indicators import rolling_volatility
+
 logger = logging.getLogger(__name__)
 
+# 紧凑模式下以 float32 存储的价格列
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'preClose']
+
 class DataHandler:
     """数据处理器"""
     
@@ -39,6 +44,15 @@ class DataHandler:
         
         return True
     
+    @staticmethod
+    def validate_symbols(symbols) -> np.ndarray:
+        """批量验证股票代码格式，一次向量化匹配返回布尔数组"""
+        codes = pd.Series(symbols, dtype=object)
+        if codes.empty:
+            return np.zeros(0, dtype=bool)
+        valid = codes.str.fullmatch(r'\d{6}\.(?:SZ|SH)')
+        return valid.fillna(False).to_numpy(dtype=bool)
+    
     @staticmethod
     def validate_date(date_str: str) -> bool:
         """验证日期格式 YYYYMMDD"""
@@ -119,21 +133,125 @@ class DataHandler:
         return f"{value:.{decimals}f}"
     
     @staticmethod
-    def calculate_returns(data: pd.DataFrame) -> pd.DataFrame:
-        """计算收益率"""
+    def calculate_returns(data: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+        """计算收益率，compact=True 时收益率列使用 float32"""
         if data is None or data.empty:
             return data
         
-        data = data.copy()
-        data['returns'] = data['close'].pct_change()
-        data['log_returns'] = np.log(data['close'] / data['close'].shift(1))
+        close = data['close'].to_numpy(dtype=np.float32 if compact else np.float64)
+        returns = np.full(len(close), np.nan, dtype=close.dtype)
+        log_returns = np.full(len(close), np.nan, dtype=close.dtype)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = close[1:] / close[:-1]
+            returns[1:] = ratio - 1
+            log_returns[1:] = np.log(ratio)
         
-        return data
+        return data.assign(returns=returns, log_returns=log_returns)
+    
+    @staticmethod
+    def compact_market_data(data: pd.DataFrame, symbol: Optional[str] = None,
+                            calendar: Optional[pd.DatetimeIndex] = None,
+                            volume_unit: float = 1.0, amount_unit: float = 1000.0) -> pd.DataFrame:
+        """转换为紧凑表示（可选），显著降低整市场分钟级历史的内存占用
+        
+        - 价格列 float32
+        - volume/amount 按单位缩放后存为整数：存储值 = round(原值 / 单位)
+        - 时间索引替换为 int32 的交易日偏移 day（相对 calendar），日内数据另存 int32 秒数 second
+        - symbol 列为分类编码
+        
+        缩放单位与交易日历记录在 data.attrs['compact'] 中，可用 expand_market_data 还原。
+        
+        Args:
+            data: 标准行情 DataFrame（DatetimeIndex）
+            symbol: 股票代码，提供时添加分类编码的 symbol 列
+            calendar: 交易日历，默认使用数据自身出现过的交易日；数据中有日期不在日历内时同样回退到数据自身的交易日
+            volume_unit: 成交量缩放单位
+            amount_unit: 成交额缩放单位（默认千元）
+        """
+        if data is None or data.empty:
+            return data
+        
+        index = pd.DatetimeIndex(data.index)
+        days = index.normalize()
+        if calendar is None:
+            calendar = days.unique()
+        calendar = pd.DatetimeIndex(calendar).normalize()
+        
+        day_offsets = calendar.get_indexer(days)
+        if (day_offsets < 0).any():
+            # 交易日历缺少数据中的日期（日历过期、临时休市调整等）时，改用数据自身出现过的交易日
+            missing = days[day_offsets < 0].unique()
+            logger.warning(f"{symbol or ''}数据中{len(missing)}个日期不在交易日历内（如{missing[0]:%Y%m%d}），"
+                           f"改用数据自身的交易日")
+            calendar = days.unique()
+            day_offsets = calendar.get_indexer(days)
+        
+        columns = {'day': day_offsets.astype(np.int32)}
+        seconds = ((index - days) // pd.Timedelta(seconds=1)).to_numpy()
+        intraday = bool((seconds != 0).any())
+        if intraday:
+            columns['second'] = seconds.astype(np.int32)
+        
+        for col in data.columns:
+            values = data[col].to_numpy()
+            if col in PRICE_COLUMNS:
+                columns[col] = values.astype(np.float32)
+            elif col in ('volume', 'amount'):
+                unit = volume_unit if col == 'volume' else amount_unit
+                scaled = np.rint(np.nan_to_num(values.astype(np.float64)) / unit)
+                dtype = np.int32 if np.abs(scaled).max(initial=0) < np.iinfo(np.int32).max else np.int64
+                columns[col] = scaled.astype(dtype)
+            else:
+                columns[col] = values
+        
+        if symbol is not None:
+            columns['symbol'] = pd.Categorical([symbol] * len(data))
+        
+        compact = pd.DataFrame(columns)
+        compact.attrs['compact'] = {
+            'calendar': calendar,
+            'volume_unit': volume_unit,
+            'amount_unit': amount_unit,
+            'intraday': intraday,
+        }
+        return compact
+    
+    @staticmethod
+    def expand_market_data(compact: pd.DataFrame) -> pd.DataFrame:
+        """将紧凑表示还原为标准行情 DataFrame（float64 + DatetimeIndex）"""
+        meta = compact.attrs.get('compact')
+        if meta is None:
+            return compact
+        
+        index = meta['calendar'][compact['day'].to_numpy()]
+        if 'second' in compact.columns:
+            index = index + pd.to_timedelta(compact['second'].to_numpy(), unit='s')
+        
+        columns = {}
+        for col in compact.columns:
+            if col in ('day', 'second', 'symbol'):
+                continue
+            values = compact[col].to_numpy()
+            if col == 'volume':
+                values = values * meta['volume_unit']
+            elif col == 'amount':
+                values = values * meta['amount_unit']
+            columns[col] = values.astype(np.float64)
+        
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(index, name='time'))
+    
+    @staticmethod
+    def memory_usage(data: pd.DataFrame) -> int:
+        """DataFrame 实际占用的内存（字节，含索引）"""
+        if data is None:
+            return 0
+        return int(data.memory_usage(index=True, deep=True).sum())
     
     @staticmethod
-    def calculate_volatility(returns: pd.Series, window: int = 20) -> pd.Series:
-        """计算波动率"""
-        return returns.rolling(window=window).std() * np.sqrt(252)
+    def calculate_volatility(returns: pd.Series, window: int = 20, periods_per_year: int = 252) -> pd.Series:
+        """计算年化波动率"""
+        values = rolling_volatility(returns.to_numpy(dtype=np.float64), window, periods_per_year)
+        return pd.Series(values, index=returns.index, name=returns.name)
     
     @staticmethod
     def parse_date_range(date_range: str) -> tuple[str, str]:
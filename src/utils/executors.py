@@ -0,0 +1,68 @@
+"""
+阻塞任务执行器模块
+为交易、行情数据、文件读写分别提供独立的有界线程池，
+异步MCP工具通过 run_blocking 将阻塞调用派发出去，互不排队
+"""
+
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# 执行器类别
+TRADING = 'trading'
+MARKET_DATA = 'market_data'
+FILE_IO = 'file_io'
+
+class ExecutorPool:
+    """按类别管理的有界线程池集合"""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = dict(limits)
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str) -> ThreadPoolExecutor:
+        """获取指定类别的线程池，首次使用时创建"""
+        executor = self._executors.get(kind)
+        if executor is not None:
+            return executor
+        if kind not in self.limits:
+            raise ValueError(f"未知的执行器类别: {kind}，可用类别: {list(self.limits)}")
+        with self._lock:
+            if kind not in self._executors:
+                self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=max(1, self.limits[kind]),
+                    thread_name_prefix=f"quantmcp_{kind}"
+                )
+                logger.debug(f"创建执行器 {kind}, 并发上限 {self.limits[kind]}")
+            return self._executors[kind]
+
+    async def run(self, kind: str, func: Callable, *args, **kwargs) -> Any:
+        """在指定类别的线程池中执行阻塞函数并等待结果"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get(kind), functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = False):
+        """关闭全部线程池"""
+        with self._lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=wait)
+
+# 全局执行器实例
+executors = ExecutorPool({
+    TRADING: config.executor.trading_workers,
+    MARKET_DATA: config.executor.market_data_workers,
+    FILE_IO: config.executor.file_io_workers,
+})
+
+async def run_blocking(kind: str, func: Callable, *args, **kwargs) -> Any:
+    """在全局执行器中运行阻塞函数"""
+    return await executors.run(kind, func, *args, **kwargs)
@@ -0,0 +1,319 @@
+"""
+技术指标缓存模块
+按 (股票, 周期, 数据指纹, 指标, 参数) 缓存指标计算结果，内存有界、LRU淘汰；
+同一序列追加新K线后，基于上次结果的末端状态增量计算新增部分，不再整段重算
+"""
+
+import hashlib
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config import config
+from .cache import TTLCache
+from . import indicators as ind
+
+logger = logging.getLogger(__name__)
+
+Outputs = Tuple[np.ndarray, ...]
+
+class IndicatorSpec:
+    """指标定义
+
+    Args:
+        sources: 计算所需的行情列
+        compute: compute(arrays, **params) -> (输出数组元组, 末端状态)
+        extend: extend(state, arrays, n_old, **params) -> (新增部分输出元组, 末端状态)，
+                无法增量时返回 None；未提供时按 lookback 截取末段重算
+        lookback: 有限窗口指标重算新增部分所需的历史长度 lookback(**params)
+    """
+
+    def __init__(self, sources: Sequence[str], compute: Callable, extend: Optional[Callable] = None,
+                 lookback: Optional[Callable[..., int]] = None):
+        self.sources = tuple(sources)
+        self.compute = compute
+        self.extend = extend
+        self.lookback = lookback
+        self._signature = inspect.signature(compute)
+
+    def normalize(self, params: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+        """补全默认参数，得到可哈希的参数键"""
+        bound = self._signature.bind(None, **params)
+        bound.apply_defaults()
+        return tuple((k, v) for k, v in bound.arguments.items() if k != 'arrays')
+
+    def extend_outputs(self, state: Any, arrays: Sequence[np.ndarray], n_old: int,
+                       params: Dict[str, Any]) -> Optional[Tuple[Outputs, Any]]:
+        """计算第 n_old 根K线之后的新增输出"""
+        if self.extend is not None:
+            return self.extend(state, arrays, n_old, **params)
+        if self.lookback is None:
+            return None
+        start = max(0, n_old - self.lookback(**params))
+        outputs, state = self.compute([a[start:] for a in arrays], **params)
+        return tuple(out[n_old - start:] for out in outputs), state
+
+class _Entry:
+    """缓存条目"""
+
+    __slots__ = ('outputs', 'state', 'n_bars')
+
+    def __init__(self, outputs: Outputs, state: Any, n_bars: int):
+        for out in outputs:
+            out.flags.writeable = False   # 缓存结果只读，防止调用方修改
+        self.outputs = outputs
+        self.state = state
+        self.n_bars = n_bars
+
+    @property
+    def nbytes(self) -> int:
+        return sum(out.nbytes for out in self.outputs)
+
+# 指标实现（一维序列）
+
+def _filter_tail(x: np.ndarray, alpha: float, init: float) -> np.ndarray:
+    return ind._exponential_filter(x[None, :], alpha, np.array([init]))[0]
+
+def _missing(*values: float) -> bool:
+    """末端状态对应的K线是否缺失：缺失时末端状态不含缺失间隔，无法增量，需整段重算"""
+    return bool(np.isnan(values).any())
+
+def _sma(arrays, window: int = 20):
+    return (ind.rolling_mean(arrays[0], window),), None
+
+def _std(arrays, window: int = 20, ddof: int = 1):
+    return (ind.rolling_std(arrays[0], window, ddof),), None
+
+def _bollinger(arrays, window: int = 20, num_std: float = 2.0):
+    return ind.bollinger(arrays[0], window, num_std), None
+
+def _volatility(arrays, window: int = 20, periods_per_year: int = 252):
+    close = arrays[0]
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1.0
+    return (ind.rolling_volatility(returns, window, periods_per_year),), None
+
+def _ema(arrays, span: int = 20):
+    out = ind.ema(arrays[0], span)
+    return (out,), out[-1]
+
+def _ema_extend(state, arrays, n_old, span: int = 20):
+    if np.isnan(state) or _missing(arrays[0][n_old - 1]):
+        return None
+    out = _filter_tail(arrays[0][n_old:], 2.0 / (span + 1.0), state)
+    return (out,), out[-1]
+
+def _macd(arrays, fast: int = 12, slow: int = 26, signal: int = 9):
+    close = arrays[0]
+    ema_fast, ema_slow = ind.ema(close, fast), ind.ema(close, slow)
+    dif = ema_fast - ema_slow
+    dea = ind.ema(dif, signal)
+    return (dif, dea, 2.0 * (dif - dea)), (ema_fast[-1], ema_slow[-1], dea[-1])
+
+def _macd_extend(state, arrays, n_old, fast: int = 12, slow: int = 26, signal: int = 9):
+    if np.isnan(state).any() or _missing(arrays[0][n_old - 1]):
+        return None
+    close = arrays[0][n_old:]
+    ema_fast = _filter_tail(close, 2.0 / (fast + 1.0), state[0])
+    ema_slow = _filter_tail(close, 2.0 / (slow + 1.0), state[1])
+    dif = ema_fast - ema_slow
+    dea = _filter_tail(dif, 2.0 / (signal + 1.0), state[2])
+    return (dif, dea, 2.0 * (dif - dea)), (ema_fast[-1], ema_slow[-1], dea[-1])
+
+def _rsi(arrays, window: int = 14):
+    close = arrays[0]
+    change = np.full(close.shape, np.nan)
+    change[1:] = np.diff(close)
+    gain, loss = ind.split_changes(change)
+    avg_gain, avg_loss = ind.wilder_smooth(gain, window), ind.wilder_smooth(loss, window)
+    return (ind.rsi_from_averages(avg_gain, avg_loss),), (avg_gain[-1], avg_loss[-1])
+
+def _rsi_extend(state, arrays, n_old, window: int = 14):
+    if np.isnan(state).any() or _missing(*arrays[0][n_old - 2:n_old]):
+        return None
+    gain, loss = ind.split_changes(np.diff(arrays[0][n_old - 1:]))
+    avg_gain = _filter_tail(gain, 1.0 / window, state[0])
+    avg_loss = _filter_tail(loss, 1.0 / window, state[1])
+    return (ind.rsi_from_averages(avg_gain, avg_loss),), (avg_gain[-1], avg_loss[-1])
+
+def _atr(arrays, window: int = 14):
+    out = ind.atr(arrays[0], arrays[1], arrays[2], window)
+    return (out,), out[-1]
+
+def _atr_extend(state, arrays, n_old, window: int = 14):
+    if np.isnan(state) or _missing(arrays[0][n_old - 1], arrays[1][n_old - 1]):
+        return None
+    high, low, close = (a[n_old - 1:] for a in arrays)
+    out = _filter_tail(ind.true_range(high, low, close)[1:], 1.0 / window, state)
+    return (out,), out[-1]
+
+INDICATOR_SPECS: Dict[str, IndicatorSpec] = {
+    'sma': IndicatorSpec(['close'], _sma, lookback=lambda window=20: window),
+    'std': IndicatorSpec(['close'], _std, lookback=lambda window=20, ddof=1: window),
+    'bollinger': IndicatorSpec(['close'], _bollinger, lookback=lambda window=20, num_std=2.0: window),
+    'volatility': IndicatorSpec(['close'], _volatility, lookback=lambda window=20, periods_per_year=252: window + 1),
+    'ema': IndicatorSpec(['close'], _ema, _ema_extend),
+    'macd': IndicatorSpec(['close'], _macd, _macd_extend),
+    'rsi': IndicatorSpec(['close'], _rsi, _rsi_extend),
+    'atr': IndicatorSpec(['high', 'low', 'close'], _atr, _atr_extend),
+}
+
+class IndicatorCache:
+    """进程内技术指标缓存
+
+    Args:
+        max_bytes: 缓存结果的内存上限
+        max_series: 记录最新版本的序列数上限（用于增量扩展）
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_series: int = 4096):
+        self.cache = TTLCache('indicator', ttl=None, max_bytes=max_bytes)
+        self.max_series = max_series
+        self._latest: "OrderedDict[Hashable, Tuple[str, int]]" = OrderedDict()   # 序列 -> (指纹, K线数)
+        self._lock = threading.Lock()
+        self._computes = 0
+        self._extends = 0
+        self._extended_bars = 0
+
+    def get(self, data: pd.DataFrame, name: str, symbol: str, period: str = '1d', **params) -> Any:
+        """获取指标，单输出指标返回数组，多输出（macd/bollinger）返回数组元组
+
+        Args:
+            data: 单只股票的行情数据
+            name: 指标名称，见 INDICATOR_SPECS
+            symbol: 股票代码
+            period: K线周期
+            params: 指标参数（窗口类参数统一命名为 window）
+        """
+        spec = _get_spec(name)
+        param_key = spec.normalize(params)
+        arrays = [data[column].to_numpy(dtype=np.float64) for column in spec.sources]
+        index = _index_values(data.index)
+        n_bars = len(index)
+        series_key = (symbol, period, name, param_key)
+        with self._lock:
+            latest = self._latest.get(series_key)
+        # 上次版本是本次数据的前缀时可增量扩展：同一遍哈希同时得到前缀与全量指纹，不重复读取前缀
+        if latest is not None and latest[1] < n_bars:
+            prefix, fingerprint = _fingerprints(index, arrays, (latest[1], n_bars))
+            prefix = prefix if prefix == latest[0] else None
+        else:
+            fingerprint, = _fingerprints(index, arrays, (n_bars,))
+            prefix = None
+
+        def load() -> _Entry:
+            if prefix is not None:
+                previous = self.cache.get((symbol, period, prefix, name, param_key))
+                if previous is not None:
+                    extended = spec.extend_outputs(previous.state, arrays, previous.n_bars, params)
+                    if extended is not None:
+                        tail, state = extended
+                        outputs = tuple(np.concatenate([old, new]) for old, new in zip(previous.outputs, tail))
+                        with self._lock:
+                            self._extends += 1
+                            self._extended_bars += n_bars - previous.n_bars
+                        return _Entry(outputs, state, n_bars)
+
+            outputs, state = spec.compute(arrays, **params)
+            with self._lock:
+                self._computes += 1
+            return _Entry(tuple(outputs), state, n_bars)
+
+        entry = self.cache.get_or_load((symbol, period, fingerprint, name, param_key), load)
+        with self._lock:
+            latest = self._latest.get(series_key)
+            if latest is None or latest[1] <= n_bars:
+                self._latest[series_key] = (fingerprint, n_bars)
+            self._latest.move_to_end(series_key)
+            while len(self._latest) > self.max_series:
+                self._latest.popitem(last=False)
+        return entry.outputs[0] if len(entry.outputs) == 1 else entry.outputs
+
+    def clear(self):
+        """清空缓存"""
+        self.cache.invalidate()
+        with self._lock:
+            self._latest.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        stats = self.cache.stats()
+        with self._lock:
+            stats.update({
+                'series': len(self._latest),
+                'full_computes': self._computes,
+                'incremental_extends': self._extends,
+                'extended_bars': self._extended_bars,
+            })
+        return stats
+
+def cached_indicator(data: pd.DataFrame, name: str, **params) -> Any:
+    """计算指标；data.attrs 中带有 symbol（及 period）时走全局指标缓存，否则直接计算"""
+    symbol = data.attrs.get('symbol')
+    if symbol:
+        return indicator_cache.get(data, name, symbol, data.attrs.get('period', '1d'), **params)
+    spec = _get_spec(name)
+    outputs, _ = spec.compute([data[column].to_numpy(dtype=np.float64) for column in spec.sources], **params)
+    return outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+def _get_spec(name: str) -> IndicatorSpec:
+    spec = INDICATOR_SPECS.get(name)
+    if spec is None:
+        raise ValueError(f"不支持的指标: {name}，支持的指标: {', '.join(INDICATOR_SPECS)}")
+    return spec
+
+def _index_values(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8
+    return np.asarray(index)
+
+def _fingerprint(index: np.ndarray, arrays: Sequence[np.ndarray], n_bars: int) -> str:
+    """前 n_bars 根K线（时间与所用行情列）的内容指纹"""
+    return _fingerprints(index, arrays, (n_bars,))[0]
+
+def _fingerprints(index: np.ndarray, arrays: Sequence[np.ndarray], cuts: Sequence[int]) -> Tuple[str, ...]:
+    """一遍扫描得到多个前缀长度（升序）的内容指纹
+
+    每列一个 blake2b 状态，按前缀分段追加原始字节，到达每个前缀长度时复制状态取摘要；
+    指纹为 前缀长度 与各列（dtype, 摘要）的 blake2b
+    """
+    columns = []
+    for values in (index, *arrays):
+        if values.dtype == object:
+            columns.append([repr(values[:cut].tolist()).encode() for cut in cuts])
+            continue
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(values.dtype.str.encode())
+        digests = []
+        start = 0
+        for cut in cuts:
+            hasher.update(np.ascontiguousarray(values[start:cut]).view(np.uint8))
+            digests.append(hasher.copy().digest())
+            start = cut
+        columns.append(digests)
+
+    prints = []
+    for i, cut in enumerate(cuts):
+        hasher = hashlib.blake2b(cut.to_bytes(8, 'little'), digest_size=16)
+        for digests in columns:
+            hasher.update(digests[i])
+        prints.append(hasher.hexdigest())
+    return tuple(prints)
+
+def data_fingerprint(data: pd.DataFrame) -> str:
+    """行情数据（时间索引、列名与全部数值列）的内容指纹，任一K线变化都会改变指纹"""
+    numeric = [column for column, dtype in data.dtypes.items() if dtype.kind in 'biuf']
+    frame = data if len(numeric) == data.shape[1] else data[numeric]
+    # 整表一次转为 (列, 时间) 连续数组，避免逐列取 Series
+    values = np.ascontiguousarray(frame.to_numpy(dtype=np.float64).T)
+    content = _fingerprint(_index_values(data.index), list(values), len(data))
+    columns = '\x1f'.join(map(str, numeric))
+    return hashlib.blake2b(f"{content}|{columns}".encode(), digest_size=16).hexdigest()
+
+# 全局指标缓存实例
+indicator_cache = IndicatorCache(max_bytes=config.data.indicator_cache_max_bytes)
@@ -0,0 +1,233 @@
+"""
+技术指标模块
+EMA、MACD、RSI、布林带、ATR、滚动波动率的向量化实现。
+所有指标既接受一维序列，也接受 (symbol, time) 二维面板（沿最后一维计算），一次调用完成；
+序列开头的 NaN（如上市前）按行跳过，输出在相同位置为 NaN；
+序列中间的 NaN（如停牌）按 pandas ewm(adjust=False, ignore_na=False) 的口径处理：
+缺失位置沿用上一输出，缺失后的首个观测按间隔提高权重
+"""
+
+import logging
+from typing import Callable, Tuple
+
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    lfilter = None
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+def ema(values, span: int) -> np.ndarray:
+    """指数移动平均，与 pandas ewm(span=span, adjust=False) 口径一致"""
+    if span < 1:
+        raise ValueError(f"EMA周期必须大于0: {span}")
+    alpha = 2.0 / (span + 1.0)
+    return _apply_rows(values, lambda x: _exponential_filter(x, alpha, x[:, 0]))
+
+def wilder_smooth(values, period: int) -> np.ndarray:
+    """Wilder 平滑：前 period 个值取简单平均作为初值，之后按 alpha=1/period 递推"""
+    if period < 1:
+        raise ValueError(f"平滑周期必须大于0: {period}")
+
+    def smooth(x: np.ndarray) -> np.ndarray:
+        out = np.full(x.shape, np.nan)
+        if x.shape[1] < period:
+            return out
+        seed = np.nanmean(x[:, :period], axis=1)   # 首列必为有效值
+        out[:, period - 1] = seed
+        if x.shape[1] > period:
+            out[:, period:] = _exponential_filter(x[:, period:], 1.0 / period, seed)
+        return out
+
+    return _apply_rows(values, smooth)
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD 指标
+
+    Returns:
+        (DIF, DEA, MACD柱)，MACD柱按国内惯例为 2 * (DIF - DEA)
+    """
+    if fast >= slow:
+        raise ValueError(f"快线周期({fast})必须小于慢线周期({slow})")
+    close = _as_float(close)
+    dif = ema(close, fast) - ema(close, slow)
+    dea = ema(dif, signal)
+    return dif, dea, 2.0 * (dif - dea)
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """相对强弱指标（Wilder 平滑），取值 0~100，前 period 根K线为 NaN"""
+    close = _as_float(close)
+    change = np.full(close.shape, np.nan)
+    change[..., 1:] = np.diff(close, axis=-1)
+    gain, loss = split_changes(change)
+    return rsi_from_averages(wilder_smooth(gain, period), wilder_smooth(loss, period))
+
+def split_changes(change: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """将价格变动拆分为上涨幅度与下跌幅度（均为非负，NaN 保持不变）"""
+    nan = np.isnan(change)
+    gain = np.where(change > 0, change, np.where(nan, np.nan, 0.0))
+    loss = np.where(change < 0, -change, np.where(nan, np.nan, 0.0))
+    return gain, loss
+
+def rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """由平均涨幅与平均跌幅计算 RSI"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # 无下跌时 RSI 为100，无涨跌时为50
+    result = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), result)
+    return np.where(np.isnan(avg_gain) | np.isnan(avg_loss), np.nan, result)
+
+def bollinger(close, window: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """布林带（总体标准差）
+
+    Returns:
+        (中轨, 上轨, 下轨)
+    """
+    mid = rolling_mean(close, window)
+    width = num_std * rolling_std(close, window, ddof=0)
+    return mid, mid + width, mid - width
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """平均真实波幅（Wilder 平滑）"""
+    return wilder_smooth(true_range(high, low, close), period)
+
+def true_range(high, low, close) -> np.ndarray:
+    """真实波幅：当根振幅与相对前收盘价的最大偏离"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    result = high - low
+    prev_close = close[..., :-1]
+    result[..., 1:] = np.fmax(result[..., 1:],
+                              np.fmax(np.abs(high[..., 1:] - prev_close), np.abs(low[..., 1:] - prev_close)))
+    return result
+
+def rolling_volatility(returns, window: int = 20, periods_per_year: int = 252) -> np.ndarray:
+    """滚动年化波动率（样本标准差），与 returns.rolling(window).std() * sqrt(periods_per_year) 口径一致"""
+    return rolling_std(returns, window, ddof=1) * np.sqrt(periods_per_year)
+
+def rolling_mean(values, window: int) -> np.ndarray:
+    """滚动均值，窗口内含 NaN 或未满窗口时为 NaN"""
+    return _rolling_moments(values, window, ddof=None)[0]
+
+def rolling_std(values, window: int, ddof: int = 1) -> np.ndarray:
+    """滚动标准差，窗口内含 NaN 或未满窗口时为 NaN"""
+    return _rolling_moments(values, window, ddof=ddof)[1]
+
+# 私有函数
+
+def _as_float(values) -> np.ndarray:
+    return np.array(values, dtype=np.float64)
+
+def _apply_rows(values, func: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """对每行从首个非NaN值开始调用 func（输入输出均为二维），开头相同的行合并成一次调用"""
+    values = _as_float(values)
+    if values.ndim not in (1, 2):
+        raise ValueError(f"仅支持一维序列或二维面板，实际维度: {values.ndim}")
+    rows = values.reshape(1, -1) if values.ndim == 1 else values
+    out = np.full(rows.shape, np.nan)
+    if rows.shape[1] == 0:
+        return out.reshape(values.shape)
+
+    valid = ~np.isnan(rows)
+    starts = np.where(valid.any(axis=1), valid.argmax(axis=1), rows.shape[1])
+    for start in np.unique(starts):
+        if start >= rows.shape[1]:
+            continue
+        idx = np.flatnonzero(starts == start)
+        out[idx, start:] = func(rows[idx, start:])
+    return out.reshape(values.shape)
+
+def _exponential_filter(x: np.ndarray, alpha: float, init: np.ndarray) -> np.ndarray:
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1]，y[-1] = init，沿最后一维递推
+
+    x 中的 NaN 视为缺失：该位置输出沿用上一值，缺失后的首个观测权重见 _gap_gain
+    """
+    decay = 1.0 - alpha
+    init = np.asarray(init, dtype=np.float64)
+    missing = np.isnan(x)
+    if not SCIPY_AVAILABLE:
+        # 无 scipy 时沿时间递推，每步对全部股票做一次向量运算
+        y = np.empty_like(x)
+        prev = init.copy()
+        gap = np.zeros(x.shape[0])
+        for t in range(x.shape[1]):
+            observed = ~missing[:, t]
+            prev = np.where(observed, prev + _gap_gain(alpha, gap) * (x[:, t] - prev), prev)
+            gap = np.where(observed, 0.0, gap + 1.0)
+            y[:, t] = prev
+        return y
+
+    y = np.empty_like(x)
+    gapped = missing.any(axis=1)
+    dense = np.flatnonzero(~gapped)
+    if len(dense):
+        y[dense], _ = lfilter([alpha], [1.0, -decay], x[dense], axis=-1, zi=(decay * init[dense])[:, None])
+    # 有缺失的行按连续观测段分别滤波，段间延续状态
+    for row in np.flatnonzero(gapped):
+        y[row] = _filter_segments(x[row], alpha, init[row], missing[row])
+    return y
+
+def _filter_segments(x: np.ndarray, alpha: float, init: float, missing: np.ndarray) -> np.ndarray:
+    """单行含缺失值的指数滤波：段首按缺失间隔单独递推一步，段内其余部分用 lfilter"""
+    decay = 1.0 - alpha
+    y = np.empty_like(x)
+    observed = np.flatnonzero(~missing)
+    prev, last = init, -1   # last 为上一个观测的位置，init 视为位于 -1
+    for segment in np.split(observed, np.flatnonzero(np.diff(observed) > 1) + 1):
+        if len(segment) == 0:
+            continue
+        start, stop = segment[0], segment[-1] + 1
+        y[last + 1:start] = prev
+        y[start] = prev + _gap_gain(alpha, start - last - 1) * (x[start] - prev)
+        if stop - start > 1:
+            y[start + 1:stop], _ = lfilter([alpha], [1.0, -decay], x[start + 1:stop], zi=[decay * y[start]])
+        prev, last = y[stop - 1], stop - 1
+    y[last + 1:] = prev
+    return y
+
+def _gap_gain(alpha: float, gap):
+    """跳过 gap 个缺失值后新观测的权重，与 pandas ewm(adjust=False, ignore_na=False) 相同：
+    旧值权重按缺失期数衰减为 (1-alpha)^(gap+1)，归一化后为 alpha / ((1-alpha)^(gap+1) + alpha)；
+    pandas 在 com == 1（alpha == 0.5）时改用 1 - (1-alpha)^(gap+1)。gap 为 0 时均等于 alpha"""
+    old_weight = (1.0 - alpha) ** (np.asarray(gap, dtype=np.float64) + 1.0)
+    if alpha == 0.5:
+        return 1.0 - old_weight
+    return alpha / (old_weight + alpha)
+
+def _rolling_moments(values, window: int, ddof=None) -> Tuple[np.ndarray, np.ndarray]:
+    """基于累加和的滚动均值与标准差（ddof 为 None 时不计算标准差）"""
+    if window < 1:
+        raise ValueError(f"窗口长度必须大于0: {window}")
+    values = _as_float(values)
+    n_time = values.shape[-1]
+    mean = np.full(values.shape, np.nan)
+    std = np.full(values.shape, np.nan) if ddof is not None else None
+    if window > n_time or (ddof is not None and window <= ddof):
+        return mean, std
+
+    valid = ~np.isnan(values)
+    # 减去每行的均值再累加，降低累加和的舍入误差
+    filled = np.where(valid, values, 0.0)
+    n_valid = valid.sum(axis=-1, keepdims=True)
+    base = filled.sum(axis=-1, keepdims=True) / np.maximum(n_valid, 1)
+    centered = np.where(valid, filled - base, 0.0)
+
+    def window_sum(x: np.ndarray) -> np.ndarray:
+        csum = np.zeros(x.shape[:-1] + (n_time + 1,), dtype=np.float64)
+        np.cumsum(x, axis=-1, out=csum[..., 1:])
+        return csum[..., window:] - csum[..., :-window]
+
+    counts = window_sum(valid.astype(np.float64))
+    full = counts == window
+    sums = window_sum(centered)
+    window_mean = sums / window
+    mean[..., window - 1:] = np.where(full, window_mean + base, np.nan)
+
+    if ddof is not None:
+        squares = window_sum(centered * centered)
+        var = np.maximum(squares - sums * window_mean, 0.0) / (window - ddof)
+        std[..., window - 1:] = np.where(full, np.sqrt(var), np.nan)
+    return mean, std
@@ -0,0 +1,159 @@
+"""
+行情面板模块
+将 xtdata 返回的 {字段: DataFrame(股票 x 日期)} 结构一次性堆叠为
+连续的 (field, symbol, time) NumPy 数组，单只股票的数据为零拷贝视图
+"""
+
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 默认行情字段，amount/preClose 仅在数据源返回时才包含
+DEFAULT_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'preClose']
+
+# 分笔数据字段到面板字段的映射
+TICK_FIELD_MAP = {
+    'open': 'open',
+    'high': 'high',
+    'low': 'low',
+    'close': 'lastPrice',
+    'volume': 'volume',
+    'amount': 'amount',
+    'preClose': 'lastClose',
+}
+
+class MarketPanel:
+    """多股票行情面板
+
+    Attributes:
+        values: 形状为 (field, symbol, time) 的 float64 连续数组
+        fields: 字段名列表，对应第0维
+        symbols: 股票代码列表，对应第1维
+        index: DatetimeIndex，对应第2维
+    """
+
+    def __init__(self, values: np.ndarray, fields: Sequence[str], symbols: Sequence[str], index: pd.DatetimeIndex):
+        if values.shape != (len(fields), len(symbols), len(index)):
+            raise ValueError(f"面板形状{values.shape}与字段/股票/时间维度不一致")
+        self.values = values
+        self.fields = list(fields)
+        self.symbols = list(symbols)
+        self.index = index
+        self._field_pos = {name: i for i, name in enumerate(self.fields)}
+        self._symbol_pos = {name: i for i, name in enumerate(self.symbols)}
+
+    @classmethod
+    def from_xtdata(cls, data: Dict[str, pd.DataFrame], fields: Optional[Sequence[str]] = None) -> 'MarketPanel':
+        """从 xtdata.get_market_data 的返回结果构建面板"""
+        if not is_field_layout(data):
+            return cls.from_xtdata_ticks(data, fields)
+        
+        time_df = data['time']
+        symbols = list(time_df.index)
+        if fields is None:
+            fields = [field for field in DEFAULT_FIELDS if field in data]
+
+        values = np.empty((len(fields), len(symbols), time_df.shape[1]), dtype=np.float64)
+        for i, field in enumerate(fields):
+            frame = data[field]
+            # xtdata 各字段的行列顺序通常一致，只有不一致时才重新对齐
+            if not (frame.index.equals(time_df.index) and frame.columns.equals(time_df.columns)):
+                frame = frame.reindex(index=time_df.index, columns=time_df.columns)
+            values[i] = frame.to_numpy(dtype=np.float64, copy=False)
+
+        return cls(values, fields, symbols, parse_time_index(time_df.columns))
+
+    @classmethod
+    def from_xtdata_ticks(cls, data: Dict[str, np.ndarray], fields: Optional[Sequence[str]] = None) -> 'MarketPanel':
+        """从分笔数据 {股票代码: 结构化数组} 构建面板，时间轴取各股票时间戳的并集"""
+        symbols = [symbol for symbol, ticks in data.items() if ticks is not None and len(ticks) > 0]
+        if not symbols:
+            return cls(np.empty((len(fields or []), 0, 0)), fields or [], [], pd.DatetimeIndex([], name='time'))
+
+        names = data[symbols[0]].dtype.names or ()
+        if fields is None:
+            fields = [field for field, source in TICK_FIELD_MAP.items() if source in names]
+
+        times = np.unique(np.concatenate([np.asarray(data[symbol]['time'], dtype=np.int64) for symbol in symbols]))
+        values = np.full((len(fields), len(symbols), len(times)), np.nan, dtype=np.float64)
+        for j, symbol in enumerate(symbols):
+            ticks = data[symbol]
+            cols = np.searchsorted(times, np.asarray(ticks['time'], dtype=np.int64))
+            for i, field in enumerate(fields):
+                values[i, j, cols] = ticks[TICK_FIELD_MAP.get(field, field)]
+
+        # 分笔时间戳为UTC毫秒，转换为与K线一致的北京时间
+        index = pd.to_datetime(times, unit='ms').tz_localize('UTC').tz_convert('Asia/Shanghai').tz_localize(None)
+        index = pd.DatetimeIndex(index, name='time')
+        return cls(values, fields, symbols, index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._symbol_pos
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def field(self, name: str) -> np.ndarray:
+        """返回某字段的 (symbol, time) 二维视图"""
+        return self.values[self._field_pos[name]]
+
+    def symbol_values(self, symbol: str) -> np.ndarray:
+        """返回某只股票的 (field, time) 二维视图"""
+        return self.values[:, self._symbol_pos[symbol], :]
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """返回单只股票的 DataFrame，底层数据与面板共享内存"""
+        return pd.DataFrame(self.symbol_values(symbol).T, index=self.index, columns=self.fields, copy=False)
+
+    def select(self, symbols: Sequence[str]) -> 'MarketPanel':
+        """按股票代码子集构建新面板"""
+        positions = [self._symbol_pos[symbol] for symbol in symbols]
+        return MarketPanel(self.values[:, positions, :], self.fields, symbols, self.index)
+
+def is_field_layout(data: Dict) -> bool:
+    """判断 xtdata 返回值是否为 {字段: DataFrame} 布局（K线），否则为 {股票代码: 数组} 布局（分笔）"""
+    return 'time' in data or any(isinstance(value, pd.DataFrame) for value in data.values())
+
+def parse_time_index(columns: Sequence) -> pd.DatetimeIndex:
+    """一次性向量化解析 xtdata 的时间列（YYYYMMDD 或 YYYYMMDDHHMMSS）"""
+    labels = pd.Index(columns).astype(str)
+    if len(labels) == 0:
+        return pd.DatetimeIndex([], name='time')
+    fmt = '%Y%m%d%H%M%S' if len(labels[0]) >= 14 else '%Y%m%d'
+    return pd.DatetimeIndex(pd.to_datetime(labels, format=fmt), name='time')
+
+def concat_panels(panels: Sequence[Optional[MarketPanel]]) -> Optional[MarketPanel]:
+    """沿股票维度合并多个面板，字段取交集、时间轴取并集"""
+    panels = [panel for panel in panels if panel is not None and panel.symbols]
+    if not panels:
+        return None
+    if len(panels) == 1:
+        return panels[0]
+
+    fields = [field for field in panels[0].fields if all(field in panel.fields for panel in panels)]
+    index = panels[0].index
+    for panel in panels[1:]:
+        if not panel.index.equals(index):
+            index = index.union(panel.index)
+
+    symbols = [symbol for panel in panels for symbol in panel.symbols]
+    values = np.full((len(fields), len(symbols), len(index)), np.nan, dtype=np.float64)
+    offset = 0
+    for panel in panels:
+        block = panel.values[[panel.fields.index(field) for field in fields]]
+        rows = slice(offset, offset + len(panel.symbols))
+        if panel.index.equals(index):
+            values[:, rows, :] = block
+        else:
+            values[:, rows, index.get_indexer(panel.index)] = block
+        offset += len(panel.symbols)
+
+    return MarketPanel(values, fields, symbols, index)
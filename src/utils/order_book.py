@@ -0,0 +1,316 @@
+"""
+委托/成交/持仓/资产内存账本
+连接时批量查询一次建立初始状态，之后由 XtQuantTraderCallback 推送增量更新，
+持仓和委托查询变为本地 O(1) 读取；后台定期与柜台全量对账，发现偏差时记录并以柜台为准修正
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# XtOrder.order_status 中的终态：部撤、已撤、已成、废单（与 xtconstant 取值相同）
+FINAL_ORDER_STATUSES = frozenset({53, 54, 56, 57})
+# XtOrder.order_type 中的买入（xtconstant.STOCK_BUY）
+STOCK_BUY = 23
+
+ORDER_FIELDS = ('order_id', 'order_sysid', 'stock_code', 'order_type', 'order_volume', 'price_type', 'price',
+                'traded_volume', 'traded_price', 'order_status', 'status_msg', 'order_time',
+                'strategy_name', 'order_remark')
+TRADE_FIELDS = ('traded_id', 'order_id', 'stock_code', 'order_type', 'traded_price', 'traded_volume',
+                'traded_amount', 'traded_time')
+POSITION_FIELDS = ('stock_code', 'volume', 'can_use_volume', 'frozen_volume', 'on_road_volume',
+                   'yesterday_volume', 'open_price', 'avg_price', 'market_value')
+ASSET_FIELDS = ('cash', 'frozen_cash', 'market_value', 'total_asset')
+
+def _record(obj: Any, fields) -> Dict[str, Any]:
+    """将 XtOrder/XtTrade/XtPosition/XtAsset 对象转为字典"""
+    return {field: getattr(obj, field, None) for field in fields}
+
+class OrderBook:
+    """委托/成交/持仓/资产内存账本
+
+    委托按 order_id 索引并按股票代码建立二级索引，持仓按股票代码索引。
+    推送回调与对账可能并发：对账查询期间收到推送的委托/持仓以推送为准，不计为偏差
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._orders: Dict[int, Dict[str, Any]] = {}
+        self._orders_by_symbol: Dict[str, Set[int]] = {}
+        self._trades: Dict[str, Dict[str, Any]] = {}
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        self._asset: Optional[Dict[str, Any]] = None
+        # 风控用聚合量，随委托/持仓写入增量维护：未完成买单金额、持仓市值
+        self._open_buy: Dict[str, float] = {}
+        self._open_buy_total = 0.0
+        self._position_value_total = 0.0
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._touched: Dict[Any, int] = {}   # 键 -> 最后一次推送的事件序号
+        self._events = 0
+        self.seeded_at: Optional[float] = None
+        self.reconciled_at: Optional[float] = None
+        self.drift_count = 0
+        self._reconciler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def seeded(self) -> bool:
+        return self.seeded_at is not None
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """注册新委托监听器，账本首次收到某个委托时调用（持有账本锁，监听器内不应访问柜台）"""
+        self._listeners.append(listener)
+
+    # 推送事件（回调线程调用）
+
+    def on_order(self, order: Any):
+        record = _record(order, ORDER_FIELDS)
+        with self._lock:
+            self._events += 1
+            self._touched[('order', record['order_id'])] = self._events
+            self._apply_order(record)
+
+    def on_trade(self, trade: Any):
+        record = _record(trade, TRADE_FIELDS)
+        with self._lock:
+            self._events += 1
+            self._trades[record['traded_id']] = record
+
+    def on_position(self, position: Any):
+        record = _record(position, POSITION_FIELDS)
+        with self._lock:
+            self._events += 1
+            self._touched[('position', record['stock_code'])] = self._events
+            self._apply_position(record)
+
+    def on_asset(self, asset: Any):
+        with self._lock:
+            self._events += 1
+            self._asset = _record(asset, ASSET_FIELDS)
+
+    # 本地查询
+
+    def position(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """单只股票持仓，无持仓时返回None"""
+        return self._positions.get(symbol)
+
+    def positions(self) -> Dict[str, Dict[str, Any]]:
+        """全部持仓 {股票代码: 持仓}"""
+        with self._lock:
+            return dict(self._positions)
+
+    def order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        return self._orders.get(int(order_id))
+
+    def orders(self, symbol: Optional[str] = None, open_only: bool = False) -> List[Dict[str, Any]]:
+        """委托列表，可按股票代码筛选，open_only 为True时只返回未到终态的委托"""
+        with self._lock:
+            if symbol is None:
+                orders = list(self._orders.values())
+            else:
+                orders = [self._orders[order_id] for order_id in self._orders_by_symbol.get(symbol, ())]
+        if open_only:
+            orders = [order for order in orders if order['order_status'] not in FINAL_ORDER_STATUSES]
+        return sorted(orders, key=lambda order: order['order_id'])
+
+    def trades(self, order_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            trades = list(self._trades.values())
+        if order_id is not None:
+            trades = [trade for trade in trades if trade['order_id'] == order_id]
+        return trades
+
+    def asset(self) -> Optional[Dict[str, Any]]:
+        return self._asset
+
+    def open_buy_value(self, symbol: Optional[str] = None) -> float:
+        """未完成买单的剩余金额（委托价计），symbol 为空时为全部股票合计"""
+        if symbol is None:
+            return self._open_buy_total
+        return self._open_buy.get(symbol, 0.0)
+
+    def position_value(self) -> float:
+        """全部持仓市值合计（柜台推送的市值）"""
+        return self._position_value_total
+
+    # 全量同步
+
+    def seed(self, trader: Any, account: Any):
+        """批量查询柜台的委托、成交、持仓与资产，重建账本"""
+        t0 = time.perf_counter()
+        snapshot = self._query(trader, account)
+        with self._lock:
+            self._orders.clear()
+            self._orders_by_symbol.clear()
+            self._open_buy.clear()
+            self._open_buy_total = 0.0
+            for record in snapshot['orders']:
+                self._apply_order(record)
+            self._trades = {trade['traded_id']: trade for trade in snapshot['trades']}
+            self._positions = {}
+            self._position_value_total = 0.0
+            for record in snapshot['positions']:
+                self._apply_position(record)
+            self._asset = snapshot['asset']
+            self._touched.clear()
+            self.seeded_at = time.time()
+        logger.info(f"交易账本已建立: 委托{len(self._orders)}笔, 成交{len(self._trades)}笔, "
+                    f"持仓{len(self._positions)}只, 耗时{(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    def reconcile(self, trader: Any, account: Any) -> Dict[str, Any]:
+        """与柜台全量对账，以柜台为准修正账本
+
+        Returns:
+            {'positions': 持仓数量不一致的股票代码, 'orders': 状态或成交量不一致的委托号,
+             'missing_orders': 柜台有而账本没有的委托号}
+        """
+        with self._lock:
+            started = self._events
+        snapshot = self._query(trader, account)
+        drift = {'positions': [], 'orders': [], 'missing_orders': []}
+
+        with self._lock:
+            # 查询开始后收到过推送的键以推送为准
+            def fresh(key) -> bool:
+                return self._touched.get(key, 0) > started
+
+            broker_positions = {record['stock_code']: record for record in snapshot['positions']}
+            for symbol in set(broker_positions) | set(self._positions):
+                if fresh(('position', symbol)):
+                    continue
+                broker = broker_positions.get(symbol)
+                local = self._positions.get(symbol)
+                broker_volume = broker['volume'] if broker else 0
+                local_volume = local['volume'] if local else 0
+                if broker_volume != local_volume:
+                    drift['positions'].append(symbol)
+                self._apply_position(broker or {**local, 'volume': 0})
+
+            for record in snapshot['orders']:
+                order_id = record['order_id']
+                if fresh(('order', order_id)):
+                    continue
+                local = self._orders.get(order_id)
+                if local is None:
+                    drift['missing_orders'].append(order_id)
+                elif (local['order_status'], local['traded_volume']) != (record['order_status'],
+                                                                          record['traded_volume']):
+                    drift['orders'].append(order_id)
+                self._apply_order(record, force=True)
+
+            for trade in snapshot['trades']:
+                self._trades.setdefault(trade['traded_id'], trade)
+            self._rebuild_aggregates()
+            if snapshot['asset'] is not None:
+                self._asset = snapshot['asset']
+            # 已处理的推送标记不再需要
+            self._touched = {key: event for key, event in self._touched.items() if event > started}
+            self.reconciled_at = time.time()
+
+            n_drift = sum(len(items) for items in drift.values())
+            self.drift_count += n_drift
+        if n_drift:
+            logger.warning(f"交易账本对账发现偏差并已修正: {drift}")
+        return drift
+
+    def start_reconciler(self, trader: Any, account: Any, interval: float):
+        """启动后台定期对账线程，interval<=0 时不启动"""
+        if interval <= 0 or (self._reconciler is not None and self._reconciler.is_alive()):
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reconcile(trader, account)
+                except Exception as e:
+                    logger.error(f"交易账本对账失败: {e}")
+
+        self._reconciler = threading.Thread(target=run, name='order-book-reconciler', daemon=True)
+        self._reconciler.start()
+        logger.info(f"交易账本定期对账已启动, 间隔{interval}s")
+
+    def stop_reconciler(self):
+        self._stop.set()
+        if self._reconciler is not None:
+            self._reconciler.join(timeout=5)
+            self._reconciler = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'seeded_at': self.seeded_at,
+                'reconciled_at': self.reconciled_at,
+                'orders': len(self._orders),
+                'open_orders': sum(1 for order in self._orders.values()
+                                   if order['order_status'] not in FINAL_ORDER_STATUSES),
+                'trades': len(self._trades),
+                'positions': len(self._positions),
+                'events': self._events,
+                'drift_count': self.drift_count,
+            }
+
+    # 私有方法
+
+    @staticmethod
+    def _query(trader: Any, account: Any) -> Dict[str, Any]:
+        """批量查询柜台当前状态"""
+        asset = trader.query_stock_asset(account)
+        return {
+            'orders': [_record(order, ORDER_FIELDS) for order in trader.query_stock_orders(account, False) or []],
+            'trades': [_record(trade, TRADE_FIELDS) for trade in trader.query_stock_trades(account) or []],
+            'positions': [_record(position, POSITION_FIELDS)
+                          for position in trader.query_stock_positions(account) or []],
+            'asset': _record(asset, ASSET_FIELDS) if asset is not None else None,
+        }
+
+    def _apply_order(self, record: Dict[str, Any], force: bool = False):
+        """写入委托（调用方持有锁），乱序到达的旧推送（终态后的非终态、成交量回退）被忽略"""
+        order_id = record['order_id']
+        current = self._orders.get(order_id)
+        if not force and current is not None and record['order_status'] not in FINAL_ORDER_STATUSES:
+            if (current['order_status'] in FINAL_ORDER_STATUSES
+                    or (record['traded_volume'] or 0) < (current['traded_volume'] or 0)):
+                return
+        symbol = record['stock_code']
+        delta = _open_buy_value(record) - (_open_buy_value(current) if current is not None else 0.0)
+        if delta:
+            self._open_buy[symbol] = self._open_buy.get(symbol, 0.0) + delta
+            self._open_buy_total += delta
+        self._orders[order_id] = record
+        self._orders_by_symbol.setdefault(symbol, set()).add(order_id)
+        if current is None:
+            for listener in self._listeners:
+                listener(record)
+
+    def _rebuild_aggregates(self):
+        """全量重算聚合量（调用方持有锁），消除增量维护累积的浮点误差"""
+        self._open_buy = {}
+        for order in self._orders.values():
+            value = _open_buy_value(order)
+            if value:
+                self._open_buy[order['stock_code']] = self._open_buy.get(order['stock_code'], 0.0) + value
+        self._open_buy_total = sum(self._open_buy.values())
+        self._position_value_total = sum(position['market_value'] or 0.0 for position in self._positions.values())
+
+    def _apply_position(self, record: Dict[str, Any]):
+        """写入持仓（调用方持有锁），数量为0的持仓移除"""
+        symbol = record['stock_code']
+        current = self._positions.get(symbol)
+        if current is not None:
+            self._position_value_total -= current['market_value'] or 0.0
+        if record['volume']:
+            self._positions[symbol] = record
+            self._position_value_total += record['market_value'] or 0.0
+        else:
+            self._positions.pop(symbol, None)
+
+def _open_buy_value(order: Dict[str, Any]) -> float:
+    """买单未成交部分的金额，卖单或已到终态的委托为0"""
+    if order['order_type'] != STOCK_BUY or order['order_status'] in FINAL_ORDER_STATUSES:
+        return 0.0
+    remaining = (order['order_volume'] or 0) - (order['traded_volume'] or 0)
+    return max(remaining, 0) * (order['price'] or 0.0)
@@ -0,0 +1,122 @@
+"""
+异步下单回报关联模块
+order_stock_async 立即返回请求序号 seq，订单号经 on_order_stock_async_response 回调送达，
+失败原因经 on_order_error 回调送达。本模块按 seq（或下单备注）把回调结果关联回请求，
+供批量下单一次提交全部订单后统一等待
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class AsyncOrderTracker:
+    """异步下单回报关联器
+
+    回调可能早于 expect() 到达（下单调用返回前回调线程已收到回报），
+    因此先到的回报同样保存，由 collect() 取走；无人认领的回报按先进先出淘汰。
+    collect() 超时放弃的请求，其回报之后到达时交给 on_late 处理（订单可能已被柜台接受）
+
+    Args:
+        max_unclaimed: 最多保留的未认领回报数
+        on_late: 超时后到达的回报的处理函数 on_late(seq, order_id, error)，在回调线程中调用
+    """
+
+    def __init__(self, max_unclaimed: int = 10000,
+                 on_late: Optional[Callable[[int, Optional[int], Optional[str]], None]] = None):
+        self.max_unclaimed = max_unclaimed
+        self.on_late = on_late
+        self._cond = threading.Condition()
+        self._responses: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()   # seq -> 回报
+        self._remarks: Dict[str, int] = {}                                   # 下单备注 -> seq
+        self._orphan_errors: 'OrderedDict[str, str]' = OrderedDict()        # 尚未关联到 seq 的错误
+        self._abandoned = set()                                              # 已超时放弃等待的 seq
+
+    def expect(self, seq: int, remark: Optional[str] = None):
+        """登记已提交的请求，remark 用于关联不带 seq 的错误回报"""
+        with self._cond:
+            if remark:
+                self._remarks[remark] = seq
+                error = self._orphan_errors.pop(remark, None)
+                if error is not None and seq not in self._responses:
+                    self._responses[seq] = {'order_id': None, 'error': error}
+                    self._cond.notify_all()
+
+    def on_response(self, seq: int, order_id: int, error_msg: str = ''):
+        """异步下单回报（回调线程调用）"""
+        with self._cond:
+            late = seq in self._abandoned
+            if late:
+                self._abandoned.discard(seq)
+            else:
+                previous = self._responses.get(seq)
+                # 错误回报已先到达时保留错误
+                if previous is None or previous.get('error') is None:
+                    self._responses[seq] = {'order_id': order_id, 'error': error_msg or None}
+                self._trim()
+                self._cond.notify_all()
+        if late:
+            logger.warning(f"下单请求 seq={seq} 的回报晚于等待超时到达: order_id={order_id}")
+            self._notify_late(seq, order_id, error_msg or None)
+
+    def on_error(self, error_msg: str, seq: Optional[int] = None, remark: Optional[str] = None):
+        """下单错误回报（回调线程调用），优先按 seq 关联，其次按下单备注"""
+        with self._cond:
+            if not seq and remark:
+                seq = self._remarks.get(remark)
+            if not seq:
+                if remark:
+                    self._orphan_errors[remark] = error_msg
+                    while len(self._orphan_errors) > self.max_unclaimed:
+                        self._orphan_errors.popitem(last=False)
+                return
+            # 超时后到达的错误：seq 仍保留在放弃集合中，随后的失败回报同样不进入未认领回报
+            late = seq in self._abandoned
+            if not late:
+                response = self._responses.get(seq)
+                if response is None or not response.get('order_id') or response['order_id'] <= 0:
+                    self._responses[seq] = {'order_id': None, 'error': error_msg}
+                    self._trim()
+                    self._cond.notify_all()
+        if late:
+            self._notify_late(seq, None, error_msg)
+
+    def collect(self, seqs: Iterable[int], timeout: float) -> Dict[int, Dict[str, Any]]:
+        """等待一组请求的回报，返回 {seq: {'order_id', 'error'}}，超时未到达的 seq 不在结果中"""
+        waiting = set(seqs)
+        results: Dict[int, Dict[str, Any]] = {}
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for seq in [seq for seq in waiting if seq in self._responses]:
+                    results[seq] = self._responses.pop(seq)
+                    waiting.discard(seq)
+                remaining = deadline - time.monotonic()
+                if not waiting or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            self._abandoned.update(waiting)
+            if len(self._abandoned) > self.max_unclaimed:
+                self._abandoned.clear()
+            if waiting:
+                logger.warning(f"{len(waiting)}笔下单请求等待回报超时({timeout}s)")
+            for remark in [remark for remark, seq in self._remarks.items() if seq in results or seq in waiting]:
+                del self._remarks[remark]
+        return results
+
+    def _notify_late(self, seq: int, order_id: Optional[int], error: Optional[str]):
+        if self.on_late is None:
+            return
+        try:
+            self.on_late(seq, order_id, error)
+        except Exception as e:
+            logger.error(f"处理超时后到达的下单回报失败: seq={seq}, {e}")
+
+    def _trim(self):
+        """淘汰最早的未认领回报（调用方持有锁）"""
+        while len(self._responses) > self.max_unclaimed:
+            self._responses.popitem(last=False)
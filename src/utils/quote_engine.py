@@ -0,0 +1,292 @@
+"""
+实时行情订阅引擎
+基于 xtdata 的订阅/推送模型，为每只股票维护定长 NumPy 环形缓冲区，
+提供 O(1) 最新价及其行情时间查询，并将推送分发给 asyncio 订阅者
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# 订阅关闭标记，放入队列以唤醒正在等待的消费者
+_CLOSED = object()
+
+class Tick(NamedTuple):
+    """单笔行情推送"""
+    symbol: str
+    time: int          # 行情时间戳（毫秒）
+    price: float       # 最新价
+    volume: float      # 累计成交量
+    push_ns: int       # 引擎收到推送时的 perf_counter_ns，用于计算端到端延迟
+
+class TickRing:
+    """单只股票的定长行情环形缓冲区"""
+
+    __slots__ = ('capacity', 'times', 'prices', 'volumes', 'pos', 'count')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.volumes = np.zeros(capacity, dtype=np.float64)
+        self.pos = 0
+        self.count = 0
+
+    def append(self, tick_time: int, price: float, volume: float):
+        pos = self.pos
+        self.times[pos] = tick_time
+        self.prices[pos] = price
+        self.volumes[pos] = volume
+        self.pos = (pos + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def snapshot(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """按时间顺序返回最近 n 笔行情的副本"""
+        n = self.count if n is None else min(n, self.count)
+        order = (np.arange(self.pos - n, self.pos)) % self.capacity
+        return {
+            'time': self.times[order],
+            'price': self.prices[order],
+            'volume': self.volumes[order],
+        }
+
+class QuoteSubscription:
+    """asyncio 行情订阅，通过 async for 消费推送"""
+
+    def __init__(self, engine: 'QuoteEngine', symbols: Optional[Set[str]], loop: asyncio.AbstractEventLoop,
+                 maxsize: int):
+        self.engine = engine
+        self.symbols = symbols
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._finished = False
+
+    def _deliver(self, ticks: List[Tick]):
+        """在事件循环线程中将一批推送放入队列，队列满时丢弃并计数"""
+        for tick in ticks:
+            try:
+                self.queue.put_nowait(tick)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tick:
+        if self._finished or (self.closed and self.queue.empty()):
+            raise StopAsyncIteration
+        tick = await self.queue.get()
+        if tick is _CLOSED:
+            self._finished = True
+            raise StopAsyncIteration
+        self.engine._record_latency(time.perf_counter_ns() - tick.push_ns)
+        return tick
+
+    def close(self):
+        """取消订阅，可在任意线程调用；正在等待推送的消费者随即结束迭代"""
+        if self.closed:
+            return
+        self.closed = True
+        self.engine._remove_subscription(self)
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # 事件循环已关闭，没有等待中的消费者
+            pass
+
+    def _wake(self):
+        """在事件循环线程中放入关闭标记；队列已满时消费者不会阻塞，取空后按 closed 结束"""
+        try:
+            self.queue.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            pass
+
+class QuoteEngine:
+    """实时行情引擎
+
+    Args:
+        capacity: 每只股票环形缓冲区保留的行情笔数
+        latency_window: 延迟统计保留的样本数
+    """
+
+    def __init__(self, capacity: int = 1024, latency_window: int = 65536):
+        self.capacity = capacity
+        self._rings: Dict[str, TickRing] = {}
+        self._last_quote: Dict[str, Tuple[float, int]] = {}   # 股票代码 -> (最新价, 行情时间戳毫秒)
+        self._subscriptions: List[QuoteSubscription] = []
+        self._lock = threading.Lock()
+        self._source = None
+        self._seqs: List[Any] = []
+        self._symbols: Set[str] = set()
+        self._pushes = 0
+        self._ticks = 0
+        self._latency = np.zeros(latency_window, dtype=np.int64)
+        self._latency_lock = threading.Lock()   # 不同事件循环的订阅者可能同时记录
+        self._latency_pos = 0
+        self._latency_count = 0
+
+    def start(self, symbols: Iterable[str], source=None) -> bool:
+        """启动行情订阅，已启动时只追加订阅新的股票
+
+        Args:
+            symbols: 股票代码列表
+            source: 提供 subscribe_whole_quote/unsubscribe_quote 的行情源，默认使用已连接的 xtdata
+        """
+        if source is None:
+            source = self._source
+        if source is None:
+            from .xtquant_client import xt_client
+            if not xt_client.is_connected():
+                logger.warning("XTQuant未连接，无法订阅实时行情")
+                return False
+            source = xt_client._xt
+
+        self._source = source
+        return self.watch(symbols)
+
+    def watch(self, symbols: Iterable[str]) -> bool:
+        """追加订阅尚未订阅的股票，引擎未启动时不订阅并返回False"""
+        source = self._source
+        if source is None:
+            return False
+        with self._lock:
+            symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol and symbol not in self._symbols]
+            if not symbols:
+                return True
+            try:
+                seq = source.subscribe_whole_quote(symbols, callback=self.on_push)
+            except Exception as e:
+                logger.error(f"订阅实时行情失败: {e}")
+                return False
+            self._symbols.update(symbols)
+            self._seqs.append(seq)
+        logger.info(f"已订阅{len(symbols)}只股票的实时行情, seq={seq}, 共{len(self._symbols)}只")
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._source is not None
+
+    def stop(self):
+        """取消全部行情订阅"""
+        if self._source is not None:
+            for seq in self._seqs:
+                try:
+                    self._source.unsubscribe_quote(seq)
+                except Exception as e:
+                    logger.debug(f"取消行情订阅失败: seq={seq}, {e}")
+        self._seqs = []
+        self._symbols = set()
+        self._source = None
+
+    def on_push(self, datas: Dict[str, Dict[str, Any]]):
+        """xtdata 推送回调，datas 为 {股票代码: tick字典}"""
+        push_ns = time.perf_counter_ns()
+        now_ms = int(time.time() * 1000)
+        rings = self._rings
+        last_quote = self._last_quote
+        ticks = []
+        for symbol, data in datas.items():
+            price = data.get('lastPrice')
+            if price is None:
+                continue
+            # 不带行情时间的推送按收到时间计
+            tick_time = int(data.get('time') or 0) or now_ms
+            tick = Tick(symbol, tick_time, float(price), float(data.get('volume', 0.0)), push_ns)
+            ring = rings.get(symbol)
+            if ring is None:
+                ring = rings[symbol] = TickRing(self.capacity)
+            ring.append(tick.time, tick.price, tick.volume)
+            last_quote[symbol] = (tick.price, tick_time)
+            ticks.append(tick)
+
+        self._pushes += 1
+        self._ticks += len(ticks)
+        if not ticks:
+            return
+
+        for sub in self._subscriptions:
+            batch = ticks if sub.symbols is None else [tick for tick in ticks if tick.symbol in sub.symbols]
+            if batch:
+                sub.loop.call_soon_threadsafe(sub._deliver, batch)
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        """最新价，O(1)查询，未收到过推送时返回None"""
+        quote = self._last_quote.get(symbol)
+        return quote[0] if quote is not None else None
+
+    def last_quote(self, symbol: str) -> Optional[Tuple[float, int]]:
+        """最新价及其行情时间戳（毫秒），未收到过推送时返回None"""
+        return self._last_quote.get(symbol)
+
+    def quote_age(self, symbol: str) -> Optional[float]:
+        """最新价距今的秒数，未收到过推送时返回None"""
+        quote = self._last_quote.get(symbol)
+        return time.time() - quote[1] / 1000.0 if quote is not None else None
+
+    def recent_ticks(self, symbol: str, n: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """最近 n 笔行情（time/price/volume 数组）"""
+        ring = self._rings.get(symbol)
+        return ring.snapshot(n) if ring is not None else None
+
+    def subscribe(self, symbols: Optional[Iterable[str]] = None, maxsize: int = 10000) -> QuoteSubscription:
+        """在当前事件循环中创建订阅，symbols 为空时接收全部推送"""
+        sub = QuoteSubscription(self, set(symbols) if symbols else None, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            # 复制后替换，推送线程遍历时无需加锁
+            self._subscriptions = self._subscriptions + [sub]
+        return sub
+
+    def latency_stats(self) -> Dict[str, float]:
+        """推送到消费者的端到端延迟统计（微秒）"""
+        with self._latency_lock:
+            n = self._latency_count
+            samples = self._latency[:n] / 1000.0
+        if n == 0:
+            return {'samples': 0}
+        return {
+            'samples': n,
+            'mean_us': float(samples.mean()),
+            'p50_us': float(np.percentile(samples, 50)),
+            'p99_us': float(np.percentile(samples, 99)),
+            'max_us': float(samples.max()),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """引擎运行统计"""
+        return {
+            'symbols': len(self._rings),
+            'subscribed': len(self._symbols),
+            'pushes': self._pushes,
+            'ticks': self._ticks,
+            'subscribers': len(self._subscriptions),
+            'dropped': sum(sub.dropped for sub in self._subscriptions),
+            'latency': self.latency_stats(),
+        }
+
+    # 私有方法
+
+    def _remove_subscription(self, sub: QuoteSubscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not sub]
+
+    def _record_latency(self, latency_ns: int):
+        with self._latency_lock:
+            self._latency[self._latency_pos] = latency_ns
+            self._latency_pos = (self._latency_pos + 1) % len(self._latency)
+            if self._latency_count < len(self._latency):
+                self._latency_count += 1
+
+# 全局行情引擎实例
+quote_engine = QuoteEngine(capacity=config.data.quote_buffer_size)
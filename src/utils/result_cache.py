@@ -0,0 +1,181 @@
+"""
+回测结果缓存模块
+按 (策略参数哈希, 行情数据指纹) 缓存策略回测报告：内存 LRU 在前，本地 SQLite 持久化在后。
+行情数据变化时指纹随之变化，旧结果不再命中并在写入新结果时删除
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from ..config import config
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 报告格式或回测口径变化时递增，使旧版本结果全部失效
+RESULT_SCHEMA_VERSION = 1
+
+# 影响回测结果的交易配置，BacktestEngine 未显式传参时读取 config.trading 中的这些字段
+TRADING_FIELDS = ('default_capital', 'commission_rate', 'slippage', 'min_order_quantity', 'max_position_ratio')
+
+class BacktestResultCache:
+    """回测结果缓存
+
+    Args:
+        db_path: SQLite 文件路径，为空时只使用内存缓存
+        max_bytes: 内存缓存上限
+    """
+
+    def __init__(self, db_path: Optional[str], max_bytes: int = 16 * 1024 * 1024):
+        self.db_path = db_path
+        self.memory = TTLCache('backtest_result', ttl=None, max_bytes=max_bytes,
+                               sizeof=lambda report: len(report) * 4)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._invalidated = 0
+
+    @staticmethod
+    def param_hash(strategy_type: str, symbol: str, start_date: str, end_date: str,
+                   params: Dict[str, Any]) -> str:
+        """请求参数与当前生效的回测交易配置的哈希，参数顺序无关"""
+        payload = json.dumps({
+            'version': RESULT_SCHEMA_VERSION,
+            'strategy_type': strategy_type,
+            'symbol': symbol,
+            'start_date': start_date,
+            'end_date': end_date,
+            'params': {key: value for key, value in params.items() if value is not None},
+            'trading': {field: getattr(config.trading, field) for field in TRADING_FIELDS},
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def get(self, param_hash: str, fingerprint: str) -> Optional[str]:
+        """读取缓存的报告，先查内存再查磁盘"""
+        key = (param_hash, fingerprint)
+        report = self.memory.get(key)
+        if report is not None:
+            with self._lock:
+                self._memory_hits += 1
+            return report
+
+        report = self._read(param_hash, fingerprint)
+        with self._lock:
+            if report is None:
+                self._misses += 1
+            else:
+                self._disk_hits += 1
+        if report is not None:
+            self.memory.set(key, report)
+        return report
+
+    def put(self, param_hash: str, fingerprint: str, report: str):
+        """写入报告，同一请求基于旧行情数据的结果一并删除"""
+        self.memory.set((param_hash, fingerprint), report)
+        with self._lock:
+            self._stores += 1
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    cursor = conn.execute(
+                        "DELETE FROM results WHERE param_hash = ? AND fingerprint != ?", (param_hash, fingerprint))
+                    self._invalidated += cursor.rowcount
+                    conn.execute(
+                        "INSERT OR REPLACE INTO results (param_hash, fingerprint, created_at, report) "
+                        "VALUES (?, ?, ?, ?)",
+                        (param_hash, fingerprint, time.time(), zlib.compress(report.encode('utf-8'))))
+            except sqlite3.Error as e:
+                logger.error(f"写入回测结果缓存失败: {e}")
+
+    def clear(self):
+        """清空内存与磁盘缓存"""
+        self.memory.invalidate()
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            stats = {
+                'name': self.memory.name,
+                'memory_entries': len(self.memory),
+                'memory_hits': self._memory_hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': (self._memory_hits + self._disk_hits) / lookups if lookups else 0.0,
+                'stores': self._stores,
+                'invalidated': self._invalidated,
+            }
+            # 只读统计不创建数据库文件：尚未写入过磁盘缓存时不报告磁盘条目数
+            if self._conn is not None or (self.db_path and os.path.exists(self.db_path)):
+                conn = self._connect()
+            else:
+                conn = None
+            if conn is not None:
+                stats['disk_entries'] = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # 私有方法
+
+    def _read(self, param_hash: str, fingerprint: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT report FROM results WHERE param_hash = ? AND fingerprint = ?",
+                                   (param_hash, fingerprint)).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"读取回测结果缓存失败: {e}")
+                return None
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """首次使用时打开数据库（调用方持有锁）"""
+        if self._conn is not None or not self.db_path:
+            return self._conn
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "param_hash TEXT NOT NULL, fingerprint TEXT NOT NULL, created_at REAL NOT NULL, "
+                "report BLOB NOT NULL, PRIMARY KEY (param_hash, fingerprint))")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            logger.error(f"打开回测结果缓存失败，仅使用内存缓存: {e}")
+            self.db_path = None
+        return self._conn
+
+# 全局回测结果缓存实例，未启用时为 None
+backtest_result_cache = BacktestResultCache(
+    config.data.result_cache_path,
+    max_bytes=config.data.result_cache_max_bytes
+) if config.data.result_cache_enabled else None
@@ -0,0 +1,266 @@
+"""
+下单前风控引擎
+完全基于进程内状态：交易账本的持仓与未完成买单聚合量、实时行情引擎的最新价，
+以及本引擎为已通过检查、尚未出现在账本中的订单保留的额度，检查过程不访问柜台
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from ..config import config
+from .order_book import OrderBook
+from .quote_engine import quote_engine
+
+logger = logging.getLogger(__name__)
+
+class RiskDecision(NamedTuple):
+    """风控检查结果，通过时 token 为保留额度的编号；未做部分检查而放行时 reason 说明原因"""
+    passed: bool
+    reason: Optional[str] = None
+    token: Optional[int] = None
+
+class _Reservation:
+    """已通过检查的买单占用的额度"""
+
+    __slots__ = ('symbol', 'value', 'order_id', 'created')
+
+    def __init__(self, symbol: str, value: float):
+        self.symbol = symbol
+        self.value = value
+        self.order_id: Optional[int] = None
+        self.created = time.monotonic()
+
+class PreTradeRiskEngine:
+    """下单前风控
+
+    检查项（按顺序，命中第一项即拒绝）：
+        1. 单笔金额不超过 max_order_value
+        2. 委托价偏离实时行情最新价不超过 risk_control.max_price_deviation
+        3. 卖出数量不超过可用持仓（账本已建立时）
+        4. 账户回撤（相对本进程观测到的最高总资产）超过 risk_control.max_drawdown_limit 后禁止买入
+        5. 持仓亏损超过 risk_control.stop_loss_ratio 后禁止加仓
+        6. 单只股票 持仓市值+未完成买单+本笔 不超过 max_position_value
+        7. 全部 持仓市值+未完成买单+本笔 不超过 总资产 x risk_control.max_leverage
+
+    最新价由已启动的行情引擎提供，超过 risk_control.max_quote_age 秒未更新的最新价视为没有参考价。
+    没有参考价时：risk_control.require_quote 为真则拒绝买入；否则买入不做价格偏离与止损检查，
+    卖出只减少敞口，不做价格偏离检查，两者均在 reason 中注明后放行。委托价不参与任何估值
+
+    持仓市值按 数量x最新价 计算，没有参考价的持仓按柜台推送的市值计，单股与总敞口两项使用同一估值
+
+    通过检查的买单立即保留额度，下单成功后绑定订单号，账本收到该委托后释放（其金额已计入未完成买单），
+    下单失败时释放；reservation_ttl 秒内仍未释放的保留额度视为过期
+
+    Args:
+        book: 交易账本
+        reservation_ttl: 保留额度的最长有效期（秒）
+    """
+
+    def __init__(self, book: OrderBook, reservation_ttl: float = 60.0):
+        self.book = book
+        self.reservation_ttl = reservation_ttl
+        self._lock = threading.Lock()
+        self._tokens = itertools.count(1)
+        self._reservations: Dict[int, _Reservation] = {}   # 按创建时间排列
+        self._by_order: Dict[int, int] = {}                 # 订单号 -> 保留额度编号
+        self._reserved: Dict[str, float] = {}
+        self._reserved_total = 0.0
+        self._peak_asset = 0.0
+        self._checks = 0
+        self._rejects = 0
+        self._no_quote = 0
+        book.add_listener(self._on_book_order)
+
+    def check(self, symbol: str, direction: str, quantity: int, price: float) -> RiskDecision:
+        """检查一笔订单，买单通过时保留额度；未做部分检查而放行时 reason 说明原因"""
+        trading, risk = config.trading, config.risk
+        if not risk.enabled:
+            return RiskDecision(True)
+        value = quantity * price
+        now = time.time()
+        last_price, missing = self._reference_price(symbol, now)
+        # 持仓估值需要读取账本（账本锁），在本引擎的锁外完成，避免与账本监听器的加锁顺序相反
+        holdings = self._holdings_value(now) if direction == 'BUY' else None
+
+        with self._lock:
+            self._checks += 1
+            note = None
+            if value > trading.max_order_value:
+                reason = f"单笔金额{value:.2f}超过上限{trading.max_order_value:.2f}"
+            else:
+                reason = self._check_price(direction, price, last_price, missing)
+            if reason is None:
+                if direction == 'SELL':
+                    reason = self._check_sell(symbol, quantity)
+                else:
+                    reason = self._check_buy(symbol, value, last_price, holdings)
+            if reason is None and last_price is None:
+                note = f"{missing}，未做价格偏离检查" if direction == 'SELL' else \
+                    f"{missing}，未做价格偏离与止损检查，持仓按柜台推送市值计"
+                logger.warning(f"{symbol} {direction} {quantity}股 @{price}: {note}")
+
+            if reason is not None:
+                self._rejects += 1
+                return RiskDecision(False, reason)
+            if direction == 'SELL':
+                return RiskDecision(True, note)
+
+            token = next(self._tokens)
+            self._reservations[token] = _Reservation(symbol, value)
+            self._reserved[symbol] = self._reserved.get(symbol, 0.0) + value
+            self._reserved_total += value
+            return RiskDecision(True, note, token)
+
+    def bind(self, token: Optional[int], order_id: Any):
+        """下单成功后将保留额度绑定到订单号，账本已收到该委托时直接释放"""
+        with self._lock:
+            reservation = self._reservations.get(token)
+            if reservation is None:
+                return
+            try:
+                order_id = int(order_id)
+            except (TypeError, ValueError):
+                # 模拟模式的订单号不会出现在账本中
+                self._release(token)
+                return
+            if self.book.order(order_id) is not None:
+                self._release(token)
+            else:
+                reservation.order_id = order_id
+                self._by_order[order_id] = token
+
+    def release(self, token: Optional[int]):
+        """下单失败时释放保留额度"""
+        with self._lock:
+            self._release(token)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checks': self._checks,
+                'rejects': self._rejects,
+                'no_quote': self._no_quote,
+                'reservations': len(self._reservations),
+                'reserved_value': self._reserved_total,
+                'peak_asset': self._peak_asset,
+            }
+
+    # 私有方法
+
+    @staticmethod
+    def _reference_price(symbol: str, now: float) -> Tuple[Optional[float], Optional[str]]:
+        """实时行情最新价；没有推送或超过 risk_control.max_quote_age 未更新时返回 (None, 原因)"""
+        quote = quote_engine.last_quote(symbol)
+        if quote is None:
+            return None, f"{symbol}没有实时行情参考价"
+        age = now - quote[1] / 1000.0
+        max_age = config.risk.max_quote_age
+        if 0 < max_age < age:
+            return None, f"{symbol}最新价已{age:.0f}秒未更新，超过有效期{max_age:.0f}秒"
+        return quote[0], None
+
+    def _holdings_value(self, now: float) -> Dict[str, float]:
+        """各持仓市值：有有效最新价时为 数量x最新价，否则为柜台推送的市值"""
+        values = {}
+        for symbol, position in self.book.positions().items():
+            last_price, _ = self._reference_price(symbol, now)
+            if last_price is None:
+                values[symbol] = position['market_value'] or 0.0
+            else:
+                values[symbol] = (position['volume'] or 0) * last_price
+        return values
+
+    # 以下私有方法调用方持有锁
+
+    def _check_price(self, direction: str, price: float, last_price: Optional[float],
+                     missing: Optional[str]) -> Optional[str]:
+        risk = config.risk
+        if last_price is None:
+            self._no_quote += 1
+            if direction == 'BUY' and risk.require_quote:
+                return f"{missing}，无法校验委托价与持仓市值"
+            return None
+        deviation = abs(price / last_price - 1.0)
+        if deviation > risk.max_price_deviation:
+            return f"委托价{price}偏离最新价{last_price}达{deviation:.2%}，超过上限{risk.max_price_deviation:.2%}"
+        return None
+
+    def _check_sell(self, symbol: str, quantity: int) -> Optional[str]:
+        book = self.book
+        position = book.position(symbol)
+        if book.seeded and (position is None or quantity > (position['can_use_volume'] or 0)):
+            available = position['can_use_volume'] if position else 0
+            return f"可用持仓不足: 可用{available}股, 卖出{quantity}股"
+        return None
+
+    def _check_buy(self, symbol: str, value: float, last_price: Optional[float],
+                   holdings: Dict[str, float]) -> Optional[str]:
+        trading, risk = config.trading, config.risk
+        book = self.book
+        asset = book.asset()
+        total_asset = (asset or {}).get('total_asset') or 0.0
+
+        if total_asset > 0:
+            self._peak_asset = max(self._peak_asset, total_asset)
+            drawdown = 1.0 - total_asset / self._peak_asset
+            if drawdown > risk.max_drawdown_limit:
+                return f"账户回撤{drawdown:.2%}超过上限{risk.max_drawdown_limit:.2%}，禁止买入"
+
+        self._expire()
+        position = book.position(symbol)
+        if position is not None and last_price is not None:
+            avg_price = position['avg_price'] or 0.0
+            if avg_price > 0 and last_price < avg_price * (1.0 - risk.stop_loss_ratio):
+                return f"持仓亏损{1.0 - last_price / avg_price:.2%}超过止损线{risk.stop_loss_ratio:.2%}，禁止加仓"
+
+        # 单股与总敞口使用同一持仓估值
+        held_value = holdings.get(symbol, 0.0)
+        symbol_value = held_value + book.open_buy_value(symbol) + self._reserved.get(symbol, 0.0) + value
+        if symbol_value > trading.max_position_value:
+            return f"{symbol}持仓及挂单金额{symbol_value:.2f}将超过上限{trading.max_position_value:.2f}"
+
+        if total_asset > 0:
+            gross = sum(holdings.values()) + book.open_buy_value() + self._reserved_total + value
+            limit = total_asset * risk.max_leverage
+            if gross > limit:
+                return f"总敞口{gross:.2f}将超过上限{limit:.2f}（总资产{total_asset:.2f} x {risk.max_leverage}）"
+        return None
+
+    def _on_book_order(self, order: Dict[str, Any]):
+        """账本收到新委托：释放绑定到该订单号的保留额度（回调线程调用）"""
+        if not self._by_order:
+            return
+        with self._lock:
+            token = self._by_order.get(order['order_id'])
+            if token is not None:
+                self._release(token)
+
+    def _expire(self):
+        """从最早的保留额度开始释放过期项，均摊 O(1)"""
+        if not self._reservations:
+            return
+        deadline = time.monotonic() - self.reservation_ttl
+        while self._reservations:
+            token, reservation = next(iter(self._reservations.items()))
+            if reservation.created > deadline:
+                break
+            logger.warning(f"保留额度过期释放: {reservation.symbol} {reservation.value:.2f}")
+            self._release(token)
+
+    def _release(self, token: Optional[int]):
+        reservation = self._reservations.pop(token, None)
+        if reservation is None:
+            return
+        if reservation.order_id is not None:
+            self._by_order.pop(reservation.order_id, None)
+        remaining = self._reserved.get(reservation.symbol, 0.0) - reservation.value
+        if remaining > 1e-6:
+            self._reserved[reservation.symbol] = remaining
+        else:
+            self._reserved.pop(reservation.symbol, None)
+        self._reserved_total -= reservation.value
+        if not self._reservations:
+            self._reserved_total = 0.0
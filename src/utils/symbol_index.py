@@ -0,0 +1,68 @@
+"""
+股票代码索引模块
+预先建立 精确代码 / 去后缀代码 / 市场前缀代码 到标准代码的映射，
+使代码解析为 O(1) 字典查找
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class SymbolIndex:
+    """股票代码索引
+
+    对于标准代码 000001.SZ，以下写法都能解析到它：
+        - 000001.SZ / 000001.sz（精确匹配，忽略大小写）
+        - 000001（去后缀匹配）
+        - SZ000001 / sz000001（市场前缀写法）
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self._keys: Dict[str, str] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.build(symbols)
+
+    def build(self, symbols: Iterable[str]):
+        """根据股票列表重建索引"""
+        keys: Dict[str, str] = {}
+        size = 0
+        for symbol in symbols:
+            if not symbol:
+                continue
+            size += 1
+            upper = symbol.upper()
+            keys.setdefault(symbol, symbol)
+            keys.setdefault(upper, symbol)
+            if '.' in upper:
+                code, market = upper.split('.', 1)
+                # 同一数字代码可能同时存在于多个市场（如指数），先出现者优先
+                keys.setdefault(code, symbol)
+                keys.setdefault(f"{market}{code}", symbol)
+
+        with self._lock:
+            self._keys = keys
+            self._size = size
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        """将任意写法的股票代码解析为标准代码，未找到时返回None"""
+        if not symbol:
+            return None
+        keys = self._keys
+        matched = keys.get(symbol)
+        if matched is not None:
+            return matched
+
+        key = symbol.strip().upper()
+        matched = keys.get(key)
+        if matched is None and '.' in key:
+            matched = keys.get(key.split('.', 1)[0])
+        return matched
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.resolve(symbol) is not None
+
+    def __len__(self) -> int:
+        return self._size
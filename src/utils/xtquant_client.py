@@ -4,17 +4,57 @@ XTQuant客户端管理模块
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
-from typing import Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from ..config import config
+from .bar_cache import BarCache
+from .market_panel import MarketPanel, concat_panels, is_field_layout
+from .symbol_index import SymbolIndex
+from .cache import TTLCache
+from .data_handler import DataHandler
 
 logger = logging.getLogger(__name__)
 
+# 流式拉取时各周期默认的窗口自然日数
+DEFAULT_WINDOW_DAYS = {
+    'tick': 1,
+    '1m': 7,
+    '5m': 30,
+    '15m': 90,
+    '30m': 180,
+    '1h': 365,
+    '1d': 3650,
+}
+
+@dataclass
+class BatchFetchResult:
+    """批量获取结果"""
+    panel: Optional[MarketPanel]
+    failed: Dict[str, str] = field(default_factory=dict)   # 股票代码 -> 失败原因
+    
+    @property
+    def succeeded(self) -> List[str]:
+        return self.panel.symbols if self.panel is not None else []
+
 class XTQuantClient:
     """XTQuant客户端管理器"""
     
     def __init__(self):
         self._connected = False
         self._xt = None
+        self.bar_cache = BarCache(config.data.bar_cache_dir) if config.data.bar_cache_enabled else None
+        self._symbol_indexes: Dict[str, SymbolIndex] = {}
+        # 板块列表、合约信息、近期K线窗口共用的内存缓存
+        self.cache = TTLCache(
+            'xtdata',
+            ttl=config.screening.cache_timeout,
+            max_bytes=config.data.cache_max_bytes
+        )
         
     def connect(self) -> bool:
         """连接到XTQuant"""
@@ -44,10 +84,12 @@ class XTQuantClient:
     def _test_connection(self) -> bool:
         """测试连接是否可用"""
         try:
-            # 尝试获取简单的股票列表来测试连接
-            test_result = self._xt.get_stock_list_in_sector('沪深A股')
+            # 获取股票列表测试连接，结果写入缓存，后续 get_stock_list 直接命中
+            test_result = self._load_stock_list('沪深A股')
             if test_result is not None and len(test_result) > 0:
                 logger.info(f"连接测试成功，获取到 {len(test_result)} 只股票")
+                # 顺带建立代码索引，避免后续首次解析时再次下载股票列表
+                self._symbol_indexes['沪深A股'] = SymbolIndex(test_result)
                 return True
             return False
         except Exception as e:
@@ -58,31 +100,107 @@ class XTQuantClient:
         """检查连接状态"""
         return self._connected
     
-    def get_market_data(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
-        """获取股票行情数据 - 修复数据结构处理"""
+    def symbol_index(self, sector: str = '沪深A股') -> SymbolIndex:
+        """获取板块对应的代码索引，首次使用时构建"""
+        index = self._symbol_indexes.get(sector)
+        if index is None:
+            index = self.refresh_symbol_index(sector)
+        return index
+    
+    def refresh_symbol_index(self, sector: str = '沪深A股') -> SymbolIndex:
+        """重新下载板块股票列表并重建代码索引"""
+        index = self._symbol_indexes.get(sector) or SymbolIndex()
+        self.cache.invalidate(('sector', sector))
+        stock_list = self.get_stock_list(sector) if self._connected else None
+        if stock_list:
+            index.build(stock_list)
+            logger.info(f"代码索引已更新: {sector} {len(index)}只股票")
+        self._symbol_indexes[sector] = index
+        return index
+    
+    def resolve_symbol(self, symbol: str, sector: str = '沪深A股') -> str:
+        """将股票代码解析为标准代码（如 000001 -> 000001.SZ），无法解析时原样返回"""
+        index = self._symbol_indexes.get(sector)
+        if index is None:
+            if not self._connected:
+                return symbol
+            index = self.symbol_index(sector)
+        return index.resolve(symbol) or symbol
+    
+    def get_market_data(self, symbol: str, start_date: str, end_date: str,
+                        period: str = '1d', compact: bool = False) -> Optional[pd.DataFrame]:
+        """获取股票行情数据，优先读取本地K线缓存，仅补取缺失区间
+        
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+            period: 周期，支持 tick/1m/5m/15m/30m/1h/1d
+            compact: 是否返回紧凑表示（float32价格、整数量额、交易日偏移），
+                     见 DataHandler.compact_market_data
+        """
         if not self._connected:
             raise ConnectionError("XTQuant未连接，请先调用connect()方法")
         
+        symbol = self.resolve_symbol(symbol)
+        
+        # 确保日期格式为YYYYMMDD（xtquant期望的格式）
+        if start_date and '-' in start_date:
+            start_date = start_date.replace('-', '')
+        if end_date and '-' in end_date:
+            end_date = end_date.replace('-', '')
+            
+        # 确保日期不为空
+        if not start_date or not end_date:
+            logger.error(f"日期参数不能为空: start_date={start_date}, end_date={end_date}")
+            return None
+        
+        # 近期K线窗口走内存缓存，并发的相同请求只会读取一次
+        data = self.cache.get_or_load(
+            ('bars', symbol, period, start_date, end_date),
+            lambda: self._load_market_data(symbol, start_date, end_date, period)
+        )
+        if data is None:
+            return None
+        if compact:
+            return DataHandler.compact_market_data(data, symbol, self.get_trading_calendar(symbol))
+        # 缓存中的对象（可能是面板数组的视图）不直接交给调用方，避免调用方的修改影响后续命中
+        return data.copy()
+    
+    def _load_market_data(self, symbol: str, start_date: str, end_date: str,
+                          period: str = '1d') -> Optional[pd.DataFrame]:
+        """从本地K线缓存读取行情，仅补取缺失区间"""
+        if self.bar_cache is None:
+            return self._fetch_market_data(symbol, start_date, end_date, period)
+        
         try:
-            # 确保日期格式为YYYYMMDD（xtquant期望的格式）
-            if start_date and '-' in start_date:
-                start_date = start_date.replace('-', '')
-            if end_date and '-' in end_date:
-                end_date = end_date.replace('-', '')
-                
-            # 确保日期不为空
-            if not start_date or not end_date:
-                logger.error(f"日期参数不能为空: start_date={start_date}, end_date={end_date}")
-                return None
+            for gap_start, gap_end in self.bar_cache.missing_ranges(symbol, period, start_date, end_date):
+                logger.info(f"K线缓存缺失{symbol} {period} {gap_start}-{gap_end}，从XTQuant补取")
+                gap_data = self._fetch_market_data(symbol, gap_start, gap_end, period, allow_empty=True)
+                # 区间内没有K线（停牌、未上市）同样记录为已覆盖，拉取失败时不记录
+                if gap_data is not None:
+                    self.bar_cache.update(symbol, period, gap_data, gap_start, gap_end)
             
-            logger.info(f"正在获取{symbol}从{start_date}到{end_date}的数据")
+            return self.bar_cache.read(symbol, period, start_date, end_date)
+        except Exception as e:
+            logger.error(f"读取{symbol}K线缓存失败，回退到直接拉取: {e}")
+            return self._fetch_market_data(symbol, start_date, end_date, period)
+    
+    def _fetch_market_data(self, symbol: str, start_date: str, end_date: str,
+                           period: str = '1d', allow_empty: bool = False) -> Optional[pd.DataFrame]:
+        """从XTQuant拉取单只股票行情数据 - 修复数据结构处理
+        
+        allow_empty 为 True 时，xtdata 正常返回但区间内没有K线会返回空 DataFrame，以便与拉取失败区分
+        """
+        try:
+            logger.info(f"正在获取{symbol}从{start_date}到{end_date}的{period}数据")
             
-            # 获取日线数据
+            start_time, end_time = _xt_time_range(start_date, end_date, period)
             data = self._xt.get_market_data(
                 stock_list=[symbol],
-                period='1d',
-                start_time=start_date,  # 使用YYYYMMDD格式
-                end_time=end_date,      # 使用YYYYMMDD格式
+                period=period,
+                start_time=start_time,
+                end_time=end_time,
                 fill_data=True
             )
             
@@ -98,72 +216,39 @@ class XTQuantClient:
                 
             logger.info(f"获取{symbol}数据成功，数据类型: {type(data)}, 数据大小: {len(data) if data else 0}")
             
-            # xtquant返回的数据结构是 {field_name: DataFrame}
-            # 检查是否有所需的基本字段
-            required_fields = ['time', 'open', 'high', 'low', 'close', 'volume']
-            missing_fields = [field for field in required_fields if field not in data]
-            if missing_fields:
-                logger.error(f"获取{symbol}数据缺少必要字段: {missing_fields}")
-                logger.error(f"实际可用字段: {list(data.keys())}")
-                return None
-            
-            logger.info(f"数据字段检查通过，获取到字段: {list(data.keys())}")
-            
-            # 智能匹配股票代码
-            time_df = data['time']
-            available_symbols = list(time_df.index)
-            matched_symbol = None
-            
-            # 尝试多种匹配方式
-            if symbol in available_symbols:
-                # 精确匹配
-                matched_symbol = symbol
-                logger.info(f"精确匹配到股票代码: {symbol}")
+            # K线返回 {field_name: DataFrame}，分笔返回 {stock_code: ndarray}
+            if is_field_layout(data):
+                # 检查是否有所需的基本字段
+                required_fields = ['time', 'open', 'high', 'low', 'close', 'volume']
+                missing_fields = [field for field in required_fields if field not in data]
+                if missing_fields:
+                    logger.error(f"获取{symbol}数据缺少必要字段: {missing_fields}")
+                    logger.error(f"实际可用字段: {list(data.keys())}")
+                    return None
+                
+                logger.info(f"数据字段检查通过，获取到字段: {list(data.keys())}")
+                available_symbols = list(data['time'].index)
             else:
-                # 尝试去掉市场后缀匹配（如 000001.SZ -> 000001）
-                code_without_suffix = symbol.split('.')[0] if '.' in symbol else symbol
-                for avail_symbol in available_symbols:
-                    if avail_symbol == code_without_suffix:
-                        matched_symbol = avail_symbol
-                        logger.info(f"去后缀匹配成功: {symbol} -> {matched_symbol}")
-                        break
-                    elif avail_symbol.split('.')[0] == code_without_suffix:
-                        matched_symbol = avail_symbol
-                        logger.info(f"代码匹配成功: {symbol} -> {matched_symbol}")
-                        break
+                available_symbols = list(data.keys())
+            
+            # 智能匹配股票代码（精确 / 去后缀 / 市场前缀）
+            matched_symbol = SymbolIndex(available_symbols).resolve(symbol)
             
             if matched_symbol is None:
                 logger.error(f"股票代码 {symbol} 未找到匹配项。可用代码: {available_symbols[:10]}...")
                 return None
+            if matched_symbol != symbol:
+                logger.debug(f"代码匹配成功: {symbol} -> {matched_symbol}")
             
-            # 重构数据为标准格式 DataFrame
+            # 重构数据为标准格式 DataFrame（面板视图，不复制数据）
             try:
-                dates = time_df.columns
-                result_data = {
-                    'time': [pd.to_datetime(str(date)) for date in dates],
-                    'open': data['open'].loc[matched_symbol].values,
-                    'high': data['high'].loc[matched_symbol].values,
-                    'low': data['low'].loc[matched_symbol].values,
-                    'close': data['close'].loc[matched_symbol].values,
-                    'volume': data['volume'].loc[matched_symbol].values,
-                }
-                
-                # 添加成交额（如果存在）
-                if 'amount' in data:
-                    result_data['amount'] = data['amount'].loc[matched_symbol].values
-                
-                # 添加前收盘价（如果存在）
-                if 'preClose' in data:
-                    result_data['preClose'] = data['preClose'].loc[matched_symbol].values
-                
-                # 创建DataFrame
-                df = pd.DataFrame(result_data)
-                df.set_index('time', inplace=True)
+                panel = MarketPanel.from_xtdata(data)
+                df = panel.frame(matched_symbol)
                 
                 if df.empty:
                     logger.warning(f"重构后的{symbol}数据为空 - 在指定日期范围内没有交易数据")
                     logger.info(f"建议检查：1) 股票是否在此期间停牌 2) 日期范围是否有效 3) 数据权限是否充足")
-                    return None
+                    return df if allow_empty else None
                 
                 logger.info(f"成功获取{symbol}的{len(df)}条数据")
                 return df
@@ -171,14 +256,13 @@ class XTQuantClient:
             except Exception as e:
                 logger.error(f"重构{symbol}数据时出错: {e}")
                 logger.error(f"matched_symbol: {matched_symbol}, 可用数据字段: {list(data.keys())}")
-                logger.error(f"时间数据shape: {time_df.shape}, 收盘价数据shape: {data['close'].shape}")
                 return None
                 
         except Exception as e:
             logger.error(f"获取{symbol}数据失败: {e}")
             return None
     
-    def get_raw_market_data(self, symbols: list, start_date: str, end_date: str) -> Optional[Dict]:
+    def get_raw_market_data(self, symbols: list, start_date: str, end_date: str, period: str = '1d') -> Optional[Dict]:
         """获取原始格式的多股票数据"""
         if not self._connected:
             raise ConnectionError("XTQuant未连接")
@@ -195,13 +279,14 @@ class XTQuantClient:
                 logger.error(f"日期参数不能为空: start_date={start_date}, end_date={end_date}")
                 return None
             
-            logger.info(f"正在获取{len(symbols)}只股票从{start_date}到{end_date}的原始数据")
+            logger.info(f"正在获取{len(symbols)}只股票从{start_date}到{end_date}的{period}原始数据")
             
+            start_time, end_time = _xt_time_range(start_date, end_date, period)
             data = self._xt.get_market_data(
                 stock_list=symbols,
-                period='1d',
-                start_time=start_date,
-                end_time=end_date,
+                period=period,
+                start_time=start_time,
+                end_time=end_time,
                 fill_data=True
             )
             
@@ -211,17 +296,196 @@ class XTQuantClient:
             logger.error(f"获取多股票原始数据失败: {e}")
             return None
     
+    def get_market_panel(self, symbols: list, start_date: str, end_date: str,
+                         fields: Optional[List[str]] = None, period: str = '1d') -> Optional[MarketPanel]:
+        """获取多股票行情面板
+        
+        将各字段堆叠为一个连续的 (field, symbol, time) 数组，时间索引只解析一次，
+        通过 panel.frame(symbol) 获取的单股 DataFrame 为面板的零拷贝视图。
+        
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+            fields: 需要的字段，默认包含 open/high/low/close/volume 及可用的 amount/preClose
+            period: K线周期
+        
+        Returns:
+            MarketPanel，获取失败时返回None
+        """
+        data = self.get_raw_market_data(symbols, start_date, end_date, period)
+        if not isinstance(data, dict) or (is_field_layout(data) and 'time' not in data):
+            logger.error(f"获取{len(symbols)}只股票的行情面板失败")
+            return None
+        
+        if fields is not None and is_field_layout(data):
+            missing_fields = [field for field in fields if field not in data]
+            if missing_fields:
+                logger.error(f"行情数据缺少字段: {missing_fields}")
+                return None
+        
+        try:
+            return MarketPanel.from_xtdata(data, fields)
+        except Exception as e:
+            logger.error(f"构建行情面板失败: {e}")
+            return None
+    
+    def fetch_many(self, symbols: list, start_date: str, end_date: str, period: str = '1d',
+                   chunk_size: Optional[int] = None, max_workers: Optional[int] = None) -> BatchFetchResult:
+        """分块并发批量获取行情
+        
+        将股票列表切分为若干块，在有界线程池中并发请求，结果合并为一个面板。
+        某一块请求失败时二分重试以定位出错的股票，单只股票失败不影响整批结果。
+        
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+            period: K线周期
+            chunk_size: 每块股票数，默认读取 FETCH_CHUNK_SIZE
+            max_workers: 并发线程数，默认读取 FETCH_MAX_WORKERS
+        
+        Returns:
+            BatchFetchResult，包含合并后的面板和失败股票及原因
+        """
+        if not self._connected:
+            raise ConnectionError("XTQuant未连接")
+        
+        chunk_size = max(1, chunk_size or config.data.fetch_chunk_size)
+        max_workers = max(1, max_workers or config.data.fetch_max_workers)
+        symbols = list(dict.fromkeys(symbols))
+        chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+        
+        logger.info(f"批量获取{len(symbols)}只股票行情: {len(chunks)}块, {max_workers}线程")
+        
+        panels = []
+        failed: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="xt_fetch") as executor:
+            futures = [executor.submit(self._fetch_chunk, chunk, start_date, end_date, period) for chunk in chunks]
+            for future in futures:
+                chunk_panels, chunk_failed = future.result()
+                panels.extend(chunk_panels)
+                failed.update(chunk_failed)
+        
+        panel = concat_panels(panels)
+        if failed:
+            logger.warning(f"批量获取完成，{len(failed)}只股票失败: {list(failed)[:10]}...")
+        return BatchFetchResult(panel=panel, failed=failed)
+    
+    def iter_market_panels(self, symbols: list, start_date: str, end_date: str, period: str = '1m',
+                           window_days: Optional[int] = None) -> Iterator[MarketPanel]:
+        """按日期窗口流式获取行情面板
+        
+        将区间切分为若干互不重叠的日期窗口，逐个窗口批量拉取并产出面板，
+        消费者处理完一个窗口后再拉取下一个，分钟/分笔数据的内存占用与总区间长度无关。
+        
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+            period: 周期，支持 tick/1m/5m/15m/30m/1h/1d
+            window_days: 每个窗口包含的自然日数，默认按周期选择
+        
+        Yields:
+            每个日期窗口的 MarketPanel，布局与日线面板一致
+        """
+        window_days = window_days or DEFAULT_WINDOW_DAYS.get(period, 5)
+        for window_start, window_end in split_date_range(start_date, end_date, window_days):
+            result = self.fetch_many(symbols, window_start, window_end, period)
+            if result.panel is None or len(result.panel) == 0:
+                logger.debug(f"{window_start}-{window_end} 窗口无{period}数据")
+                continue
+            yield result.panel
+    
+    def _fetch_chunk(self, chunk: list, start_date: str, end_date: str, period: str):
+        """获取一块股票的行情面板，失败时二分定位出错的股票"""
+        try:
+            panel = self.get_market_panel(chunk, start_date, end_date, period=period)
+        except Exception as e:
+            logger.debug(f"分块请求异常: {e}")
+            panel = None
+        
+        if panel is None:
+            if len(chunk) == 1:
+                return [], {chunk[0]: "数据请求失败"}
+            mid = len(chunk) // 2
+            head_panels, head_failed = self._fetch_chunk(chunk[:mid], start_date, end_date, period)
+            tail_panels, tail_failed = self._fetch_chunk(chunk[mid:], start_date, end_date, period)
+            return head_panels + tail_panels, {**head_failed, **tail_failed}
+        
+        # 数据源未返回或收盘价全为空的股票视为失败
+        close = panel.field('close')
+        has_data = ~np.isnan(close).all(axis=1) if close.shape[1] > 0 else np.zeros(len(panel.symbols), dtype=bool)
+        returned = set(panel.symbols)
+        failed = {symbol: "数据源未返回该股票" for symbol in chunk if symbol not in returned}
+        failed.update({symbol: "区间内无有效数据" for symbol, ok in zip(panel.symbols, has_data) if not ok})
+        
+        if not has_data.all():
+            panel = panel.select([symbol for symbol, ok in zip(panel.symbols, has_data) if ok])
+        return [panel], failed
+    
     def get_stock_list(self, sector: str = '沪深A股') -> Optional[list]:
         """获取股票列表"""
         if not self._connected:
             raise ConnectionError("XTQuant未连接")
         
         try:
-            return self._xt.get_stock_list_in_sector(sector)
+            return self._load_stock_list(sector)
         except Exception as e:
             logger.error(f"获取股票列表失败: {e}")
             return None
     
+    def _load_stock_list(self, sector: str) -> Optional[list]:
+        """通过缓存获取板块股票列表"""
+        stock_list = self.cache.get_or_load(('sector', sector), lambda: self._xt.get_stock_list_in_sector(sector))
+        return list(stock_list) if stock_list is not None else None
+    
+    def get_instrument_detail(self, symbol: str) -> Optional[Dict]:
+        """获取合约基础信息（名称、涨跌停价、上市日期等）"""
+        if not self._connected:
+            raise ConnectionError("XTQuant未连接")
+        
+        symbol = self.resolve_symbol(symbol)
+        try:
+            detail = self.cache.get_or_load(('detail', symbol), lambda: self._xt.get_instrument_detail(symbol))
+            return dict(detail) if detail is not None else None
+        except Exception as e:
+            logger.error(f"获取{symbol}合约信息失败: {e}")
+            return None
+    
+    def get_trading_calendar(self, symbol: str = '000001.SZ') -> Optional[pd.DatetimeIndex]:
+        """获取股票所在市场的交易日历，获取失败时返回None"""
+        market = symbol.split('.')[-1] if '.' in symbol else 'SZ'
+        
+        def load():
+            dates = self._xt.get_trading_dates(market)
+            if not dates:
+                return None
+            # xtdata 返回UTC毫秒时间戳，转换为北京时间的日期
+            index = pd.to_datetime(np.asarray(dates, dtype=np.int64), unit='ms')
+            return index.tz_localize('UTC').tz_convert('Asia/Shanghai').tz_localize(None).normalize()
+        
+        try:
+            return self.cache.get_or_load(('calendar', market), load)
+        except Exception as e:
+            logger.debug(f"获取{market}交易日历失败，使用数据自身日期: {e}")
+            return None
+    
+    def get_full_tick(self, symbols: list) -> Optional[Dict[str, Dict]]:
+        """获取最新分笔快照 {股票代码: tick字典}"""
+        if not self._connected:
+            raise ConnectionError("XTQuant未连接")
+        
+        try:
+            return self._xt.get_full_tick(symbols)
+        except Exception as e:
+            logger.error(f"获取实时快照失败: {e}")
+            return None
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """行情缓存命中/淘汰统计"""
+        return self.cache.stats()
+    
     def disconnect(self):
         """断开连接"""
         if self._xt:
@@ -232,5 +496,27 @@ class XTQuantClient:
                 pass
         self._connected = False
 
+def split_date_range(start_date: str, end_date: str, window_days: int) -> List[Tuple[str, str]]:
+    """将 [start_date, end_date] 切分为互不重叠的日期窗口"""
+    start = datetime.strptime(start_date[:8], '%Y%m%d')
+    end = datetime.strptime(end_date[:8], '%Y%m%d')
+    step = timedelta(days=max(1, window_days))
+    windows = []
+    while start <= end:
+        window_end = min(start + step - timedelta(days=1), end)
+        windows.append((start.strftime('%Y%m%d'), window_end.strftime('%Y%m%d')))
+        start = window_end + timedelta(days=1)
+    return windows
+
+def _xt_time_range(start_date: str, end_date: str, period: str) -> Tuple[str, str]:
+    """日内周期下将日期补全为时刻，保证结束日当天的数据被包含"""
+    if period == '1d':
+        return start_date, end_date
+    if len(start_date) == 8:
+        start_date += '000000'
+    if len(end_date) == 8:
+        end_date += '235959'
+    return start_date, end_date
+
 # 全局客户端实例
 xt_client = XTQuantClient() 
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+测试公共配置：将仓库根目录加入 sys.path，使测试可直接导入 src 包；
+带 perf 标记的性能基准依赖机器负载，默认跳过，加 --run-perf 运行
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def pytest_addoption(parser):
+    parser.addoption('--run-perf', action='store_true', default=False, help='运行带 perf 标记的性能基准')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'perf: 按墙钟时间断言的性能基准，默认跳过')
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-perf'):
+        return
+    skip = pytest.mark.skip(reason='性能基准，加 --run-perf 运行')
+    for item in items:
+        if 'perf' in item.keywords:
+            item.add_marker(skip)
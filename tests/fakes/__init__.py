@@ -0,0 +1,3 @@
+"""
+测试替身，按所模拟的 xtquant 模块分文件
+"""
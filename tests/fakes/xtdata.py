@@ -0,0 +1,102 @@
+"""
+xtdata 替身：行情订阅/推送、快照与K线接口，不依赖 QMT 客户端
+"""
+
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+class FakeQuoteSource:
+    """xtdata 行情源替身：记录订阅与快照查询，并可按指定速率推送合成行情
+
+    Args:
+        prices: 快照查询 get_full_tick 返回的最新价 {股票代码: 价格}
+    """
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None):
+        self.prices = dict(prices or {})
+        self.subscriptions: Dict[int, Any] = {}     # seq -> (股票列表, 回调)
+        self.snapshot_calls: List[List[str]] = []
+        self._seqs = itertools.count(1)
+
+    def subscribe_whole_quote(self, code_list: Sequence[str], callback: Callable = None) -> int:
+        seq = next(self._seqs)
+        self.subscriptions[seq] = (list(code_list), callback)
+        return seq
+
+    def unsubscribe_quote(self, seq: int):
+        self.subscriptions.pop(seq, None)
+
+    def subscribed_symbols(self) -> List[str]:
+        return [symbol for codes, _ in self.subscriptions.values() for symbol in codes]
+
+    def get_full_tick(self, code_list: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        self.snapshot_calls.append(list(code_list))
+        return {symbol: {'lastPrice': self.prices[symbol], 'time': 0, 'volume': 0.0}
+                for symbol in code_list if symbol in self.prices}
+
+    def publish(self, n: int, rate: float) -> float:
+        """以每秒 rate 条的速率推送 n 条单股票行情，返回实际推送速率
+
+        每毫秒推送一批，批间 sleep 让出 GIL，模拟 xtdata 回调线程
+        """
+        callbacks = [callback for _, callback in self.subscriptions.values()]
+        symbols = self.subscribed_symbols()
+        per_batch = max(1, int(rate // 1000))
+        t0 = time.perf_counter()
+        sent = 0
+        while sent < n:
+            for _ in range(min(per_batch, n - sent)):
+                symbol = symbols[sent % len(symbols)]
+                datas = {symbol: {'lastPrice': 10.0 + (sent % 100) * 0.01, 'time': sent, 'volume': float(sent)}}
+                for callback in callbacks:
+                    callback(datas)
+                sent += 1
+            delay = t0 + sent / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return n / (time.perf_counter() - t0)
+
+class FakeXtData:
+    """xtdata K线接口替身：工作日日线随机游走，记录每次 get_market_data 调用
+
+    Args:
+        symbols: 股票代码列表
+        suspended: {股票代码: (开始日期, 结束日期)}，区间内没有K线
+    """
+
+    def __init__(self, symbols: Sequence[str] = ('000001.SZ', '600000.SH'),
+                 suspended: Optional[Dict[str, Any]] = None, start: str = '20200101', end: str = '20251231',
+                 seed: int = 0):
+        self.symbols = list(symbols)
+        self.days = pd.bdate_range(start, end)
+        rng = np.random.default_rng(seed)
+        self.close = {symbol: np.round(10.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, len(self.days)))), 2)
+                      for symbol in self.symbols}
+        self.suspended = {symbol: (pd.Timestamp(lo), pd.Timestamp(hi))
+                          for symbol, (lo, hi) in (suspended or {}).items()}
+        self.calls: List[Any] = []
+
+    def get_stock_list_in_sector(self, sector: str) -> List[str]:
+        return list(self.symbols)
+
+    def get_market_data(self, field_list=(), stock_list=(), period='1d', start_time='', end_time='', count=-1,
+                        dividend_type='none', fill_data=True) -> Dict[str, Any]:
+        self.calls.append((tuple(stock_list), period, start_time, end_time))
+        lo, hi = pd.Timestamp(start_time[:8]), pd.Timestamp(end_time[:8])
+        mask = (self.days >= lo) & (self.days <= hi)
+        symbols = [symbol for symbol in stock_list if symbol in self.close]
+        for symbol in symbols:
+            if symbol in self.suspended:
+                s_lo, s_hi = self.suspended[symbol]
+                mask &= ~((self.days >= s_lo) & (self.days <= s_hi))
+        days = self.days[mask]
+        columns = [day.strftime('%Y%m%d') for day in days]
+        close = np.array([self.close[symbol][mask] for symbol in symbols]).reshape(len(symbols), len(days))
+        times = np.tile(days.asi8 // 10 ** 6, (len(symbols), 1))
+        frames = {'time': times, 'open': close * 0.99, 'high': close * 1.01, 'low': close * 0.98, 'close': close,
+                  'volume': np.full_like(close, 1e6), 'amount': close * 1e6, 'preClose': close}
+        return {field: pd.DataFrame(values, index=symbols, columns=columns) for field, values in frames.items()}
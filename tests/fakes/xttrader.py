@@ -0,0 +1,114 @@
+"""
+xttrader 替身：XtQuantTrader 下单、查询接口与柜台回报对象，不依赖 QMT 客户端
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, List, Sequence
+
+# xtconstant 中下单用到的常量
+FAKE_XTCONSTANT = SimpleNamespace(STOCK_BUY=23, STOCK_SELL=24, FIX_PRICE=11)
+
+class FakeTrader:
+    """XtQuantTrader 下单接口替身
+
+    同步下单每笔耗时 latency 秒；异步下单立即返回 seq，latency 秒后由单个回调线程按序送达回报，
+    与真实客户端的回调线程模型一致
+
+    Args:
+        latency: 柜台往返耗时（秒）
+        reject: 被柜台拒绝的股票代码，先推送 on_order_error（只带下单备注），再推送订单号为 -1 的回报
+        drop: 不返回任何回报的股票代码
+    """
+
+    def __init__(self, latency: float = 0.02, reject: Sequence[str] = (), drop: Sequence[str] = ()):
+        self.latency = latency
+        self.reject = set(reject)
+        self.drop = set(drop)
+        self.callback = None
+        self._connected = True
+        self.sync_calls = 0
+        self.async_calls = 0
+        self._seqs = itertools.count(1)
+        self._order_ids = itertools.count(1000)
+        self._callback_thread = ThreadPoolExecutor(1)
+        self._timers: List[threading.Timer] = []
+        # 柜台当前状态，供交易账本建立与对账时查询
+        self.asset = SimpleNamespace(cash=1e6, frozen_cash=0.0, market_value=0.0, total_asset=1e6)
+        self.positions: List[Any] = []
+        self.orders: List[Any] = []
+        self.trades: List[Any] = []
+
+    def register_callback(self, callback):
+        self.callback = callback
+
+    def start(self):
+        pass
+
+    def connect(self) -> int:
+        return 0
+
+    def subscribe(self, account) -> int:
+        return 0
+
+    def order_stock(self, account, stock_code, order_type, order_volume, price_type, price,
+                    strategy_name='', order_remark='') -> int:
+        time.sleep(self.latency)
+        self.sync_calls += 1
+        return -1 if stock_code in self.reject else next(self._order_ids)
+
+    def order_stock_async(self, account, stock_code, order_type, order_volume, price_type, price,
+                          strategy_name='', order_remark='') -> int:
+        seq = next(self._seqs)
+        self.async_calls += 1
+        if stock_code not in self.drop:
+            timer = threading.Timer(self.latency, self._callback_thread.submit,
+                                    args=(self._respond, stock_code, seq, order_remark))
+            timer.daemon = True
+            timer.start()
+            self._timers.append(timer)
+        return seq
+
+    def query_stock_asset(self, account):
+        return self.asset
+
+    def query_stock_positions(self, account) -> List[Any]:
+        return list(self.positions)
+
+    def query_stock_orders(self, account, cancelable_only: bool = False) -> List[Any]:
+        return list(self.orders)
+
+    def query_stock_trades(self, account) -> List[Any]:
+        return list(self.trades)
+
+    def shutdown(self):
+        """取消尚未送达的回报，等待回调线程结束"""
+        for timer in self._timers:
+            timer.cancel()
+        self._callback_thread.shutdown(wait=True)
+
+    def _respond(self, stock_code: str, seq: int, order_remark: str):
+        if stock_code in self.reject:
+            self.callback.on_order_error(SimpleNamespace(order_id=-1, error_id=-61, error_msg='可用资金不足',
+                                                         order_remark=order_remark))
+            self.callback.on_order_stock_async_response(SimpleNamespace(seq=seq, order_id=-1, error_msg=''))
+        else:
+            self.callback.on_order_stock_async_response(
+                SimpleNamespace(seq=seq, order_id=next(self._order_ids), error_msg=''))
+
+def fake_position(stock_code: str, volume: int, avg_price: float, last_price: float) -> SimpleNamespace:
+    """XtPosition 替身"""
+    return SimpleNamespace(stock_code=stock_code, volume=volume, can_use_volume=volume, frozen_volume=0,
+                           on_road_volume=0, yesterday_volume=volume, open_price=avg_price, avg_price=avg_price,
+                           market_value=volume * last_price)
+
+def fake_order(order_id: int, stock_code: str, volume: int, price: float, order_type: int = 23,
+               order_status: int = 50, traded_volume: int = 0) -> SimpleNamespace:
+    """XtOrder 替身，默认为未成交的买单"""
+    return SimpleNamespace(order_id=order_id, order_sysid='', stock_code=stock_code, order_type=order_type,
+                           order_volume=volume, price_type=11, price=price, traded_volume=traded_volume,
+                           traded_price=price if traded_volume else 0.0, order_status=order_status, status_msg='',
+                           order_time=0, strategy_name='', order_remark='')
@@ -0,0 +1,83 @@
+"""
+事件驱动回测引擎测试：成交K线与成交价、佣金、整手、T+1顺延卖出，以及信号转回多头时取消顺延的卖出
+"""
+
+import numpy as np
+import pytest
+
+from src.strategies.backtest_engine import BacktestEngine
+
+RATE, SLIP = 0.001, 0.01
+
+@pytest.fixture
+def engine():
+    return BacktestEngine(capital=100000.0, commission_rate=RATE, slippage=SLIP, max_position_ratio=1.0,
+                          lot_size=100, t_plus_one=True)
+
+def test_fill_on_next_bar_with_slippage_commission_and_lots(engine):
+    close = np.array([10.0, 10.2, 11.0, 12.0, 12.5, 12.0])
+    open_ = close - 0.1
+    signal = np.array([1, 1, 1, 0, 0, 0])
+    result = engine.run(close, signal, fill_price=open_)
+    buy, sell = result.trades
+
+    # 第0根K线的信号在第1根K线按开盘价成交，买入价上浮滑点
+    assert buy['bar'] == 1 and buy['side'] == 1
+    assert buy['price'] == pytest.approx(10.1 * (1 + SLIP))
+    # 资金按含佣金的价格折算后向下取整到100股
+    shares = int(100000.0 / (buy['price'] * (1 + RATE)) / 100) * 100
+    assert buy['volume'] == shares == 9700
+    assert buy['commission'] == pytest.approx(buy['price'] * shares * RATE)
+
+    # 第3根K线转为空仓，第4根K线按开盘价成交，卖出价下浮滑点
+    assert sell['bar'] == 4 and sell['side'] == -1 and sell['volume'] == shares
+    assert sell['price'] == pytest.approx(12.4 * (1 - SLIP))
+    assert sell['commission'] == pytest.approx(sell['price'] * shares * RATE)
+    cost = buy['price'] * shares + buy['commission']
+    assert sell['pnl'] == pytest.approx(sell['price'] * shares - sell['commission'] - cost)
+
+    np.testing.assert_array_equal(result.position, [0, shares, shares, shares, 0, 0])
+    cash = 100000.0 - cost
+    assert result.equity[2] == pytest.approx(cash + shares * close[2])
+    assert result.equity[-1] == pytest.approx(cash + sell['price'] * shares - sell['commission'])
+    assert result.metrics['total_commission'] == pytest.approx(buy['commission'] + sell['commission'])
+    assert result.metrics['round_trips'] == 1 and result.metrics['win_rate'] == 1.0
+
+def test_insufficient_cash_for_one_lot_skips_buy(engine):
+    engine.capital = 900.0
+    result = engine.run(np.full(4, 10.0), np.array([1, 1, 0, 0]))
+    assert len(result.trades) == 0
+    np.testing.assert_allclose(result.equity, 900.0)
+
+def test_same_day_sell_is_deferred_to_next_day(engine):
+    close = np.array([10.0, 10.0, 10.5, 11.0, 11.5])
+    days = np.array([0, 0, 0, 1, 1])
+    signal = np.array([1, 0, 0, 0, 0])
+    result = engine.run(close, signal, days=days)
+    buy, sell = result.trades
+
+    # 第1根K线买入，第2根K线同日卖出被T+1阻止，顺延到下一交易日首根K线（第3根）
+    assert (buy['bar'], sell['bar']) == (1, 3)
+    assert sell['price'] == pytest.approx(11.0 * (1 - SLIP))
+    np.testing.assert_array_equal(result.position, [0, buy['volume'], buy['volume'], 0, 0])
+
+def test_same_day_sell_allowed_without_t_plus_one(engine):
+    engine.t_plus_one = False
+    result = engine.run(np.array([10.0, 10.0, 10.5, 11.0]), np.array([1, 0, 0, 0]), days=np.array([0, 0, 0, 1]))
+    assert result.trades['bar'].tolist() == [1, 2]
+
+def test_rebuy_before_deferred_sell_keeps_position(engine):
+    close = np.array([10.0, 10.0, 10.5, 10.2, 11.0, 11.5])
+    days = np.array([0, 0, 0, 0, 1, 1])
+    signal = np.array([1, 0, 1, 1, 1, 1])
+    result = engine.run(close, signal, days=days)
+
+    # 第2根K线的卖出顺延到第4根K线，但第3根K线信号已转回多头：取消卖出，原持仓继续持有
+    assert len(result.trades) == 1 and result.trades[0]['bar'] == 1
+    volume = result.trades[0]['volume']
+    np.testing.assert_array_equal(result.position, [0] + [volume] * 5)
+
+def test_deferred_sell_past_last_bar_is_dropped(engine):
+    result = engine.run(np.array([10.0, 10.0, 10.5]), np.array([1, 0, 0]), days=np.array([0, 0, 0]))
+    assert result.trades['side'].tolist() == [1]
+    assert result.position[-1] == result.trades[0]['volume']
@@ -0,0 +1,66 @@
+"""
+本地K线缓存测试：以 xtdata 替身的调用次数验证只补取缺失区间，停牌区间同样记录为已覆盖
+"""
+
+import pandas as pd
+import pytest
+
+from src.utils.bar_cache import BarCache
+from src.utils.xtquant_client import XTQuantClient
+from tests.fakes.xtdata import FakeXtData
+
+@pytest.fixture
+def fake():
+    return FakeXtData(suspended={'600000.SH': ('20230301', '20230630')})
+
+@pytest.fixture
+def client(tmp_path, fake):
+    client = XTQuantClient()
+    client.bar_cache = BarCache(str(tmp_path))
+    client._xt = fake
+    client._connected = True
+    return client
+
+def _request(client, symbol, start, end):
+    """清空内存缓存后请求，使每次都经过本地K线缓存"""
+    client.cache.invalidate()
+    return client.get_market_data(symbol, start, end)
+
+def test_repeated_request_is_served_from_disk(client, fake):
+    first = _request(client, '000001.SZ', '20230101', '20231231')
+    assert len(fake.calls) == 1
+    second = _request(client, '000001.SZ', '20230301', '20231130')
+    assert len(fake.calls) == 1
+    pd.testing.assert_frame_equal(second, first.loc['20230301':'20231130'], check_freq=False)
+
+def test_only_missing_tail_is_fetched(client, fake):
+    _request(client, '000001.SZ', '20230101', '20230630')
+    data = _request(client, '000001.SZ', '20230101', '20231231')
+    assert [call[2:] for call in fake.calls] == [('20230101', '20230630'), ('20230630', '20231231')]
+    assert data.index.is_unique and data.index.is_monotonic_increasing
+    assert data.index[-1] == pd.Timestamp('20231229')
+
+def test_empty_gap_fetch_records_coverage(client, fake):
+    # 整个请求区间都在停牌期内：第一次拉取返回空，之后不再重复拉取
+    assert _request(client, '600000.SH', '20230401', '20230531') is None
+    assert _request(client, '600000.SH', '20230401', '20230531') is None
+    assert len(fake.calls) == 1
+    assert client.bar_cache.missing_ranges('600000.SH', '1d', '20230401', '20230531') == []
+
+    # 扩大区间后只补取两端，停牌期内没有K线
+    data = _request(client, '600000.SH', '20230101', '20231231')
+    assert len(fake.calls) == 3
+    assert data.loc['20230301':'20230630'].empty
+    assert len(data) == len(fake.get_market_data(stock_list=['600000.SH'], start_time='20230101',
+                                                 end_time='20231231')['close'].columns)
+
+def test_failed_fetch_does_not_record_coverage(client, fake, monkeypatch):
+    def fail(**kwargs):
+        fake.calls.append(kwargs)
+        raise RuntimeError("连接中断")
+
+    monkeypatch.setattr(fake, 'get_market_data', fail)
+    assert _request(client, '000001.SZ', '20230101', '20230331') is None
+    monkeypatch.undo()
+    assert len(_request(client, '000001.SZ', '20230101', '20230331')) > 0
+    assert len(fake.calls) == 2
@@ -0,0 +1,52 @@
+"""
+股票池批量回测测试：单只股票失败不影响其他股票、多进程与单进程结果一致，以及股票数的线性扩展（perf）
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from src.strategies.batch_backtest import BatchBacktester
+from src.strategies.ma_strategy import MABacktestKernel
+
+def _universe(n_symbols: int, n_bars: int = 500, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_symbols, n_bars)), axis=1)), 2)
+    return [f'{i:06d}.SZ' for i in range(n_symbols)], closes
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_bad_symbols_are_isolated(max_workers):
+    symbols, closes = _universe(40)
+    closes[3, :] = np.nan            # 没有任何数据
+    closes[17, 15:] = np.nan         # 数据长度不足长期均线周期
+    closes[25, :200] = np.nan        # 上市较晚，去掉缺失后正常回测
+    results = BatchBacktester(5, 20, max_workers=max_workers, batch_size=8).backtest_closes(symbols, closes)
+
+    assert list(results.index) == symbols
+    failed = results.index[results['error'].notna()].tolist()
+    assert failed == [symbols[3], symbols[17]]
+    assert '不足长期均线周期' in results.loc[symbols[17], 'error']
+
+    kernel = MABacktestKernel()
+    for i in (0, 25, 39):
+        close = closes[i][~np.isnan(closes[i])]
+        expected = kernel.run(close, 5, 20)
+        assert results.loc[symbols[i], 'final_return'] == pytest.approx(expected['final_return'], rel=1e-12)
+        assert results.loc[symbols[i], 'total_trades'] == expected['total_trades']
+
+@pytest.mark.perf
+def test_scales_linearly_with_universe_size():
+    """5000只股票的耗时不超过1000只的7倍（进程池启动等固定开销按比例摊薄）"""
+    symbols, closes = _universe(5000)
+    backtester = BatchBacktester(5, 20, max_workers=2, batch_size=250)
+
+    def elapsed(n):
+        t0 = time.perf_counter()
+        results = backtester.backtest_closes(symbols[:n], closes[:n])
+        assert results['error'].isna().all()
+        return time.perf_counter() - t0
+
+    elapsed(1000)   # 预热
+    small, large = elapsed(1000), elapsed(5000)
+    assert large < small * 7, f"1000只 {small:.2f}s, 5000只 {large:.2f}s"
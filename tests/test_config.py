@@ -0,0 +1,56 @@
+"""
+配置加载测试：config.json 与环境变量的优先级
+"""
+
+import dataclasses
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.config import Config, RiskControlConfig, StrategyConfig, TradingConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _load_config(tmp_path, file_config, env):
+    """在子进程中按给定的环境变量与配置文件导入配置（字段默认值在导入时读取环境变量）"""
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(file_config), encoding='utf-8')
+    script = ("import json\n"
+              "from src.config import config\n"
+              "print(json.dumps({'trading': vars(config.trading), 'risk': vars(config.risk),"
+              " 'screening': vars(config.screening)}))")
+    base = {key: value for key, value in os.environ.items()
+            if key not in ('COMMISSION_RATE', 'SLIPPAGE', 'MAX_LEVERAGE', 'STOP_LOSS_RATIO')}
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True,
+                            env={**base, 'QUANTMCP_CONFIG': str(path), **env}, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+FILE_CONFIG = {
+    'trading_config': {'commission_rate': 0.001, 'slippage': 0.002},
+    'risk_control': {'max_leverage': 2.0, 'stop_loss_ratio': 0.2},
+    'screening_config': {'cache_timeout': 60},
+}
+
+def test_file_values_apply_without_env(tmp_path):
+    values, _ = _load_config(tmp_path, FILE_CONFIG, {})
+    assert values['trading']['commission_rate'] == 0.001
+    assert values['trading']['slippage'] == 0.002
+    assert values['risk']['max_leverage'] == 2.0
+    assert values['screening']['cache_timeout'] == 60
+
+def test_explicit_env_wins_over_file(tmp_path):
+    values, _ = _load_config(tmp_path, FILE_CONFIG, {'COMMISSION_RATE': '0.0005', 'MAX_LEVERAGE': '1.5'})
+    assert values['trading']['commission_rate'] == 0.0005
+    assert values['risk']['max_leverage'] == 1.5
+    # 未设置环境变量的字段仍取文件值
+    assert values['trading']['slippage'] == 0.002
+    assert values['risk']['stop_loss_ratio'] == 0.2
+
+@pytest.mark.parametrize('attr,cls', [('strategy', StrategyConfig), ('trading', TradingConfig),
+                                      ('risk', RiskControlConfig)])
+def test_env_var_mapping_names_existing_fields(attr, cls):
+    assert set(Config.ENV_VARS[attr]) <= {field.name for field in dataclasses.fields(cls)}
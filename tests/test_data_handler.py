@@ -0,0 +1,52 @@
+"""
+紧凑行情表示测试：交易日偏移编码、还原，以及日期不在交易日历内时的回退
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.bar_cache import BarCache
+from src.utils.data_handler import DataHandler
+from src.utils.xtquant_client import XTQuantClient
+from tests.fakes.xtdata import FakeXtData
+
+def _minute_bars(days) -> pd.DataFrame:
+    index = pd.DatetimeIndex([day + pd.Timedelta(hours=9, minutes=30 + m) for day in days for m in range(1, 4)],
+                             name='time')
+    close = np.linspace(10.0, 11.0, len(index))
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close,
+                         'volume': np.full(len(index), 1200.0), 'amount': np.round(close * 1200.0, -3)}, index=index)
+
+def test_offsets_follow_calendar():
+    calendar = pd.bdate_range('2024-01-01', '2024-01-31')
+    data = _minute_bars(calendar[[2, 3, 7]])
+    compact = DataHandler.compact_market_data(data, '000001.SZ', calendar)
+    assert compact['day'].unique().tolist() == [2, 3, 7]
+    assert compact['second'].iloc[0] == (9 * 60 + 31) * 60
+    pd.testing.assert_frame_equal(DataHandler.expand_market_data(compact), data, check_dtype=False, rtol=1e-6)
+
+def test_dates_missing_from_calendar_fall_back_to_data_days():
+    calendar = pd.bdate_range('2024-01-01', '2024-01-31')
+    days = calendar[[2, 3, 7]].append(pd.DatetimeIndex(['2024-01-13']))   # 周六补班，不在日历内
+    data = _minute_bars(days)
+    compact = DataHandler.compact_market_data(data, '000001.SZ', calendar)
+    assert compact['day'].unique().tolist() == [0, 1, 2, 3]
+    assert compact.attrs['compact']['calendar'].equals(pd.DatetimeIndex(days))
+    pd.testing.assert_frame_equal(DataHandler.expand_market_data(compact), data, check_dtype=False, rtol=1e-6)
+
+def test_get_market_data_compact_with_stale_calendar(tmp_path, monkeypatch):
+    client = XTQuantClient()
+    client.bar_cache = BarCache(str(tmp_path))
+    client._xt = FakeXtData()
+    client._connected = True
+    data = client.get_market_data('000001.SZ', '20240101', '20240331')
+    # 交易日历缺少区间内的部分日期
+    monkeypatch.setattr(client, 'get_trading_calendar', lambda symbol='000001.SZ': data.index[::2])
+
+    client.cache.invalidate()
+    compact = client.get_market_data('000001.SZ', '20240101', '20240331', compact=True)
+    assert len(compact) == len(data)
+    assert (np.diff(compact['day'].to_numpy()) == 1).all()
+    pd.testing.assert_frame_equal(DataHandler.expand_market_data(compact), data, check_dtype=False,
+                                  check_freq=False, rtol=1e-6)
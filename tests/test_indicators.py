@@ -0,0 +1,105 @@
+"""
+技术指标测试：含停牌缺失的面板与 pandas ewm(adjust=False) 逐行对比，以及指标缓存增量扩展
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import indicators as ind
+from src.utils.indicator_cache import IndicatorCache
+
+def _gapped_panel(n_symbols: int = 6, n_bars: int = 300, seed: int = 7) -> np.ndarray:
+    """随机游走收盘价面板：开头未上市、中间不同长度的停牌、末尾退市"""
+    rng = np.random.default_rng(seed)
+    close = 10.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, (n_symbols, n_bars)), axis=1))
+    close[1, :25] = np.nan
+    close[2, 40] = np.nan
+    close[2, 100:110] = np.nan
+    close[3, 5:7] = np.nan
+    close[3, 250:] = np.nan
+    close[4, rng.choice(n_bars, 30, replace=False)] = np.nan
+    return close
+
+@pytest.fixture(params=[True, False], ids=['scipy', 'numpy'])
+def filter_backend(request, monkeypatch):
+    if request.param and not ind.SCIPY_AVAILABLE:
+        pytest.skip("scipy 未安装")
+    monkeypatch.setattr(ind, 'SCIPY_AVAILABLE', request.param)
+
+def test_ema_interior_gap_matches_pandas(filter_backend):
+    values = [1.0, 2.0, np.nan, 3.0, 4.0, 5.0]
+    np.testing.assert_allclose(ind.ema(values, 3), [1.0, 1.5, 1.5, 2.625, 3.3125, 4.15625])
+    np.testing.assert_allclose(ind.ema(values, 5), pd.Series(values).ewm(span=5, adjust=False).mean())
+
+@pytest.mark.parametrize('span', [2, 3, 12, 26])
+def test_ema_panel_with_gaps_matches_pandas(filter_backend, span):
+    close = _gapped_panel()
+    expected = pd.DataFrame(close.T).ewm(span=span, adjust=False).mean().to_numpy().T
+    np.testing.assert_allclose(ind.ema(close, span), expected, rtol=1e-12, atol=1e-12)
+
+def test_macd_panel_with_gaps_matches_pandas(filter_backend):
+    close = _gapped_panel()
+    frame = pd.DataFrame(close.T)
+    dif = frame.ewm(span=12, adjust=False).mean() - frame.ewm(span=26, adjust=False).mean()
+    dea = dif.ewm(span=9, adjust=False).mean()
+    result = ind.macd(close)
+    np.testing.assert_allclose(result[0], dif.to_numpy().T, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(result[1], dea.to_numpy().T, rtol=1e-12, atol=1e-12)
+
+@pytest.mark.parametrize('period', [2, 14])
+def test_wilder_smooth_with_gaps_matches_pandas(filter_backend, period):
+    gain = np.abs(np.diff(_gapped_panel(), axis=1))
+    result = ind.wilder_smooth(gain, period)
+    for row, values in enumerate(gain):
+        start = np.flatnonzero(~np.isnan(values))[0]
+        seed = np.nanmean(values[start:start + period])
+        expected = pd.Series(np.r_[seed, values[start + period:]]).ewm(alpha=1.0 / period, adjust=False).mean()
+        assert np.isnan(result[row, :start + period - 1]).all()
+        np.testing.assert_allclose(result[row, start + period - 1:], expected, rtol=1e-12, atol=1e-12)
+
+def test_rsi_and_atr_recover_after_gap():
+    close = _gapped_panel()
+    rsi = ind.rsi(close)
+    atr = ind.atr(close * 1.01, close * 0.99, close)
+    assert np.isfinite(rsi[2, 120:]).all()
+    assert np.isfinite(atr[2, 120:]).all()
+    assert np.isfinite(rsi[4, -50:]).all()
+
+@pytest.mark.parametrize('name,params', [('ema', {'span': 12}), ('macd', {}), ('rsi', {'window': 14}),
+                                         ('atr', {'window': 14})])
+@pytest.mark.parametrize('split', [150, 105, 111])   # 105：停牌中截断，111：停牌后首根K线之后截断
+def test_indicator_cache_extension_across_gaps(name, params, split):
+    close = _gapped_panel()[2]
+    data = pd.DataFrame({'close': close, 'high': close * 1.01, 'low': close * 0.99},
+                        index=pd.date_range('2024-01-01', periods=len(close), freq='min'))
+    cache = IndicatorCache()
+    cache.get(data.iloc[:split], name, '600000.SH', '1m', **params)
+    extended = cache.get(data, name, '600000.SH', '1m', **params)
+    full = IndicatorCache().get(data, name, '600000.SH', '1m', **params)
+    for got, expected in zip(np.atleast_2d(extended), np.atleast_2d(full)):
+        np.testing.assert_allclose(got, expected, rtol=1e-10, atol=1e-10)
+
+def test_prefix_fingerprints_single_pass(monkeypatch):
+    from src.utils import indicator_cache as ic
+
+    close = _gapped_panel()[0]
+    data = pd.DataFrame({'close': close}, index=pd.date_range('2024-01-01', periods=len(close), freq='min'))
+    index, arrays = ic._index_values(data.index), [close]
+    assert ic._fingerprints(index, arrays, (200, 300)) == (ic._fingerprint(index, arrays, 200),
+                                                           ic._fingerprint(index, arrays, 300))
+
+    calls = []
+    original = ic._fingerprints
+    monkeypatch.setattr(ic, '_fingerprints', lambda *args: calls.append(args[2]) or original(*args))
+    cache = IndicatorCache()
+    cache.get(data.iloc[:200], 'ema', '600000.SH', '1m', span=12)
+    cache.get(data, 'ema', '600000.SH', '1m', span=12)
+    assert calls == [(200,), (200, 300)]   # 扩展时前缀与全量指纹同一遍得到
+    assert cache.stats()['incremental_extends'] == 1
+
+    # 前缀被改写（如复权）时不得沿用旧状态
+    revised = data.copy()
+    revised.iloc[50, 0] *= 1.1
+    cache.get(revised.iloc[:250], 'ema', '600000.SH', '1m', span=12)
+    assert cache.stats()['incremental_extends'] == 1
@@ -0,0 +1,52 @@
+"""
+双均线增量状态测试：逐K线 update / 向量化 update_many 的信号与交叉事件和 MAStrategy.calculate_signals 完全一致
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies.ma_state import MAState
+from src.strategies.ma_strategy import MAStrategy
+
+SYMBOLS = ['000001.SZ', '600000.SH', '510300.SH', '300750.SZ']
+
+def _closes(n_bars: int = 2000, seed: int = 7) -> np.ndarray:
+    """(symbol, time) 随机游走收盘价，价格在 0.01 价位上；ETF 一行在 0.001 价位上"""
+    rng = np.random.default_rng(seed)
+    closes = np.round(20 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(SYMBOLS), n_bars)), axis=1)), 2)
+    closes[2] = np.round(closes[2] / 7, 3)
+    # 横盘区间制造均线恰好相等
+    closes[1, 500:600] = closes[1, 499]
+    return closes
+
+@pytest.mark.parametrize('short_period,long_period', [(5, 20), (3, 10), (10, 60)])
+def test_matches_batch_signals(short_period, long_period):
+    closes = _closes()
+    strategy = MAStrategy(short_period, long_period)
+    expected = [strategy.calculate_signals(pd.DataFrame({'close': row})) for row in closes]
+
+    single = MAState(SYMBOLS, short_period, long_period)
+    vector = MAState(SYMBOLS, short_period, long_period)
+    signals = np.zeros(closes.shape, dtype=np.int8)
+    changes = np.zeros(closes.shape, dtype=np.int8)
+    for t in range(closes.shape[1]):
+        changes[:, t] = vector.update_many(closes[:, t])
+        signals[:, t] = vector.signals()
+        for i, symbol in enumerate(SYMBOLS):
+            assert single.update(symbol, closes[i, t]) == changes[i, t]
+
+    for i, frame in enumerate(expected):
+        np.testing.assert_array_equal(signals[i], frame['signal'].to_numpy(), err_msg=SYMBOLS[i])
+        np.testing.assert_array_equal(changes[i, 1:], frame['signal_change'].to_numpy()[1:], err_msg=SYMBOLS[i])
+    assert (signals == 0)[1, 500 + long_period:600].all()
+
+def test_from_history_skips_missing_bars():
+    closes = _closes(500)
+    closes[0, 100:150] = np.nan      # 停牌
+    state = MAState.from_history(SYMBOLS, closes)
+    expected = MAStrategy().calculate_signals(pd.DataFrame({'close': closes[0][~np.isnan(closes[0])]}))
+    assert state.signal(SYMBOLS[0]) == expected['signal'].iloc[-1]
+    ma_short, ma_long = state.moving_averages(SYMBOLS[0])
+    assert ma_short == pytest.approx(expected['ma_short'].iloc[-1])
+    assert ma_long == pytest.approx(expected['ma_long'].iloc[-1])
@@ -0,0 +1,119 @@
+"""
+双均线策略测试：NumPy 内核与 DataFrame 路径的指标一致性及耗时（perf），
+以及均线相等（TIE_TOLERANCE）口径：DataFrame 路径、NumPy 内核与流式回测在均线恰好相等时都应给出信号0
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies import ma_strategy as ma_module
+from src.strategies.ma_strategy import MABacktestKernel, MAStrategy, TIE_TOLERANCE
+from src.strategies.streaming_backtest import StreamingMABacktester
+
+SHORT, LONG = 2, 4
+
+def _closes() -> np.ndarray:
+    """随机游走后接两段均线恰好相等的行情：周期为2的振荡（两条均线都等于振荡中值）与长时间横盘"""
+    rng = np.random.default_rng(0)
+    return np.concatenate([
+        10 + np.cumsum(rng.normal(0, 0.05, 60)),
+        np.tile([10.1, 10.3], 40),        # 下标 60-139
+        np.linspace(10.3, 11.0, 30),
+        np.full(40, 10.7),                # 下标 170-209
+        np.linspace(10.7, 10.0, 30),
+    ])
+
+# 长均线窗口完全落在相等区间内的K线
+TIES = np.r_[60 + LONG - 1:140, 170 + LONG - 1:210]
+
+@pytest.fixture
+def close():
+    return _closes()
+
+def test_tie_signal_is_zero_on_every_path(close):
+    strategy = MAStrategy(SHORT, LONG)
+    frame_signal = strategy.calculate_signals(pd.DataFrame({'close': close}))['signal'].to_numpy()
+    kernel_signal = MABacktestKernel().signals(close, SHORT, LONG)
+
+    assert not frame_signal[TIES].any()
+    np.testing.assert_array_equal(frame_signal, kernel_signal)
+    # 相等区间之外仍有方向信号
+    assert (frame_signal == 1).any() and (frame_signal == -1).any()
+
+def test_tolerance_scales_with_price(close):
+    """容差为 TIE_TOLERANCE x 最大收盘价：差值略大于容差时给出方向，略小时视为相等"""
+    scaled = close * 1000.0
+    signal = MABacktestKernel().signals(scaled, SHORT, LONG)
+    assert not signal[TIES].any()
+
+    tol = TIE_TOLERANCE * scaled.max()
+    bumped = scaled.copy()
+    bumped[100] += 4 * tol * 2.0          # 短均线比长均线高 (1/2-1/4) x 8tol = 2tol
+    assert MABacktestKernel().signals(bumped, SHORT, LONG)[100] == 1
+    bumped[100] = scaled[100] + 2 * tol   # 差值 0.5tol，仍视为相等
+    assert MABacktestKernel().signals(bumped, SHORT, LONG)[100] == 0
+
+def test_backtest_paths_agree_on_ties(close):
+    strategy = MAStrategy(SHORT, LONG)
+    frame = strategy.backtest(pd.DataFrame({'close': close}), with_data=True)['metrics']
+    kernel = strategy.backtest(pd.DataFrame({'close': close}), with_data=False)['metrics']
+
+    streaming = StreamingMABacktester(['600000.SH'], SHORT, LONG, period='1d')
+    for chunk in np.array_split(close, 7):
+        streaming.feed_closes(chunk[None, :])
+    stream = streaming.results().loc['600000.SH']
+
+    for metrics in (kernel, stream):
+        assert metrics['total_trades'] == frame['total_trades']
+        assert metrics['final_return'] == pytest.approx(frame['final_return'], rel=1e-12)
+        assert metrics['turnover'] == pytest.approx(frame['turnover'], rel=1e-12)
+
+def test_without_tolerance_rounding_breaks_ties(close, monkeypatch):
+    """去掉容差后均线的舍入误差会让相等区间落到某个方向，且两条路径不一致，说明上面的断言依赖该容差"""
+    monkeypatch.setattr(ma_module, 'TIE_TOLERANCE', 0.0)
+    frame_signal = MAStrategy(SHORT, LONG).calculate_signals(pd.DataFrame({'close': close}))['signal'].to_numpy()
+    kernel_signal = MABacktestKernel().signals(close, SHORT, LONG)
+    assert frame_signal[TIES].any() or kernel_signal[TIES].any()
+    assert (frame_signal != kernel_signal).any()
+
+def _random_walk(n_bars: int, period: str, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars))), 2)
+    freq = 'B' if period == '1d' else 'min'
+    return pd.DataFrame({'close': close}, index=pd.date_range('2015-01-05', periods=n_bars, freq=freq))
+
+# 10年日线、一年分钟线
+HISTORIES = [(2520, '1d'), (60000, '1m')]
+
+@pytest.mark.parametrize('n_bars,period', HISTORIES)
+def test_kernel_matches_dataframe_backtest(n_bars, period):
+    data = _random_walk(n_bars, period)
+    strategy = MAStrategy(5, 20, period)
+    frame = strategy.backtest(data, with_data=True)['metrics']
+    kernel = strategy.backtest(data, with_data=False)['metrics']
+    assert set(kernel) == set(frame)
+    for name, value in frame.items():
+        if isinstance(value, float):
+            assert kernel[name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+        else:
+            assert kernel[name] == value, name
+
+@pytest.mark.perf
+@pytest.mark.parametrize('n_bars,period', HISTORIES)
+def test_kernel_faster_than_dataframe_backtest(n_bars, period):
+    data = _random_walk(n_bars, period)
+    strategy = MAStrategy(5, 20, period)
+
+    def best_of(with_data, repeat=5):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            strategy.backtest(data, with_data=with_data)
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    frame, kernel = best_of(True), best_of(False)
+    assert kernel * 3 < frame, f"DataFrame {frame * 1000:.2f}ms, 内核 {kernel * 1000:.2f}ms"
@@ -0,0 +1,77 @@
+"""
+启动流程测试：快速启动模式等待端口监听、组件延迟创建
+"""
+
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('fastmcp')
+
+from main import _instances, _lazy_instance, _wait_port_listening
+
+def _listen(family, address):
+    server = socket.socket(family, socket.SOCK_STREAM)
+    server.bind((address, 0))
+    server.listen()
+    return server
+
+@pytest.mark.parametrize('host', ['0.0.0.0', '', '127.0.0.1'])
+def test_wait_port_listening_ipv4(host):
+    with _listen(socket.AF_INET, '127.0.0.1') as server:
+        assert _wait_port_listening(host, server.getsockname()[1], timeout=2.0)
+
+@pytest.mark.skipif(not socket.has_ipv6, reason='不支持IPv6')
+def test_wait_port_listening_ipv6_wildcard():
+    try:
+        server = _listen(socket.AF_INET6, '::1')
+    except OSError:
+        pytest.skip('回环地址::1不可用')
+    with server:
+        assert _wait_port_listening('::', server.getsockname()[1], timeout=2.0)
+
+def test_wait_port_listening_timeout():
+    with _listen(socket.AF_INET, '127.0.0.1') as server:
+        port = server.getsockname()[1]
+    assert not _wait_port_listening('0.0.0.0', port, timeout=0.2)
+
+def test_slow_component_does_not_block_others():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_factory():
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    loader = threading.Thread(target=_lazy_instance, args=('test_slow', slow_factory))
+    loader.start()
+    try:
+        assert started.wait(5)
+        t0 = time.perf_counter()
+        assert _lazy_instance('test_fast', lambda: 'fast') == 'fast'
+        assert time.perf_counter() - t0 < 1.0
+    finally:
+        release.set()
+        loader.join()
+        _instances.pop('test_slow', None)
+        _instances.pop('test_fast', None)
+
+def test_component_created_once_under_contention():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_lazy_instance('test_once', factory)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _instances.pop('test_once', None)
+    assert len(calls) == 1 and len({id(result) for result in results}) == 1
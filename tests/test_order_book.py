@@ -0,0 +1,105 @@
+"""
+交易账本测试：推送增量更新、建立账本、与柜台对账发现并修正偏差，以及风控用的未完成买单与持仓市值聚合量
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.order_book import OrderBook
+from tests.fakes.xttrader import FakeTrader, fake_order, fake_position
+
+def _trade(traded_id, order_id, stock_code, volume, price, order_type=23):
+    return SimpleNamespace(traded_id=traded_id, order_id=order_id, stock_code=stock_code, order_type=order_type,
+                           traded_price=price, traded_volume=volume, traded_amount=volume * price, traded_time=0)
+
+@pytest.fixture
+def trader():
+    trader = FakeTrader()
+    trader.positions = [fake_position('600000.SH', 1000, 10.0, 11.0), fake_position('000001.SZ', 500, 12.0, 12.0)]
+    trader.orders = [fake_order(1, '600000.SH', 200, 10.0),                          # 未完成买单 2000
+                     fake_order(2, '000001.SZ', 300, 12.0, traded_volume=100, order_status=55),  # 部成 2400
+                     fake_order(3, '000001.SZ', 100, 12.0, order_type=24),           # 卖单不计入
+                     fake_order(4, '600036.SH', 100, 35.0, order_status=56, traded_volume=100)]  # 已成
+    trader.trades = [_trade('T1', 2, '000001.SZ', 100, 12.0), _trade('T2', 4, '600036.SH', 100, 35.0)]
+    yield trader
+    trader.shutdown()
+
+@pytest.fixture
+def book(trader):
+    book = OrderBook()
+    book.seed(trader, None)
+    return book
+
+def test_seed_builds_book_and_aggregates(book):
+    assert book.seeded
+    assert book.stats()['orders'] == 4 and book.stats()['open_orders'] == 3 and book.stats()['trades'] == 2
+    assert book.position('600000.SH')['volume'] == 1000
+    assert [order['order_id'] for order in book.orders('000001.SZ')] == [2, 3]
+    assert [order['order_id'] for order in book.orders(open_only=True)] == [1, 2, 3]
+    assert book.open_buy_value('600000.SH') == pytest.approx(2000.0)
+    assert book.open_buy_value('000001.SZ') == pytest.approx(2400.0)
+    assert book.open_buy_value() == pytest.approx(4400.0)
+    assert book.position_value() == pytest.approx(11000.0 + 6000.0)
+    assert book.asset()['total_asset'] == 1e6
+    assert [trade['traded_id'] for trade in book.trades(order_id=2)] == ['T1']
+
+def test_order_pushes_update_open_buy_value(book):
+    book.on_order(fake_order(1, '600000.SH', 200, 10.0, order_status=55, traded_volume=150))
+    assert book.open_buy_value('600000.SH') == pytest.approx(500.0)
+    book.on_order(fake_order(1, '600000.SH', 200, 10.0, order_status=56, traded_volume=200))
+    assert book.open_buy_value('600000.SH') == 0.0
+    # 终态之后乱序到达的旧推送被忽略
+    book.on_order(fake_order(1, '600000.SH', 200, 10.0, order_status=55, traded_volume=150))
+    assert book.order(1)['order_status'] == 56
+    assert book.open_buy_value() == pytest.approx(2400.0)
+
+def test_new_order_notifies_listeners_once(book):
+    seen = []
+    book.add_listener(lambda order: seen.append(order['order_id']))
+    book.on_order(fake_order(10, '601318.SH', 100, 50.0))
+    book.on_order(fake_order(10, '601318.SH', 100, 50.0, order_status=55, traded_volume=100))
+    assert seen == [10]
+    assert book.open_buy_value('601318.SH') == 0.0
+
+def test_position_pushes_update_value_and_remove_closed(book):
+    book.on_position(fake_position('600000.SH', 1500, 10.0, 11.0))
+    assert book.position_value() == pytest.approx(16500.0 + 6000.0)
+    book.on_position(fake_position('000001.SZ', 0, 12.0, 12.0))
+    assert book.position('000001.SZ') is None
+    assert book.position_value() == pytest.approx(16500.0)
+    book.on_asset(SimpleNamespace(cash=1.0, frozen_cash=0.0, market_value=2.0, total_asset=3.0))
+    assert book.asset()['total_asset'] == 3.0
+
+def test_reconcile_reports_and_fixes_drift(book, trader):
+    # 柜台状态变化但推送丢失：持仓数量变化、委托成交、新增委托、持仓清空
+    trader.positions = [fake_position('600000.SH', 1200, 10.0, 11.0)]
+    trader.orders[0] = fake_order(1, '600000.SH', 200, 10.0, order_status=56, traded_volume=200)
+    trader.orders.append(fake_order(5, '600519.SH', 100, 1500.0))
+    drift = book.reconcile(trader, None)
+
+    assert sorted(drift['positions']) == ['000001.SZ', '600000.SH']
+    assert drift['orders'] == [1]
+    assert drift['missing_orders'] == [5]
+    assert book.drift_count == 4
+    assert book.position('600000.SH')['volume'] == 1200 and book.position('000001.SZ') is None
+    assert book.open_buy_value('600000.SH') == 0.0
+    assert book.open_buy_value() == pytest.approx(2400.0 + 150000.0)
+    assert book.position_value() == pytest.approx(13200.0)
+
+    # 再次对账没有偏差
+    assert sum(len(items) for items in book.reconcile(trader, None).values()) == 0
+
+def test_push_during_reconcile_wins_over_snapshot(book, trader):
+    """对账查询期间到达的推送以推送为准，不计为偏差"""
+    query = trader.query_stock_positions
+
+    def query_then_push(account):
+        positions = query(account)
+        book.on_position(fake_position('600000.SH', 2000, 10.0, 11.0))
+        return positions
+
+    trader.query_stock_positions = query_then_push
+    drift = book.reconcile(trader, None)
+    assert drift['positions'] == []
+    assert book.position('600000.SH')['volume'] == 2000
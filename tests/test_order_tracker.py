@@ -0,0 +1,81 @@
+"""
+异步下单回报关联测试：回报早于登记、按下单备注关联错误、超时放弃
+"""
+
+import threading
+import time
+
+from src.utils.order_tracker import AsyncOrderTracker
+
+def test_response_before_expect_is_kept():
+    tracker = AsyncOrderTracker()
+    tracker.on_response(5, 1005)
+    tracker.expect(5, 'B1_0')
+    assert tracker.collect([5], timeout=0.1) == {5: {'order_id': 1005, 'error': None}}
+
+def test_error_correlated_by_remark():
+    tracker = AsyncOrderTracker()
+    tracker.expect(7, 'B1_1')
+    tracker.on_error('可用资金不足', remark='B1_1')
+    # 随后到达的失败回报不覆盖错误原因
+    tracker.on_response(7, -1)
+    assert tracker.collect([7], timeout=0.1) == {7: {'order_id': None, 'error': '可用资金不足'}}
+
+def test_error_before_expect_is_matched_on_expect():
+    tracker = AsyncOrderTracker()
+    tracker.on_error('价格超出涨跌停', remark='B1_2')
+    tracker.expect(8, 'B1_2')
+    assert tracker.collect([8], timeout=0.1) == {8: {'order_id': None, 'error': '价格超出涨跌停'}}
+
+def test_error_with_seq_overrides_pending():
+    tracker = AsyncOrderTracker()
+    tracker.expect(9)
+    tracker.on_error('非交易时间', seq=9)
+    assert tracker.collect([9], timeout=0.1)[9]['error'] == '非交易时间'
+
+def test_collect_waits_for_responses_from_callback_thread():
+    tracker = AsyncOrderTracker()
+    seqs = list(range(1, 51))
+    for seq in seqs:
+        tracker.expect(seq, f'B2_{seq}')
+
+    def respond():
+        for seq in reversed(seqs):
+            time.sleep(0.001)
+            tracker.on_response(seq, 2000 + seq)
+
+    thread = threading.Thread(target=respond)
+    thread.start()
+    results = tracker.collect(seqs, timeout=5)
+    thread.join()
+    assert {seq: result['order_id'] for seq, result in results.items()} == {seq: 2000 + seq for seq in seqs}
+    assert tracker._remarks == {}
+
+def test_timeout_abandons_seq_and_hands_late_response_to_handler():
+    late = []
+    tracker = AsyncOrderTracker(on_late=lambda *args: late.append(args))
+    tracker.expect(11, 'B3_0')
+    tracker.expect(12, 'B3_1')
+    tracker.on_response(12, 1012)
+    t0 = time.monotonic()
+    results = tracker.collect([11, 12], timeout=0.05)
+    assert time.monotonic() - t0 >= 0.05
+    assert results == {12: {'order_id': 1012, 'error': None}}
+    assert 11 in tracker._abandoned
+
+    # 超时后到达的回报与错误交给 on_late 处理，不会留在未认领回报中
+    tracker.on_error('超时后的错误', seq=11)
+    tracker.on_response(11, 1011)
+    assert late == [(11, None, '超时后的错误'), (11, 1011, None)]
+    assert 11 not in tracker._responses
+    assert 11 not in tracker._abandoned
+    assert tracker.collect([11], timeout=0) == {}
+
+def test_unclaimed_responses_are_bounded():
+    tracker = AsyncOrderTracker(max_unclaimed=10)
+    for seq in range(100):
+        tracker.on_response(seq, 1000 + seq)
+    assert list(tracker._responses) == list(range(90, 100))
+    for seq in range(100):
+        tracker.on_error('错误', remark=f'X{seq}')
+    assert len(tracker._orphan_errors) == 10
@@ -0,0 +1,112 @@
+"""
+QMT 策略生成测试：在模拟 context 上运行生成的双均线策略，验证预热与同一K线重复触发
+"""
+
+import importlib.util
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tools.qmt_tool import QMTStrategyTool
+
+class FakeContext:
+    """QMT context 替身：history 返回截至当前K线的行情，当前K线的收盘价可在盘中刷新"""
+
+    def __init__(self, closes: pd.Series):
+        self.closes = closes.copy()
+        self.now = 0
+        self.volume = 0
+        self.orders = []
+
+    def history(self, symbol, period, count):
+        return self.closes.iloc[max(0, self.now + 1 - count):self.now + 1].to_frame('close')
+
+    def position(self, symbol):
+        return SimpleNamespace(volume=self.volume)
+
+    def order_target_percent(self, symbol, percent):
+        self.orders.append((self.closes.index[self.now], percent))
+        self.volume = 100 if percent > 0 else 0
+
+@pytest.fixture
+def strategy(tmp_path):
+    tool = QMTStrategyTool(str(tmp_path))
+    tool.generate_ma_strategy('600000.SH', 3, 8, strategy_name='ma_test')
+    spec = importlib.util.spec_from_file_location('ma_test', tmp_path / 'ma_test.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _closes(n: int = 120, seed: int = 3) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    close = np.round(10.0 * np.exp(np.cumsum(rng.normal(0.0, 0.03, n))), 2)
+    return pd.Series(close, index=pd.date_range('2024-01-01', periods=n, freq='B'))
+
+def _expected_sums(context, closes: pd.Series):
+    prices = np.round(closes.to_numpy()[:context.now + 1] * 1000).astype(np.int64)
+    return prices[-3:].sum(), prices[-8:].sum(), list(prices[-8:])
+
+def test_first_call_seeds_window_from_history(strategy):
+    context = FakeContext(_closes())
+    context.now = 50
+    strategy.init(context)
+    strategy.handle_bar(context, {})
+    sum_short, sum_long, window = _expected_sums(context, context.closes)
+    assert list(context.window) == window
+    assert (context.sum_short, context.sum_long) == (sum_short, sum_long)
+    assert context.last_bar_time == context.closes.index[50]
+
+def test_repeated_calls_within_bar_replace_last_price(strategy):
+    closes = _closes()
+    context = FakeContext(closes)
+    strategy.init(context)
+    rng = np.random.default_rng(11)
+    for now in range(len(closes)):
+        context.now = now
+        # 盘中多次触发，价格逐次刷新，最后一次为收盘价
+        for quote in list(closes.iloc[now] * (1 + rng.normal(0.0, 0.01, 3))) + [closes.iloc[now]]:
+            context.closes.iloc[now] = round(quote, 2)
+            strategy.handle_bar(context, {})
+        context.closes.iloc[now] = closes.iloc[now]
+
+        sum_short, sum_long, window = _expected_sums(context, closes)
+        assert list(context.window) == window
+        assert (context.sum_short, context.sum_long) == (sum_short, sum_long)
+
+def test_previous_bar_is_corrected_with_final_close(strategy):
+    closes = _closes()
+    context = FakeContext(closes)
+    strategy.init(context)
+    context.now = 20
+    strategy.handle_bar(context, {})
+    # 上一根K线最后一次触发时的价格不是收盘价，下一根K线的调用按最终收盘价修正
+    context.now = 21
+    context.closes.iloc[21] = closes.iloc[21] + 0.5
+    strategy.handle_bar(context, {})
+    context.closes.iloc[21] = closes.iloc[21]
+    context.now = 22
+    strategy.handle_bar(context, {})
+    sum_short, sum_long, window = _expected_sums(context, closes)
+    assert list(context.window) == window
+    assert (context.sum_short, context.sum_long) == (sum_short, sum_long)
+
+def test_signals_follow_moving_average_cross(strategy):
+    closes = _closes()
+    context = FakeContext(closes)
+    strategy.init(context)
+    for now in range(len(closes)):
+        context.now = now
+        strategy.handle_bar(context, {})
+    ma_short, ma_long = closes.rolling(3).mean(), closes.rolling(8).mean()
+    held = False
+    expected = []
+    for when in closes.index[7:]:
+        if ma_short[when] > ma_long[when] + 1e-9 and not held:
+            expected.append((when, 1))
+            held = True
+        elif ma_short[when] < ma_long[when] - 1e-9 and held:
+            expected.append((when, 0))
+            held = False
+    assert context.orders == expected
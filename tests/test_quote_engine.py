@@ -0,0 +1,154 @@
+"""
+实时行情引擎测试：订阅管理、交易工具接入、订阅关闭，以及 10k+ 条/秒推送下的推送到消费者延迟（perf）
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.tools import trading_tool as trading_module
+from src.tools.trading_tool import TradingTool
+from src.utils.quote_engine import QuoteEngine
+from src.utils.xtquant_client import xt_client
+from tests.fakes.xtdata import FakeQuoteSource
+
+def test_watch_before_start_is_ignored():
+    engine = QuoteEngine(capacity=8)
+    assert engine.watch(['600000.SH']) is False
+    assert not engine.running
+
+def test_start_and_watch_subscribe_each_symbol_once():
+    engine = QuoteEngine(capacity=8)
+    source = FakeQuoteSource()
+    assert engine.start(['600000.SH', '000001.SZ', '600000.SH'], source=source)
+    assert engine.watch(['000001.SZ', '600036.SH'])
+    assert engine.start(['600036.SH'])        # 已启动时沿用原行情源
+    assert sorted(source.subscribed_symbols()) == ['000001.SZ', '600000.SH', '600036.SH']
+    assert len(source.subscriptions) == 2
+
+    engine.stop()
+    assert not engine.running
+    assert source.subscriptions == {}
+
+def test_push_updates_last_price_and_ring():
+    engine = QuoteEngine(capacity=4)
+    engine.start(['600000.SH'], source=FakeQuoteSource())
+    for i in range(6):
+        engine.on_push({'600000.SH': {'lastPrice': 10.0 + i, 'time': i, 'volume': 100.0 * i}})
+    assert engine.last_price('600000.SH') == 15.0
+    assert engine.recent_ticks('600000.SH')['price'].tolist() == [12.0, 13.0, 14.0, 15.0]
+
+def _consume(engine, source, n, rate):
+    """订阅全部推送，由发布线程以 rate 条/秒推送 n 条，返回 (收到条数, 实际推送速率)"""
+    async def consume():
+        sub = engine.subscribe(maxsize=n)
+        publisher = asyncio.get_running_loop().run_in_executor(None, source.publish, n, rate)
+        received = 0
+        async for _ in sub:
+            received += 1
+            if received == n:
+                break
+        sub.close()
+        return received, await publisher
+
+    return asyncio.run(asyncio.wait_for(consume(), timeout=60))
+
+def test_push_reaches_consumer():
+    engine = QuoteEngine(capacity=256)
+    source = FakeQuoteSource()
+    engine.start([f'{600000 + i}.SH' for i in range(50)], source=source)
+    received, _ = _consume(engine, source, 2000, 20000)
+    assert received == 2000
+    assert engine.latency_stats()['samples'] == 2000
+    assert engine.stats()['dropped'] == 0
+
+def test_close_wakes_waiting_consumer():
+    engine = QuoteEngine(capacity=8)
+
+    async def consume():
+        sub = engine.subscribe()
+        loop = asyncio.get_running_loop()
+        # 在其他线程关闭订阅，消费者此时阻塞在空队列上
+        loop.call_later(0.05, lambda: threading.Thread(target=sub.close).start())
+        return [tick async for tick in sub]
+
+    assert asyncio.run(asyncio.wait_for(consume(), timeout=5)) == []
+    assert engine.stats()['subscribers'] == 0
+
+def test_latency_recorded_from_concurrent_loops():
+    engine = QuoteEngine(capacity=8, latency_window=1024)
+    threads = [threading.Thread(target=lambda: [engine._record_latency(1000) for _ in range(5000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = engine.latency_stats()
+    assert stats['samples'] == 1024 and stats['max_us'] == 1.0
+    assert engine._latency_pos == 20000 % 1024
+
+@pytest.mark.perf
+def test_push_to_consumer_latency_at_10k_msgs_per_second():
+    engine = QuoteEngine(capacity=256)
+    source = FakeQuoteSource()
+    engine.start([f'{600000 + i}.SH' for i in range(50)], source=source)
+    n = 20000
+    received, rate = _consume(engine, source, n, 20000)
+    stats = engine.latency_stats()
+    assert received == n
+    assert rate >= 10000
+    assert stats['p99_us'] < 50_000
+    assert engine.stats()['dropped'] == 0
+
+@pytest.fixture
+def connected_tool(monkeypatch):
+    """行情源已连接、交易器视为就绪的交易工具，使用独立的行情引擎"""
+    engine = QuoteEngine(capacity=8)
+    source = FakeQuoteSource({'600000.SH': 10.0, '000001.SZ': 12.5})
+    monkeypatch.setattr(trading_module, 'quote_engine', engine)
+    monkeypatch.setattr(xt_client, '_connected', True)
+    monkeypatch.setattr(xt_client, '_xt', source)
+    monkeypatch.setattr(xt_client, 'resolve_symbol', lambda symbol, sector='沪深A股': symbol)
+    monkeypatch.setattr(trading_module.config.data, 'quote_symbols', ['600036.SH'])
+    monkeypatch.setattr(trading_module.config.strategy, 'default_symbol', '000001.SZ')
+    monkeypatch.setattr(TradingTool, '_ensure_trader_ready', lambda self: True)
+    return TradingTool(), engine, source
+
+def _order(order_id, code, status=50):
+    return SimpleNamespace(order_id=order_id, order_sysid='', stock_code=code, order_type=23, order_volume=100,
+                           price_type=11, price=10.0, traded_volume=0, traded_price=0.0, order_status=status,
+                           status_msg='', order_time=0, strategy_name='', order_remark='')
+
+def test_start_quotes_subscribes_held_traded_open_and_watched_symbols(connected_tool):
+    tool, engine, source = connected_tool
+    book = tool.order_book
+    book.on_position(SimpleNamespace(stock_code='600519.SH', volume=100, can_use_volume=100, frozen_volume=0,
+                                     on_road_volume=0, yesterday_volume=100, open_price=1500.0,
+                                     avg_price=1500.0, market_value=150000.0))
+    book.on_trade(SimpleNamespace(traded_id='T1', order_id=1, stock_code='000858.SZ', order_type=24,
+                                  traded_price=150.0, traded_volume=100, traded_amount=15000.0, traded_time=0))
+    book.on_order(_order(2, '601318.SH'))
+    book.on_order(_order(3, '600030.SH', status=56))
+    source.subscriptions.clear()
+
+    assert tool.start_quotes()
+    assert sorted(source.subscribed_symbols()) == sorted(
+        ['000001.SZ', '600036.SH', '600519.SH', '000858.SZ', '601318.SH'])   # 已成委托不订阅
+    assert engine.running
+
+    # 之后收到的新委托自动追加订阅
+    book.on_order(_order(4, '300750.SZ'))
+    assert '300750.SZ' in source.subscribed_symbols()
+
+def test_ensure_quotes_fetches_missing_snapshot_once(connected_tool):
+    tool, engine, source = connected_tool
+    tool.start_quotes()
+    tool._ensure_quotes(['600000.SH', '000001.SZ', '600000.SH'])
+    assert source.snapshot_calls == [['600000.SH', '000001.SZ']]
+    assert engine.last_price('600000.SH') == 10.0
+    assert '600000.SH' in source.subscribed_symbols()
+
+    tool._ensure_quotes(['600000.SH', '000001.SZ'])
+    assert len(source.snapshot_calls) == 1
@@ -0,0 +1,65 @@
+"""
+回测结果缓存测试：参数哈希包含生效的交易配置，行情数据指纹，缓存读写与失效
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import config
+from src.utils.indicator_cache import data_fingerprint
+from src.utils.result_cache import TRADING_FIELDS, BacktestResultCache
+
+ARGS = ('ma_cross', '000001.SZ', '20240101', '20241201')
+
+def test_param_hash_ignores_param_order_and_none():
+    first = BacktestResultCache.param_hash(*ARGS, {'short_period': 5, 'long_period': 20})
+    second = BacktestResultCache.param_hash(*ARGS, {'long_period': 20, 'short_period': 5, 'backend': None})
+    assert first == second
+
+@pytest.mark.parametrize('field', TRADING_FIELDS)
+def test_param_hash_changes_with_trading_config(monkeypatch, field):
+    before = BacktestResultCache.param_hash(*ARGS, {'short_period': 5})
+    monkeypatch.setattr(config.trading, field, getattr(config.trading, field) * 2)
+    assert BacktestResultCache.param_hash(*ARGS, {'short_period': 5}) != before
+
+def test_stale_result_is_not_returned_after_cost_change(monkeypatch, tmp_path):
+    cache = BacktestResultCache(str(tmp_path / 'results.sqlite'))
+    key = BacktestResultCache.param_hash(*ARGS, {})
+    cache.put(key, 'fp', '[OK] report')
+    assert cache.get(key, 'fp') == '[OK] report'
+
+    monkeypatch.setattr(config.trading, 'commission_rate', 0.001)
+    assert cache.get(BacktestResultCache.param_hash(*ARGS, {}), 'fp') is None
+    cache.close()
+
+def test_data_fingerprint_detects_offsetting_changes():
+    # 三根K线的位模式按 +d, -2d, +d 变化：按位求和与按位置加权求和都不变，内容哈希必须变化
+    close = np.linspace(10.0, 11.0, 50)
+    bits = close.view(np.uint64).copy()
+    d = np.uint64(1 << 20)
+    bits[10] += d
+    bits[11] -= d + d
+    bits[12] += d
+    changed = bits.view(np.float64)
+    index = pd.date_range('2024-01-01', periods=50, freq='B')
+    assert not np.array_equal(close, changed)
+    assert data_fingerprint(pd.DataFrame({'close': close}, index=index)) != \
+        data_fingerprint(pd.DataFrame({'close': changed}, index=index))
+
+def test_data_fingerprint_is_stable_and_sensitive_to_columns():
+    index = pd.date_range('2024-01-01', periods=20, freq='B')
+    data = pd.DataFrame({'open': np.arange(20.0), 'close': np.arange(20.0) + 0.5}, index=index)
+    assert data_fingerprint(data) == data_fingerprint(data.copy())
+    assert data_fingerprint(data) != data_fingerprint(data.rename(columns={'open': 'high'}))
+    assert data_fingerprint(data) != data_fingerprint(data.iloc[:-1])
+
+def test_stats_does_not_create_database(tmp_path):
+    path = tmp_path / 'results.sqlite'
+    cache = BacktestResultCache(str(path))
+    assert 'disk_entries' not in cache.stats()
+    assert not path.exists()
+
+    cache.put(BacktestResultCache.param_hash(*ARGS, {}), 'fp', 'report')
+    assert cache.stats()['disk_entries'] == 1
+    cache.close()
@@ -0,0 +1,194 @@
+"""
+下单前风控测试：各项限额的边界、参考价要求、保留额度生命周期，以及检查延迟（perf）
+"""
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.config import config
+from src.tools import trading_tool as trading_module
+from src.tools.trading_tool import TradingTool
+from src.utils import risk_engine as risk_module
+from src.utils.order_book import OrderBook
+from src.utils.quote_engine import QuoteEngine
+from src.utils.risk_engine import PreTradeRiskEngine
+from tests.fakes.xttrader import FAKE_XTCONSTANT, FakeTrader, fake_order, fake_position
+
+@pytest.fixture
+def quotes(monkeypatch):
+    engine = QuoteEngine(capacity=8)
+    monkeypatch.setattr(risk_module, 'quote_engine', engine)
+    monkeypatch.setattr(trading_module, 'quote_engine', engine)
+
+    def push(prices, age=0.0):
+        tick_time = int((time.time() - age) * 1000)
+        engine.on_push({symbol: {'lastPrice': price, 'time': tick_time, 'volume': 0.0}
+                        for symbol, price in prices.items()})
+    return push
+
+@pytest.fixture
+def limits(monkeypatch):
+    """固定的限额，与环境变量和 config.json 无关"""
+    for name, value in {'max_order_value': 100000.0, 'max_position_value': 200000.0}.items():
+        monkeypatch.setattr(config.trading, name, value)
+    for name, value in {'enabled': True, 'max_drawdown_limit': 0.2, 'max_leverage': 1.0, 'stop_loss_ratio': 0.1,
+                        'max_price_deviation': 0.05, 'require_quote': True, 'max_quote_age': 60.0}.items():
+        monkeypatch.setattr(config.risk, name, value)
+
+@pytest.fixture
+def broker():
+    trader = FakeTrader()
+    trader.asset.total_asset = 1_000_000.0
+    trader.positions = [fake_position('600000.SH', 10000, 10.0, 10.0)]   # 市值 100000
+    trader.orders = [fake_order(1, '600000.SH', 2000, 10.0)]              # 未完成买单 20000
+    yield trader
+    trader.shutdown()
+
+@pytest.fixture
+def engine(limits, quotes, broker):
+    book = OrderBook()
+    book.seed(broker, None)
+    quotes({'600000.SH': 10.0, '000001.SZ': 12.0, '600519.SH': 1500.0})
+    return PreTradeRiskEngine(book)
+
+def test_order_value_limit(engine):
+    assert engine.check('000001.SZ', 'BUY', 8300, 12.0).passed            # 99600
+    decision = engine.check('000001.SZ', 'BUY', 8400, 12.0)               # 100800
+    assert not decision.passed and '单笔金额' in decision.reason
+
+def test_missing_quote_rejects_buy_and_flags_sell(engine, monkeypatch):
+    decision = engine.check('300750.SZ', 'BUY', 100, 200.0)
+    assert not decision.passed and '参考价' in decision.reason
+    # 卖出只减少敞口，没有参考价时放行并计数；可用持仓检查仍然生效
+    assert not engine.check('300750.SZ', 'SELL', 100, 200.0).passed
+    assert engine.stats()['no_quote'] == 2
+
+    monkeypatch.setattr(config.risk, 'require_quote', False)
+    assert engine.check('300750.SZ', 'BUY', 100, 200.0).passed
+
+def test_stale_quote_counts_as_missing(engine, quotes, monkeypatch):
+    quotes({'000001.SZ': 12.0}, age=120.0)
+    decision = engine.check('000001.SZ', 'BUY', 100, 12.0)
+    assert not decision.passed and '秒未更新' in decision.reason
+
+    monkeypatch.setattr(config.risk, 'max_quote_age', 0.0)   # 不限有效期
+    assert engine.check('000001.SZ', 'BUY', 100, 12.0).passed
+
+def test_without_quote_order_price_never_values_holdings(engine, monkeypatch):
+    """关闭 require_quote 后，没有参考价的买入跳过价格偏离与止损检查，持仓按柜台市值计，而不是委托价"""
+    monkeypatch.setattr(config.risk, 'require_quote', False)
+    # 亏损25%的持仓，柜台市值150000，没有实时行情
+    engine.book.on_position(fake_position('000002.SZ', 10000, 20.0, 15.0))
+    decision = engine.check('000002.SZ', 'BUY', 10000, 5.0)                # 150000 + 50000
+    assert decision.passed and '未做价格偏离与止损检查' in decision.reason
+    engine.release(decision.token)
+    decision = engine.check('000002.SZ', 'BUY', 10100, 5.0)               # 按委托价估值只有 100500
+    assert not decision.passed and '持仓及挂单金额' in decision.reason
+
+def test_gross_exposure_uses_same_valuation_as_symbol_limit(engine, quotes, monkeypatch):
+    monkeypatch.setattr(config.risk, 'max_leverage', 0.2)   # 上限 200000
+    quotes({'600000.SH': 15.0})                             # 持仓 150000（柜台市值仍为100000）+ 挂单 20000
+    assert engine.check('000001.SZ', 'BUY', 2500, 12.0).passed              # 30000
+    decision = engine.check('000001.SZ', 'BUY', 100, 12.0)
+    assert not decision.passed and '总敞口' in decision.reason
+
+def test_price_deviation(engine):
+    assert engine.check('000001.SZ', 'BUY', 100, 12.59).passed            # +4.9%
+    decision = engine.check('000001.SZ', 'BUY', 100, 12.61)
+    assert not decision.passed and '偏离' in decision.reason
+    assert not engine.check('600000.SH', 'SELL', 100, 9.4).passed           # -6%
+
+def test_sell_limited_to_available_volume(engine):
+    engine.book.on_position(fake_position('600000.SH', 5000, 10.0, 10.0))
+    assert engine.check('600000.SH', 'SELL', 5000, 10.0).passed
+    decision = engine.check('600000.SH', 'SELL', 5100, 10.0)
+    assert not decision.passed and '可用持仓不足' in decision.reason
+
+def test_per_symbol_limit_counts_position_open_orders_and_reservations(engine):
+    # 持仓 100000 + 未完成买单 20000，单股上限 200000，剩余 80000
+    first = engine.check('600000.SH', 'BUY', 5000, 10.0)
+    assert first.passed
+    assert engine.check('600000.SH', 'BUY', 3000, 10.0).passed
+    decision = engine.check('600000.SH', 'BUY', 100, 10.0)
+    assert not decision.passed and '持仓及挂单金额' in decision.reason
+
+    engine.release(first.token)
+    assert engine.check('600000.SH', 'BUY', 5000, 10.0).passed
+
+def test_position_value_uses_last_price(engine, quotes):
+    quotes({'600000.SH': 15.0})   # 持仓市值按最新价 150000
+    assert engine.check('600000.SH', 'BUY', 2000, 15.0).passed             # 150000 + 20000 + 30000
+    assert not engine.check('600000.SH', 'BUY', 100, 15.0).passed
+
+def test_stop_loss_blocks_adding(engine, quotes):
+    quotes({'600000.SH': 9.01})
+    assert engine.check('600000.SH', 'BUY', 100, 9.01).passed
+    quotes({'600000.SH': 8.99})
+    decision = engine.check('600000.SH', 'BUY', 100, 8.99)
+    assert not decision.passed and '止损线' in decision.reason
+
+def test_gross_exposure_limit(engine, monkeypatch):
+    monkeypatch.setattr(config.risk, 'max_leverage', 0.2)   # 上限 200000，已用 120000
+    for _ in range(8):
+        assert engine.check('600519.SH', 'BUY', 6, 1500.0).passed          # 每笔 9000
+    decision = engine.check('600519.SH', 'BUY', 6, 1500.0)
+    assert not decision.passed and '总敞口' in decision.reason
+
+def test_drawdown_blocks_buys(engine, broker):
+    assert engine.check('000001.SZ', 'BUY', 100, 12.0).passed
+    engine.book.on_asset(SimpleNamespace(cash=0.0, frozen_cash=0.0, market_value=0.0, total_asset=790_000.0))
+    decision = engine.check('000001.SZ', 'BUY', 100, 12.0)
+    assert not decision.passed and '回撤' in decision.reason
+    assert engine.check('600000.SH', 'SELL', 100, 10.0).passed
+
+def test_reservation_released_when_book_receives_order(engine):
+    decision = engine.check('600000.SH', 'BUY', 8000, 10.0)
+    engine.bind(decision.token, 501)
+    assert engine.stats()['reservations'] == 1
+    engine.book.on_order(fake_order(501, '600000.SH', 8000, 10.0))
+    assert engine.stats()['reservations'] == 0
+    # 委托已计入账本的未完成买单，额度不重复计算
+    assert not engine.check('600000.SH', 'BUY', 100, 10.0).passed
+
+def test_reservation_expires(engine):
+    engine.reservation_ttl = 0.01
+    assert engine.check('600000.SH', 'BUY', 8000, 10.0).passed
+    time.sleep(0.02)
+    assert engine.check('600000.SH', 'BUY', 8000, 10.0).passed
+    assert engine.stats()['reservations'] == 1
+
+@pytest.mark.perf
+def test_check_latency_p99(engine):
+    symbols = [f'{600000 + i}.SH' for i in range(1, 200)]
+    engine.book.on_asset(SimpleNamespace(cash=0.0, frozen_cash=0.0, market_value=0.0, total_asset=1e9))
+    risk_module.quote_engine.on_push({symbol: {'lastPrice': 10.0, 'time': 0, 'volume': 0.0} for symbol in symbols})
+    samples = np.empty(20000)
+    for i in range(len(samples)):
+        symbol = symbols[i % len(symbols)]
+        t0 = time.perf_counter_ns()
+        decision = engine.check(symbol, 'BUY' if i % 4 else 'SELL', 100, 10.0)
+        samples[i] = time.perf_counter_ns() - t0
+        engine.release(decision.token)
+    p50, p99 = np.percentile(samples, [50, 99]) / 1000.0
+    assert p99 < 200.0, f"p50={p50:.1f}us p99={p99:.1f}us"
+
+def test_place_order_requires_reference_price(limits, quotes, monkeypatch):
+    monkeypatch.setattr(trading_module, 'XTQUANT_AVAILABLE', True)
+    monkeypatch.setattr(trading_module, 'xtconstant', FAKE_XTCONSTANT, raising=False)
+    monkeypatch.setattr(TradingTool, '_init_trader', lambda self: None)
+    tool = TradingTool()
+    tool.trader, tool.account = FakeTrader(latency=0.001), object()
+    tool.trader.register_callback(tool.callback)
+    try:
+        assert tool.place_order('000001.SZ', 100, 12.0).startswith('[RISK]')
+        quotes({'000001.SZ': 12.0})
+        assert '订单已成功提交' in tool.place_order('000001.SZ', 100, 12.0)
+        result = tool.place_orders([{'symbol': '000001.SZ', 'quantity': 100, 'price': 12.0},
+                                    {'symbol': '600036.SH', 'quantity': 100, 'price': 35.0}])
+        assert [order['status'] for order in result['orders']] == ['ACCEPTED', 'REJECTED']
+        assert '参考价' in result['orders'][1]['message']
+    finally:
+        tool.trader.shutdown()
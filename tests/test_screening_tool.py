@@ -0,0 +1,28 @@
+"""
+选股工具测试：股票池面板缓存按股票列表内容区分
+"""
+
+from types import SimpleNamespace
+
+from src.tools import screening_tool as st
+from src.utils.cache import TTLCache
+
+def test_panel_cache_keys_on_symbols(monkeypatch):
+    universe = {'sector': ['600000.SH', '600001.SH']}
+    fetched = []
+
+    def fetch_many(symbols, start_date, end_date, period):
+        fetched.append(list(symbols))
+        return SimpleNamespace(panel=object(), failed=[])
+
+    monkeypatch.setattr(st.xt_client, 'cache', TTLCache('test', ttl=60))
+    monkeypatch.setattr(st.xt_client, 'get_stock_list', lambda sector: universe[sector])
+    monkeypatch.setattr(st.xt_client, 'fetch_many', fetch_many)
+    tool = st.ScreeningTool()
+
+    first = tool._load_panel('sector', '1d', '20240131', [], 0)
+    assert tool._load_panel('sector', '1d', '20240131', [], 0) is first
+
+    universe['sector'] = ['600000.SH', '600002.SH']   # 成分调整，数量不变
+    assert tool._load_panel('sector', '1d', '20240131', [], 0) is not first
+    assert fetched == [['600000.SH', '600001.SH'], ['600000.SH', '600002.SH']]
@@ -0,0 +1,63 @@
+"""
+流式双均线回测测试：任意不均匀分块的结果与一次性内核回测一致，跨块状态的内存占用不随历史长度增长
+"""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from src.strategies.ma_strategy import PERIODS_PER_YEAR, MABacktestKernel
+from src.strategies.streaming_backtest import StreamingMABacktester
+
+SYMBOLS = ['000001.SZ', '600000.SH', '300750.SZ']
+
+def _closes(n_bars: int, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.002, (len(SYMBOLS), n_bars)), axis=1)), 2)
+    closes[1, 1000:1300] = np.nan        # 停牌，跨越多个块
+    closes[2, :50] = np.nan              # 晚于其他股票开始
+    return closes
+
+def _uneven_chunks(closes: np.ndarray, n_chunks: int, seed: int = 11):
+    """随机切分点，包含长度为1和比长均线窗口还短的块"""
+    rng = np.random.default_rng(seed)
+    cuts = np.sort(rng.choice(np.arange(1, closes.shape[1]), n_chunks - 1, replace=False))
+    return np.split(closes, cuts, axis=1)
+
+@pytest.mark.parametrize('n_chunks', [1, 7, 37, 400])
+def test_uneven_chunks_match_kernel(n_chunks):
+    closes = _closes(4000)
+    backtester = StreamingMABacktester(SYMBOLS, 5, 20, period='1m')
+    for chunk in _uneven_chunks(closes, n_chunks):
+        backtester.feed_closes(chunk)
+    results = backtester.results()
+
+    kernel = MABacktestKernel()
+    for symbol, row in zip(SYMBOLS, closes):
+        expected = kernel.run(row[~np.isnan(row)], 5, 20, PERIODS_PER_YEAR['1m'])
+        actual = results.loc[symbol]
+        for name, value in expected.items():
+            assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-12), (symbol, name)
+
+def test_state_memory_is_flat_in_history_length():
+    chunk = 2000
+    usage = {}
+    for n_chunks in (5, 50):
+        blocks = np.split(_closes(chunk * n_chunks), n_chunks, axis=1)
+        backtester = StreamingMABacktester(SYMBOLS, 5, 20, period='1m')
+        tracemalloc.start()
+        peak = 0
+        for block in blocks:
+            tracemalloc.reset_peak()
+            backtester.feed_closes(block)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        usage[n_chunks] = (backtester.nbytes, retained, peak)
+
+    # 跨块状态只有每只股票最近 long_period-1 个收盘价
+    assert usage[5][0] == usage[50][0] == len(SYMBOLS) * 19 * 8
+    # 10倍的历史长度：处理完后保留的内存与单块处理的峰值都不随之增长
+    assert usage[50][1] < usage[5][1] + 64 * 1024
+    assert usage[50][2] < usage[5][2] * 1.5
@@ -0,0 +1,127 @@
+"""
+交易工具测试：批量下单的逐笔结果、等待超时后到达的回报，以及逐笔同步下单与批量异步下单的吞吐（perf）
+"""
+
+import time
+
+import pytest
+
+from src.config import config
+from src.tools import trading_tool as trading_module
+from src.tools.trading_tool import TradingTool
+from tests.fakes.xttrader import FAKE_XTCONSTANT, FakeTrader, fake_order
+
+LATENCY = 0.02
+
+@pytest.fixture
+def make_tool(monkeypatch):
+    """返回接入柜台替身的交易工具构造函数；本文件只测试提交与回报关联，关闭下单前风控"""
+    monkeypatch.setattr(trading_module, 'XTQUANT_AVAILABLE', True)
+    monkeypatch.setattr(trading_module, 'xtconstant', FAKE_XTCONSTANT, raising=False)
+    monkeypatch.setattr(TradingTool, '_init_trader', lambda self: None)
+    monkeypatch.setattr(config.risk, 'enabled', False)
+    traders = []
+
+    def make(**kwargs):
+        tool = TradingTool()
+        tool.trader = FakeTrader(**kwargs)
+        tool.trader.register_callback(tool.callback)
+        tool.account = object()
+        traders.append(tool.trader)
+        return tool
+
+    yield make
+    for trader in traders:
+        trader.shutdown()
+
+def _basket(n):
+    return [{'symbol': f'{600000 + i}.SH', 'quantity': 100, 'price': 10.0 + i * 0.01} for i in range(n)]
+
+def test_batch_submits_every_order_asynchronously(make_tool):
+    n = 40
+    tool = make_tool(latency=0.001)
+    result = tool.place_orders(_basket(n))
+    assert result['success'] and result['accepted'] == n
+    assert tool.trader.sync_calls == 0 and tool.trader.async_calls == n
+    assert len({order['order_id'] for order in result['orders']}) == n
+
+@pytest.mark.perf
+def test_batch_throughput_vs_sequential(make_tool):
+    n = 40
+    tool = make_tool(latency=LATENCY)
+
+    t0 = time.perf_counter()
+    for order in _basket(n):
+        assert '订单已成功提交' in tool.place_order(order['symbol'], order['quantity'], order['price'])
+    sequential = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    result = tool.place_orders(_basket(n))
+    batch = time.perf_counter() - t0
+
+    assert result['success'] and result['accepted'] == n
+    assert sequential >= n * LATENCY
+    # 批量下单只等待一次柜台往返
+    assert batch < sequential / 5, f"sequential={sequential * 1000:.0f}ms batch={batch * 1000:.0f}ms"
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+@pytest.fixture
+def late_tool(make_tool, monkeypatch):
+    """回报晚于等待超时到达的柜台替身；开启风控（不要求参考价）以观察保留额度"""
+    monkeypatch.setattr(config.trading, 'order_timeout', 0.05)
+    monkeypatch.setattr(config.risk, 'enabled', True)
+    monkeypatch.setattr(config.risk, 'require_quote', False)
+    return make_tool(latency=0.2, reject=['600001.SH'])
+
+def test_timeout_row_says_order_may_be_live(late_tool):
+    result = late_tool.place_orders(_basket(1))
+    order = result['orders'][0]
+    assert order['status'] == 'TIMEOUT' and order['order_id'] is None
+    assert '可能已被柜台接受' in order['message'] and 'B1_0' in order['message']
+
+def test_late_acceptance_binds_reservation(late_tool):
+    late_tool.place_orders(_basket(1))
+    engine = late_tool.risk_engine
+    assert engine.stats()['reservations'] == 1
+    assert _wait_for(lambda: engine._by_order)
+    order_id = next(iter(engine._by_order))
+    assert late_tool._timed_out == {}
+
+    # 账本收到该委托后释放保留额度，不必等待有效期
+    late_tool.order_book.on_order(fake_order(order_id, '600000.SH', 100, 10.0))
+    assert engine.stats()['reservations'] == 0
+
+def test_late_rejection_releases_reservation(late_tool):
+    result = late_tool.place_orders(_basket(2)[1:])
+    assert result['orders'][0]['status'] == 'TIMEOUT'
+    assert late_tool.risk_engine.stats()['reservations'] == 1
+    assert _wait_for(lambda: late_tool.risk_engine.stats()['reservations'] == 0)
+
+def test_batch_reports_per_order_status(make_tool, monkeypatch):
+    monkeypatch.setattr(config.trading, 'order_timeout', 0.3)
+    tool = make_tool(latency=0.005, reject=['600001.SH'], drop=['600002.SH'])
+    orders = _basket(4) + [{'symbol': '600010.SH', 'quantity': 150, 'price': 10.0},
+                           {'symbol': 'bad', 'quantity': 100, 'price': 10.0},
+                           {'symbol': '600011.SH', 'quantity': 100, 'price': 10.0, 'direction': 'HOLD'}]
+    result = tool.place_orders(orders)
+
+    statuses = [order['status'] for order in result['orders']]
+    assert statuses == ['ACCEPTED', 'REJECTED', 'TIMEOUT', 'ACCEPTED', 'REJECTED', 'REJECTED', 'REJECTED']
+    messages = [order['message'] for order in result['orders']]
+    assert messages[1] == '可用资金不足'
+    assert '整数倍' in messages[4] and '代码' in messages[5] and '方向' in messages[6]
+    assert (result['accepted'], result['rejected'], result['timeout']) == (2, 4, 1)
+    assert not result['success']
+    # 校验未通过的订单不提交
+    assert tool.trader.async_calls == 4
+
+def test_batch_rejects_when_trading_stopped(make_tool):
+    tool = make_tool()
+    tool.trading_state = 'STOPPED'
+    result = tool.place_orders(_basket(2))
+    assert not result['success'] and tool.trader.async_calls == 0
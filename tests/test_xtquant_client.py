@@ -0,0 +1,32 @@
+"""
+XTQuantClient 内存缓存测试：缓存命中不把缓存中的对象交给调用方
+"""
+
+import pandas as pd
+import pytest
+
+from src.utils.xtquant_client import XTQuantClient
+from tests.fakes.xtdata import FakeXtData
+
+@pytest.fixture
+def client():
+    client = XTQuantClient()
+    client.bar_cache = None
+    client._xt = FakeXtData()
+    client._connected = True
+    return client
+
+def test_cached_market_data_is_not_shared_with_callers(client):
+    first = client.get_market_data('000001.SZ', '20230101', '20230630')
+    expected = first.copy()
+    first['close'] = -1.0
+    first['signal'] = 1
+
+    second = client.get_market_data('000001.SZ', '20230101', '20230630')
+    assert len(client._xt.calls) == 1
+    assert second is not first
+    pd.testing.assert_frame_equal(second, expected)
+
+def test_cached_stock_list_is_not_shared_with_callers(client):
+    client.get_stock_list('沪深A股').append('000002.SZ')
+    assert client.get_stock_list('沪深A股') == ['000001.SZ', '600000.SH']